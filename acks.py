@@ -0,0 +1,149 @@
+import collections
+import select
+import socket
+import threading
+import time
+import protocol
+from framer import Framer
+from stats import SampleRing
+
+# Histogram bucket upper edges for the HUD, in ms; the last bucket is open ended
+RTT_BUCKETS_MS = (0.25, 0.5, 1, 2, 4, 8, 16, 32)
+SPARK = ' ▁▂▃▄▅▆▇█'
+
+
+class AckSender:
+    """Server side: sends acks without ever blocking the thread that applied the command.
+
+    On TCP a send that only partly fits keeps its tail in `pending` and later
+    acks queue behind it, up to `max_pending` bytes, after which new acks are
+    dropped whole so the stream stays aligned. UDP acks are single datagrams.
+    """
+
+    def __init__(self, sock, addr=None, max_pending=4096):
+        self.sock = sock
+        self.addr = addr
+        self.max_pending = max_pending
+        self.pending = b''
+        self.sent = 0
+        self.dropped = 0
+
+    def send(self, frame, received_ns, applied_ns, lost=0, reordered=0):
+        ack = protocol.encode_ack(frame, received_ns, applied_ns, lost, reordered)
+        try:
+            if self.addr is not None:
+                self.sock.sendto(ack, socket.MSG_DONTWAIT, self.addr)
+            else:
+                if len(self.pending) + len(ack) > self.max_pending:
+                    self.dropped += 1
+                    return
+                data = self.pending + ack
+                self.pending = data[self.sock.send(data, socket.MSG_DONTWAIT):]
+            self.sent += 1
+        except BlockingIOError:
+            if self.addr is None:
+                self.pending += ack
+            else:
+                self.dropped += 1
+        except OSError:
+            self.dropped += 1  # Client already gone; the session teardown reports it
+
+
+class LatencyTracker:
+    """Client side: turns acks into RTT, clock offset and one-way latency estimates.
+
+    Every ack is also a clock sample, NTP style: the frame's send time t0, the
+    server's receive t1 and apply t2, and our receive t3. The offset is taken
+    from the sample with the smallest round trip in the last `window` acks,
+    which is the one least skewed by queueing.
+    """
+
+    def __init__(self, history=512, window=64):
+        self.rtt = SampleRing(history)  # Send to ack, seconds
+        self.uplink = SampleRing(history)  # Send to server receive, seconds
+        self.to_pins = SampleRing(history)  # Send to PWM write, seconds
+        self.acked = 0
+        self.lost = 0  # As counted by the server for the current session
+        self.reordered = 0
+        self.offset_ns = None  # Server clock minus client clock
+        self._samples = collections.deque(maxlen=window)  # (round trip ns, offset ns)
+
+    def add(self, ack, now_ns):
+        t0, t1, t2, t3 = ack.client_ts, ack.received_ns, ack.applied_ns, now_ns
+        self.acked += 1
+        self.lost = ack.lost
+        self.reordered = ack.reordered
+
+        self._samples.append(((t3 - t0) - (t2 - t1), ((t1 - t0) + (t2 - t3)) // 2))
+        self.offset_ns = min(self._samples)[1]
+        self.rtt.add((t3 - t0) / 1e9)
+        self.uplink.add((t1 - t0 - self.offset_ns) / 1e9)
+        self.to_pins.add((t2 - t0 - self.offset_ns) / 1e9)
+
+    def histogram(self):
+        """Counts of recent RTTs per RTT_BUCKETS_MS bucket."""
+        counts = [0] * (len(RTT_BUCKETS_MS) + 1)
+        for rtt in self.rtt.sorted():
+            ms = rtt * 1e3
+            bucket = 0
+            while bucket < len(RTT_BUCKETS_MS) and ms > RTT_BUCKETS_MS[bucket]:
+                bucket += 1
+            counts[bucket] += 1
+        return counts
+
+    def summary(self):
+        """One HUD segment: RTT sparkline over the buckets, then the estimates."""
+        if not self.acked:
+            return "no acks"
+        counts = self.histogram()
+        peak = max(counts)
+        spark = ''.join(SPARK[(c * (len(SPARK) - 1) + peak - 1) // peak] for c in counts)
+        rtt, = self.rtt.percentiles(50)
+        uplink, = self.uplink.percentiles(50)
+        to_pins, = self.to_pins.percentiles(50)
+        return (f"rtt [{spark}] p50 {rtt * 1e3:.1f}ms  up {uplink * 1e3:.1f}ms  pins {to_pins * 1e3:.1f}ms  "
+                f"lost {self.lost} reordered {self.reordered}")
+
+
+class AckReader(threading.Thread):
+    """Reads acks off the control socket so the send loop never waits on them.
+
+    `on_ack()`, if given, runs on this thread after each batch of acks.
+    """
+
+    def __init__(self, sock, tracker, poll_interval=0.2, on_ack=None):
+        super().__init__(name="ack-reader", daemon=True)
+        self.sock = sock
+        self.tracker = tracker
+        self.on_ack = on_ack
+        self.poll_interval = poll_interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        framer = Framer(4096, frame_size=protocol.ACK_SIZE)
+        while not self._stop_event.is_set():
+            try:
+                readable, _, _ = select.select([self.sock], [], [], self.poll_interval)
+                if not readable:
+                    continue
+                if framer.recv_into(self.sock) == 0:  # Readable, so no wait; no MSG_DONTWAIT on Windows
+                    return  # Server closed; the send loop notices and reconnects
+            except BlockingIOError:
+                continue
+            except (OSError, ValueError):
+                return  # Socket closed under us by a reconnect
+            now = time.monotonic_ns()
+            acked = False
+            for frame in framer.frames():
+                try:
+                    self.tracker.add(protocol.decode_ack(frame), now)
+                except protocol.ProtocolError:
+                    return
+                acked = True
+            if acked and self.on_ack is not None:
+                self.on_ack()
+
+    def stop(self):
+        self._stop_event.set()
+        if self.is_alive() and self is not threading.current_thread():
+            self.join()
@@ -0,0 +1,92 @@
+import random
+import timeit
+from curves import CurveEngine, AXIS
+
+# Checks that the default CurveEngine tables give exactly what client2.py's scalar
+# throttle/steering code produced, then times both per tick.
+#
+#   python3 bench_curves.py
+
+GEAR_SEQUENCE = ['R', 'N', '1', '2', '3', '4', '5']
+GEAR_SPEED_MULTIPLIER = {'1': 1.3, '2': 1.8, '3': 2.8, '4': 3.8, '5': 4.8}
+GAS_DEADZONE = 0.05
+BRAKE_DEADZONE = 0.05
+GAS_THRESHOLD_RUN = 0.6
+PWM_NEUTRAL = 1500
+ITERATIONS = 200_000
+
+
+# --- client2.py scalar reference, as it was before the curve engine ---
+def get_gear_range(gear):
+    factor = GEAR_SPEED_MULTIPLIER.get(gear, 1)
+    gear_min = 1575 + (factor - 1) * 25
+    return gear_min, gear_min + 25
+
+
+def scalar_controls(gear, steer_axis, gas_raw, brake_raw):
+    gas = max(0, min(1, -(gas_raw - 1) / 2))
+    brake = max(0, min(1, -(brake_raw - 1) / 2))
+
+    if gas < GAS_DEADZONE: gas = 0
+    if brake < BRAKE_DEADZONE: brake = 0
+
+    steering = int((-steer_axis + 1) * 45)
+    motor = PWM_NEUTRAL
+
+    if gear == 'R':
+        if gas > GAS_DEADZONE:
+            motor = PWM_NEUTRAL - int(40 * gas)
+    elif gear == 'N':
+        motor = PWM_NEUTRAL
+    elif gear in GEAR_SPEED_MULTIPLIER:
+        if gas > GAS_THRESHOLD_RUN:
+            gear_min, gear_max = get_gear_range(gear)
+            scaled = min(1, max(0, (gas - 0.5) * 2))
+            forward = int(gear_min + (gear_max - gear_min) * scaled)
+            motor = forward
+        else:
+            motor = PWM_NEUTRAL
+
+        motor -= int(50 * brake)
+        motor = max(PWM_NEUTRAL, min(2000, motor))
+
+    return steering, motor, round(gas, 2), round(brake, 2)
+
+
+def verify(engine):
+    """Exhaustive over each axis on its own, plus random combinations of all three."""
+    axis = AXIS.tolist()
+    checked = 0
+    for gear in GEAR_SEQUENCE:
+        for value in axis:
+            for other in (-1.0, 0.0, 1.0):
+                for args in ((gear, value, other, 1.0), (gear, 0.0, value, other), (gear, 0.0, other, value)):
+                    expected = scalar_controls(*args)
+                    got = engine.lookup(*args)
+                    assert got == expected, f"{args}: tables {got} != scalar {expected}"
+                    checked += 1
+
+    rng = random.Random(1)
+    for _ in range(ITERATIONS):
+        args = (rng.choice(GEAR_SEQUENCE), rng.choice(axis), rng.choice(axis), rng.choice(axis))
+        assert engine.lookup(*args) == scalar_controls(*args), args
+        checked += 1
+    return checked
+
+
+def main():
+    engine = CurveEngine(GEAR_SPEED_MULTIPLIER, GAS_DEADZONE, BRAKE_DEADZONE, GAS_THRESHOLD_RUN, PWM_NEUTRAL)
+    print(f"✅ Tables match the scalar code on {verify(engine)} inputs")
+
+    sample = ('3', -0.2031, -0.7548, 1.0)
+    scalar = timeit.timeit(lambda: scalar_controls(*sample), number=ITERATIONS) / ITERATIONS * 1e6
+    table = timeit.timeit(lambda: engine.lookup(*sample), number=ITERATIONS) / ITERATIONS * 1e6
+    print(f"  scalar  {scalar:6.3f} us/tick")
+    print(f"  tables  {table:6.3f} us/tick")
+
+    build = timeit.timeit(lambda: CurveEngine(GEAR_SPEED_MULTIPLIER), number=3) / 3 * 1e3
+    print(f"  table build at startup {build:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
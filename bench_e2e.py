@@ -0,0 +1,240 @@
+import argparse
+import json
+import math
+import os
+import platform
+import re
+import resource
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import control_log
+import protocol
+from curves import CurveEngine
+from scheduler import TickScheduler
+from stats import percentile
+
+# End-to-end benchmark with no wheel and no Pi: runs the real server2.py over
+# loopback with fake_pigpio standing in for pigpiod, and drives it with a
+# scripted wheel through the client's curve/encode/send path. For every rate
+# it reports input-to-PWM latency from the server's control log, send rate,
+# how many commands reached the pins, and CPU per frame on both sides; a
+# back-to-back run gives the throughput ceiling. Client CPU includes the
+# scheduler's short busy-wait before each tick. Results are printed as JSON
+# (and written to --out) so runs on different versions can be diffed.
+#
+#   python3 bench_e2e.py
+#   python3 bench_e2e.py --out before.json --duration 5
+
+HOST = '127.0.0.1'
+PORT = 5050
+RATES = (50, 100, 500, 1000)
+DURATION = 3.0
+GEAR = '2'
+GEAR_SPEED_MULTIPLIER = {'1': 1.3, '2': 1.8, '3': 2.8, '4': 3.8, '5': 4.8}
+REPO = os.path.dirname(os.path.abspath(__file__))
+
+SERVER_BOOT = ("import sys, runpy, fake_pigpio; sys.modules['pigpio'] = fake_pigpio; "
+               "runpy.run_path(sys.argv[1], run_name='__main__')")
+# Server settings overridden for benchmarking: no ESC arming hold, so every
+# frame sent once the server is up counts (startup.py reports arming itself)
+SERVER_CONFIG = {'ESC_ARM_SECONDS': 0}
+
+
+class ScriptedWheel:
+    """Joystick stand-in: steering sweeps a sine, gas held half down, brake released."""
+
+    def __init__(self, sweep_hz=0.5):
+        self.sweep_hz = sweep_hz
+        self.start = time.perf_counter()
+
+    def get_axis(self, axis):
+        if axis == 0:
+            return math.sin(2 * math.pi * self.sweep_hz * (time.perf_counter() - self.start))
+        return 0.0 if axis == 1 else 1.0
+
+    def get_button(self, button):
+        return 0
+
+
+class Server:
+    """server2.py (or another server script) in a child process on fake_pigpio.
+
+    The script runs with the settings in `config` replaced (SERVER_CONFIG by
+    default) and counts as ready once it is listening and its ESC is armed.
+    """
+
+    def __init__(self, script, config=SERVER_CONFIG):
+        self.workdir = tempfile.mkdtemp(prefix="rc-bench-")
+        env = dict(os.environ, PYTHONPATH=REPO + os.pathsep + os.environ.get('PYTHONPATH', ''))
+        self.process = subprocess.Popen(
+            [sys.executable, '-u', '-c', SERVER_BOOT, self._configured(script, config)],
+            cwd=self.workdir, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+            preexec_fn=lambda: signal.signal(signal.SIGINT, signal.SIG_DFL))
+        self.lines = []
+        self.listening_ns = None
+        self.armed_ns = None
+        self.ready = threading.Event()
+        threading.Thread(target=self._read_output, daemon=True).start()
+        if not self.ready.wait(15):
+            self.stop()
+            raise RuntimeError("server did not start:\n" + "".join(self.lines))
+
+    def _configured(self, script, config):
+        """Path of `script` with each `NAME = ...` setting in `config` replaced, copied to the work dir."""
+        path = os.path.join(REPO, script)
+        if not config:
+            return path
+        with open(path) as f:
+            source = f.read()
+        for name, value in config.items():
+            source, found = re.subn(rf"^{name} = .*$", f"{name} = {value!r}", source, count=1, flags=re.M)
+            if not found:
+                raise ValueError(f"{script} has no {name} setting")
+        path = os.path.join(self.workdir, os.path.basename(script))
+        with open(path, 'w') as f:
+            f.write(source)
+        return path
+
+    def _read_output(self):
+        for line in self.process.stdout:
+            self.lines.append(line)
+            # Either may come first, or both on one line: they print from different threads
+            if "Server listening" in line:
+                self.listening_ns = time.monotonic_ns()
+            if "ESC armed" in line:
+                self.armed_ns = time.monotonic_ns()
+            if self.listening_ns is not None and self.armed_ns is not None:
+                self.ready.set()
+
+    def stop(self):
+        """Stops the server like Ctrl+C and returns its CPU seconds."""
+        before = resource.getrusage(resource.RUSAGE_CHILDREN)
+        self.process.send_signal(signal.SIGINT)
+        self.process.wait(10)
+        after = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+
+    def applied_records(self):
+        """Commands the server logged as written to the pins; removes the work dir."""
+        directory = os.path.join(self.workdir, 'logs')
+        try:
+            names = os.listdir(directory) if os.path.isdir(directory) else []
+            if not names:
+                return []
+            records = control_log.load_log(os.path.join(directory, names[0]))
+            return records[records['kind'] == control_log.KIND_APPLIED]
+        finally:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+def connect():
+    deadline = time.monotonic() + 5
+    while True:
+        try:
+            s = socket.create_connection((HOST, PORT))
+            break
+        except ConnectionRefusedError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+    s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return s, protocol.FrameEncoder(protocol.client_handshake(s))
+
+
+def drive(rate_hz, duration):
+    """Scripted client: read wheel, look up curves, encode and send every tick."""
+    sock, encoder = connect()
+    curves = CurveEngine(GEAR_SPEED_MULTIPLIER)
+    wheel = ScriptedWheel()
+    scheduler = TickScheduler(rate_hz) if rate_hz else None
+    sent = 0
+    cpu = time.process_time()
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        if scheduler is not None:
+            scheduler.wait()
+        steering, motor, gas, brake = curves.lookup(GEAR, wheel.get_axis(0), wheel.get_axis(1), wheel.get_axis(2))
+        sock.sendall(encoder.encode(steering, motor, GEAR, gas, brake))
+        sent += 1
+    cpu = time.process_time() - cpu
+    time.sleep(0.1)  # Let the output loop apply the last frame before disconnecting
+    sock.close()
+    achieved = scheduler.stats()['achieved_hz'] if scheduler is not None else sent / duration
+    return sent, achieved, cpu
+
+
+def run(script, rate_hz, duration, idle_cpu):
+    server = Server(script)
+    sent, achieved, client_cpu = drive(rate_hz, duration)
+    server_cpu = server.stop()
+    applied = server.applied_records()
+    latencies = sorted(((applied['t_ns'] - applied['client_ts']) / 1e6).tolist()) if len(applied) else []
+    p50, p90, p99, p100 = (percentile(latencies, p) for p in (50, 90, 99, 100))
+    return {
+        "target_hz": rate_hz or None,
+        "achieved_hz": round(achieved, 1),
+        "frames_sent": sent,
+        "frames_applied": len(applied),
+        "applied_ratio": round(len(applied) / sent, 3) if sent else 0.0,
+        "latency_p50_ms": round(p50, 3),
+        "latency_p90_ms": round(p90, 3),
+        "latency_p99_ms": round(p99, 3),
+        "latency_max_ms": round(p100, 3),
+        "client_cpu_us_per_frame": round(client_cpu / sent * 1e6, 2) if sent else None,
+        "server_cpu_us_per_frame": round(max(0.0, server_cpu - idle_cpu) / sent * 1e6, 2) if sent else None,
+    }
+
+
+def idle_baseline(script, duration):
+    """Server CPU for startup plus an idle output loop, subtracted from every run."""
+    server = Server(script)
+    time.sleep(duration)
+    cpu = server.stop()
+    shutil.rmtree(server.workdir, ignore_errors=True)
+    return cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hardware-free end-to-end benchmark")
+    parser.add_argument("--server", default="server2.py")
+    parser.add_argument("--duration", type=float, default=DURATION)
+    parser.add_argument("--rates", type=int, nargs="+", default=list(RATES))
+    parser.add_argument("--out", help="also write the JSON results here")
+    args = parser.parse_args()
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+
+    idle_cpu = idle_baseline(args.server, args.duration)
+    results = {
+        "server": args.server,
+        "commit": commit,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "duration_s": args.duration,
+        "server_idle_cpu_s": round(idle_cpu, 4),
+        "rates": [],
+    }
+    for rate in args.rates:
+        results["rates"].append(run(args.server, rate, args.duration, idle_cpu))
+        print(f"  {rate:5d} Hz done", file=sys.stderr)
+    results["max_throughput"] = run(args.server, 0, args.duration, idle_cpu)
+
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import resource
+import time
+from av import VideoFrame
+from frame_pool import FramePool
+from synthetic_video import test_pattern
+
+# What turning decoded video into BGR images costs in memory: PyAV's
+# to_ndarray, which allocates a new array per frame, against FramePool,
+# which converts into reused buffers. yuv420p frames are made up front as a
+# decoder would hand them over. As in the render thread, the previous image
+# is still referenced while the next is converted, unless it was released
+# back to the pool. Page faults (minor, from getrusage) are the kernel
+# handing out fresh pages for every new image the allocator mmaps; glibc
+# raises its mmap threshold once large blocks are freed, so they show up
+# for some sizes and not others depending on what ran before.
+#
+#   python3 bench_frame_pool.py
+
+RESOLUTIONS = ((640, 480), (1280, 720), (1920, 1080))
+FRAMES = 300
+PATTERN_FRAMES = 8
+DISPLAY_FPS = 30
+
+
+def frames(width, height):
+    return [VideoFrame.from_ndarray(test_pattern(width, height, i / PATTERN_FRAMES), format="bgr24")
+            .reformat(format="yuv420p") for i in range(PATTERN_FRAMES)]
+
+
+def allocate(frames):
+    img = None
+    for i in range(FRAMES):
+        # `img` still holds the previous image while the next is converted, as in the render thread
+        img = frames[i % len(frames)].to_ndarray(format="bgr24")
+    return img
+
+
+class Pooled:
+    def __init__(self):
+        self.pool = FramePool()
+
+    def __call__(self, frames):
+        for i in range(FRAMES):
+            img = self.pool.convert(frames[i % len(frames)])
+            self.pool.release(img)
+
+
+def measure(convert, frames):
+    convert(frames)  # Warm up: pool buffers, OpenCV and PyAV setup, allocator arenas
+    faults = resource.getrusage(resource.RUSAGE_SELF).ru_minflt
+    start = time.perf_counter()
+    convert(frames)
+    elapsed = time.perf_counter() - start
+    faults = resource.getrusage(resource.RUSAGE_SELF).ru_minflt - faults
+    return {"fps": FRAMES / elapsed, "faults_per_frame": faults / FRAMES}
+
+
+def main():
+    print(f"{FRAMES} yuv420p frames to BGR per run")
+    for width, height in RESOLUTIONS:
+        source = frames(width, height)
+        mb_per_frame = width * height * 3 / 1e6
+        print(f"  {width}x{height}, {mb_per_frame:.2f} MB per BGR frame")
+        for label, convert in (("to_ndarray", allocate), ("FramePool", Pooled())):
+            r = measure(convert, source)
+            fresh = FRAMES if convert is allocate else convert.pool.misses
+            print(f"    {label:<11} {r['fps']:7.1f} fps  {r['faults_per_frame']:6.1f} page faults/frame  "
+                  f"{fresh * mb_per_frame / FRAMES * r['fps']:7.1f} MB/s allocated at that rate, "
+                  f"{fresh * mb_per_frame / FRAMES * DISPLAY_FPS:5.1f} MB/s at {DISPLAY_FPS} fps")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import socket
+import time
+import protocol
+from framer import Framer
+
+# Framing cost of the old `buffer += data.decode(); buffer.split('\n', 1)` receive
+# path against Framer, for bursts of 1, 10 and 1000 queued frames. "latest" is the
+# coalescing path, which skips a backlog without touching each frame. The columns
+# of a row run in turn REPEATS times and the best of each is printed, so a noisy
+# machine slows all of them alike rather than whichever ran at the wrong moment.
+#
+#   python3 bench_framer.py
+
+BURSTS = (1, 10, 1000)
+TOTAL_FRAMES = 20_000  # Per burst size, so every row does the same work
+REPEATS = 7
+
+
+def legacy_receive(sock, expected):
+    buffer = ""
+    received = 0
+    while received < expected:
+        data = sock.recv(1024)
+        buffer += data.decode('utf-8')
+        while '\n' in buffer:
+            line, buffer = buffer.split('\n', 1)
+            received += 1
+
+
+def framer_receive(sock, framer, expected):
+    received = 0
+    while received < expected:
+        framer.recv_into(sock)
+        for _ in framer.frames():
+            received += 1
+
+
+def framer_latest(sock, framer, expected):
+    received = 0
+    while received < expected:
+        framer.recv_into(sock)
+        frame, skipped = framer.latest()
+        if frame is not None:
+            received += skipped + 1
+
+
+def run(burst, payload, receive):
+    sender, receiver = socket.socketpair()
+    for s in (sender, receiver):
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 1 << 20)
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+    chunk = payload * burst
+    elapsed = 0
+    for _ in range(TOTAL_FRAMES // burst):
+        sender.sendall(chunk)
+        start = time.perf_counter_ns()
+        receive(receiver, burst)
+        elapsed += time.perf_counter_ns() - start
+    sender.close()
+    receiver.close()
+    return elapsed / TOTAL_FRAMES / 1000
+
+
+def main():
+    json_frame = protocol.encode_json(47, 1612, '3', 0.83, 0.0, 1)
+    binary_frame = protocol.encode_binary(47, 1612, '3', 0.83, 0.0, 1)
+
+    print(f"{'burst':>6} {'legacy json':>12} {'framer json':>12} {'framer bin':>12} {'latest bin':>12}   (us/frame)")
+    for burst in BURSTS:
+        json_framer = Framer()
+        binary_framer = Framer(frame_size=protocol.FRAME_SIZE)
+        columns = (
+            (json_frame, legacy_receive),
+            (json_frame, lambda s, n: framer_receive(s, json_framer, n)),
+            (binary_frame, lambda s, n: framer_receive(s, binary_framer, n)),
+            (binary_frame, lambda s, n: framer_latest(s, binary_framer, n)),
+        )
+        best = [min(runs) for runs in zip(*([run(burst, payload, receive) for payload, receive in columns]
+                                             for _ in range(REPEATS)))]
+        legacy, framed_json, framed_bin, latest_bin = best
+        print(f"{burst:>6} {legacy:>12.2f} {framed_json:>12.2f} {framed_bin:>12.2f} {latest_bin:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import time
+import fake_pigpio
+from gpio_backends import NullBackend, PigpioBackend, RecordingBackend, SimulatedBackend
+from stats import SampleRing
+
+# Cost of one write() on each GPIO backend: both channels moved, as on every
+# steering change. The null, recording and simulated backends run anywhere;
+# pigpio is measured against fake_pigpio (the Python side of the call, no
+# daemon) and against a real pigpiod when one is reachable.
+#
+#   python3 bench_gpio_backends.py
+
+WRITES = 20000
+SERVO_PIN = 19
+ESC_PIN = 18
+
+
+def real_pigpio():
+    """A PigpioBackend on the local daemon, or None without pigpio or pigpiod."""
+    try:
+        import pigpio
+    except ImportError:
+        return None
+    pi = pigpio.pi()
+    return PigpioBackend(pi) if pi.connected else None
+
+
+def measure(backend):
+    backend.claim((SERVO_PIN, ESC_PIN))
+    samples = SampleRing(WRITES)
+    round_trips = 0
+    for i in range(WRITES):
+        pulses = ((SERVO_PIN, 1000 + i % 1000), (ESC_PIN, 1500 + i % 2))
+        start = time.perf_counter_ns()
+        round_trips += backend.write(pulses)
+        samples.add(time.perf_counter_ns() - start)
+    backend.close()
+    return samples, round_trips
+
+
+def main():
+    backends = [
+        ("null", NullBackend()),
+        ("recording", RecordingBackend()),
+        ("simulated", SimulatedBackend()),
+        ("pigpio (fake)", PigpioBackend(fake_pigpio.pi())),
+    ]
+    daemon = real_pigpio()
+    if daemon is not None:
+        backends.append(("pigpio (pigpiod)", daemon))
+
+    print(f"{WRITES} two-channel writes per backend")
+    for label, backend in backends:
+        samples, round_trips = measure(backend)
+        p50, p99 = samples.percentiles(50, 99)
+        print(f"  {label:<17} p50 {p50 / 1000:7.2f} us  p99 {p99 / 1000:7.2f} us  "
+              f"mean {sum(samples.sorted()) / len(samples) / 1000:7.2f} us  {round_trips / WRITES:.1f} round trips/write")
+        if isinstance(backend, SimulatedBackend):
+            delays = sorted(seen - written for written, seen, _, _ in backend.log)
+            print(f"  {'':<17} modelled write→pulse measured p50 {delays[len(delays) // 2] / 1e6:.2f} ms "
+                  f"(max {delays[-1] / 1e6:.2f}) at {1e9 / backend.frame_ns:.0f} Hz frames")
+    if daemon is None:
+        print("  pigpio (pigpiod)  skipped, no pigpio module or daemon here")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import io
+import time
+from hud import StatusRenderer
+from scheduler import TickScheduler
+
+# Send-loop jitter at 100 Hz with the old print-every-tick status line against
+# StatusRenderer. The console is simulated: every write costs CONSOLE_WRITE_COST
+# and every STALL_EVERY-th write blocks for CONSOLE_STALL, like a Windows console
+# scrolling or an SSH session waiting for the window to open.
+#
+#   python3 bench_hud.py
+
+RATE_HZ = 100
+DURATION = 3.0
+CONSOLE_WRITE_COST = 0.001
+CONSOLE_STALL = 0.03
+STALL_EVERY = 25
+
+
+class SlowConsole(io.TextIOBase):
+    writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        time.sleep(CONSOLE_STALL if self.writes % STALL_EVERY == 0 else CONSOLE_WRITE_COST)
+        return len(text)
+
+
+def render(controls):
+    return f"Sending: {controls}"
+
+
+def run(use_renderer):
+    console = SlowConsole()
+    scheduler = TickScheduler(RATE_HZ)
+    hud = StatusRenderer(render, stream=console)
+    if use_renderer:
+        hud.start()
+
+    start = time.perf_counter()
+    tick = 0
+    while time.perf_counter() - start < DURATION:
+        scheduler.wait()
+        tick += 1
+        controls = (45, 1500 + tick % 50, '2', 0.5, 0.0)
+        if use_renderer:
+            hud.publish(controls)
+        else:
+            console.write("\r" + render(controls))
+            console.flush()
+
+    if use_renderer:
+        hud.stop()
+    return scheduler.stats()
+
+
+def main():
+    print(f"{RATE_HZ} Hz send loop, console writes {CONSOLE_WRITE_COST * 1000:.0f} ms, "
+          f"{CONSOLE_STALL * 1000:.0f} ms stall every {STALL_EVERY}")
+    for label, use_renderer in (("print per tick", False), ("StatusRenderer", True)):
+        stats = run(use_renderer)
+        print(f"  {label:<15} achieved {stats['achieved_hz']:6.1f} Hz  jitter p50 {stats['jitter_p50_ms']:6.3f} ms"
+              f"  p99 {stats['jitter_p99_ms']:6.3f} ms  max {stats['jitter_max_ms']:6.3f} ms"
+              f"  overruns {stats['overruns']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import time
+import protocol
+from calibration import Calibration
+from gpio_backends import NullBackend
+from pwm_output import PwmOutput
+from profiler import DECODE, PULSES, WRITE, StageProfiler
+
+# What stage profiling costs on the server's command path: decode a binary
+# frame, turn it into pulses, write them (null backend, so only Python runs).
+# The same path is timed without any instrumentation, instrumented with the
+# profiler off (None, as the servers run by default) and with it on.
+#
+#   python3 bench_profiler.py
+
+COMMANDS = 50000
+ROUNDS = 15
+
+
+def commands():
+    encoder = protocol.FrameEncoder()
+    return [encoder.encode(i % 91, 1000 + i % 1000, 'D', 0.5, 0.0) for i in range(COMMANDS)]
+
+
+def plain(frames, calibration, output, profiler):
+    for data in frames:
+        frame = protocol.decode_binary(data)
+        servo = calibration.servo_table[frame.steering]
+        pulses = servo, calibration.esc_pulse(frame.motor)
+        output.write(*pulses)
+
+
+def instrumented(frames, calibration, output, profiler):
+    for data in frames:
+        if profiler is not None:
+            t = time.perf_counter_ns()
+        frame = protocol.decode_binary(data)
+        if profiler is not None:
+            t = profiler.record(DECODE, t)
+        servo = calibration.servo_table[frame.steering]
+        pulses = servo, calibration.esc_pulse(frame.motor)
+        if profiler is not None:
+            t = profiler.record(PULSES, t)
+        output.write(*pulses)
+        if profiler is not None:
+            profiler.record(WRITE, t)
+
+
+def per_command_ns(path, frames, profiler):
+    output = PwmOutput(NullBackend(), 19, 18)
+    start = time.perf_counter_ns()
+    path(frames, Calibration.from_dict({}), output, profiler)
+    return (time.perf_counter_ns() - start) / len(frames)
+
+
+def main():
+    frames = commands()
+    variants = ((plain, None), (instrumented, None), (instrumented, StageProfiler()))
+    best = [float('inf')] * len(variants)
+    for _ in range(ROUNDS):  # Interleaved, so clock and cache drift hit every variant alike
+        for i, (path, profiler) in enumerate(variants):
+            best[i] = min(best[i], per_command_ns(path, frames, profiler))
+    base, off, on = best
+    print(f"{COMMANDS} commands, best of {ROUNDS} rounds")
+    print(f"  no instrumentation  {base:7.0f} ns/command")
+    print(f"  profiler off        {off:7.0f} ns/command  ({off - base:+5.0f} ns, {(off - base) / base * 100:+5.1f}%)")
+    print(f"  profiler on         {on:7.0f} ns/command  ({on - base:+5.0f} ns, {(on - base) / base * 100:+5.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import timeit
+import protocol
+
+# Compares the legacy newline-delimited JSON frame with the binary frame.
+# Run on the Pi to see the numbers that matter: python3 bench_protocol.py
+
+ITERATIONS = 100_000
+SAMPLE = dict(steering=47, motor=1612, gear='3', gas=0.83, brake=0.0)
+
+
+def bench(label, func):
+    seconds = timeit.timeit(func, number=ITERATIONS)
+    per_call_us = seconds / ITERATIONS * 1e6
+    print(f"  {label:<18} {per_call_us:8.2f} us/frame")
+    return per_call_us
+
+
+def main():
+    json_frame = protocol.encode_json(seq=1, timestamp=0, **SAMPLE)
+    json_line = json_frame[:-1]
+    binary_frame = protocol.encode_binary(seq=1, timestamp=0, **SAMPLE)
+
+    # Make sure both formats carry the same controls before timing them.
+    assert protocol.decode_json(json_line)[:5] == protocol.decode_binary(binary_frame)[:5]
+
+    print(f"Bytes per frame: json={len(json_frame)}  binary={len(binary_frame)}")
+    print(f"Timing {ITERATIONS} frames:")
+
+    json_enc = bench("json encode", lambda: protocol.encode_json(seq=1, **SAMPLE))
+    bin_enc = bench("binary encode", lambda: protocol.encode_binary(seq=1, **SAMPLE))
+    json_dec = bench("json decode", lambda: protocol.decode_json(json_line))
+    bin_dec = bench("binary decode", lambda: protocol.decode_binary(binary_frame))
+
+    print(f"Speedup: encode x{json_enc / bin_enc:.1f}, decode x{json_dec / bin_dec:.1f}, "
+          f"size x{len(json_frame) / len(binary_frame):.1f}")
+
+
+if __name__ == "__main__":
+    main()
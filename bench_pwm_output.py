@@ -0,0 +1,55 @@
+import math
+import time
+import fake_pigpio
+from pwm_output import PwmOutput
+from gpio_backends import PigpioBackend
+
+# Daemon round trips for 10 s of 100 Hz driving: the old two writes per command
+# against PwmOutput with change detection and the batched script. Runs on the fake
+# pigpio backend, which sleeps DAEMON_LATENCY per round trip like a socket would.
+#
+#   python3 bench_pwm_output.py
+
+RATE_HZ = 100
+DURATION = 10
+DAEMON_LATENCY = 0.0001
+SERVO_PIN = 19
+ESC_PIN = 18
+
+
+def driving_trace():
+    """Straights with a slow corner every 4 s, throttle held in steps, +-1 us sensor noise."""
+    for i in range(RATE_HZ * DURATION):
+        t = i / RATE_HZ
+        corner = 600 * math.sin(math.pi * (t % 1)) if int(t) % 4 == 0 else 0
+        noise = i % 3 - 1
+        motor = 1500 + 25 * (int(t) % 3)
+        yield 1500 + corner + noise, motor
+
+
+def main():
+    trace = list(driving_trace())
+
+    pi = fake_pigpio.pi(latency=DAEMON_LATENCY)
+    start = time.perf_counter()
+    for servo, esc in trace:
+        pi.set_servo_pulsewidth(SERVO_PIN, servo)
+        pi.set_servo_pulsewidth(ESC_PIN, esc)
+    legacy_time = time.perf_counter() - start
+    print(f"  direct      {pi.round_trips:5d} round trips  {legacy_time * 1000:7.1f} ms")
+
+    for deadband in (0, 2, 10):
+        pi = fake_pigpio.pi(latency=DAEMON_LATENCY)
+        output = PwmOutput(PigpioBackend(pi), SERVO_PIN, ESC_PIN, deadband_us=deadband)
+        setup_trips = pi.round_trips
+        start = time.perf_counter()
+        for servo, esc in trace:
+            output.write(servo, esc)
+        elapsed = time.perf_counter() - start
+        stats = output.stats()
+        print(f"  deadband {deadband:2d} {pi.round_trips - setup_trips:5d} round trips  {elapsed * 1000:7.1f} ms"
+              f"  (writes {stats['writes']}, suppressed {stats['suppressed']})")
+
+
+if __name__ == "__main__":
+    main()
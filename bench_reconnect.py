@@ -0,0 +1,129 @@
+import socket
+import threading
+import time
+import protocol
+from bench_e2e import Server
+from link import ReconnectingLink
+
+# Time-to-control after a server restart: the old client2.py reconnect (a
+# blocking loop with time.sleep(2) inside the input loop) against
+# ReconnectingLink. A 100 Hz input loop drives server2.py, the server is
+# stopped and started again, and the first command the new server writes to
+# the pins is read from its control log. Reported per strategy: time from the
+# new server listening to that first command, the whole outage from the
+# kill, and the longest the input loop went without reading the wheel.
+#
+#   python3 bench_reconnect.py
+
+HOST = '127.0.0.1'
+PORT = 5050
+RATE_HZ = 100
+ROUNDS = 3
+
+
+def open_connection():
+    s = socket.create_connection((HOST, PORT), timeout=1.0)
+    s.settimeout(None)
+    s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    try:
+        return s, protocol.FrameEncoder(protocol.client_handshake(s))
+    except (OSError, protocol.ProtocolError):
+        s.close()
+        raise
+
+
+class LegacyLink:
+    """client2.py before the reconnect worker: reconnects inline, 2 s between attempts."""
+
+    def __init__(self):
+        self.current = None
+
+    def start(self):
+        self.current = self._connect()
+
+    def _connect(self):
+        while True:
+            try:
+                return open_connection()
+            except (OSError, protocol.ProtocolError):
+                time.sleep(2)
+
+    def send(self, controls):
+        sock, encoder = self.current
+        try:
+            sock.sendall(encoder.encode(*controls))
+        except (BrokenPipeError, ConnectionResetError, ConnectionRefusedError):
+            sock.close()
+            self.current = self._connect()
+            return False
+        return True
+
+    def stop(self):
+        self.current[0].close()
+
+
+def drive(link, stop, counters):
+    period = 1 / RATE_HZ
+    tick = 0
+    last = time.perf_counter()
+    while not stop.is_set():
+        now = time.perf_counter()
+        counters['max_gap'] = max(counters['max_gap'], now - last)
+        last = now
+        tick += 1
+        link.send((tick % 91, 1500, 'N', 0.0, 0.0))
+        time.sleep(max(0.0, period - (time.perf_counter() - now)))
+
+
+def restart_round(make_link):
+    server = Server("server2.py")
+    link = make_link()
+    link.start()
+    stop = threading.Event()
+    counters = {'max_gap': 0.0}
+    driver = threading.Thread(target=drive, args=(link, stop, counters), daemon=True)
+    driver.start()
+    time.sleep(1.0)
+
+    server.stop()
+    server.applied_records()
+    killed_ns = time.monotonic_ns()
+    counters['max_gap'] = 0.0
+    server = Server("server2.py")
+    time.sleep(3.0)  # The legacy loop may be up to 2 s into a sleep when the server comes back
+    stop.set()
+    driver.join()
+    link.stop()
+    server.stop()
+    applied = server.applied_records()
+    if not len(applied):
+        return None
+    first_ns = int(applied['t_ns'][0])
+    return {
+        "listen_to_control_s": (first_ns - server.listening_ns) / 1e9,  # Servers run without arming hold
+        "outage_s": (first_ns - killed_ns) / 1e9,
+        "max_input_gap_s": counters['max_gap'],
+    }
+
+
+def main():
+    strategies = (
+        ("legacy sleep(2)", LegacyLink),
+        ("ReconnectingLink", lambda: ReconnectingLink(open_connection)),
+    )
+    print(f"{RATE_HZ} Hz input loop, server2.py restarted {ROUNDS} times per strategy")
+    for label, make_link in strategies:
+        rounds = [r for r in (restart_round(make_link) for _ in range(ROUNDS)) if r]
+        if not rounds:
+            print(f"  {label:<17} never regained control")
+            continue
+        listen = sorted(r["listen_to_control_s"] for r in rounds)
+        outage = sorted(r["outage_s"] for r in rounds)
+        gap = max(r["max_input_gap_s"] for r in rounds)
+        print(f"  {label:<17} listen→control median {listen[len(listen) // 2] * 1000:7.1f} ms "
+              f"(max {listen[-1] * 1000:7.1f})  outage median {outage[len(outage) // 2]:5.2f} s  "
+              f"longest input stall {gap * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
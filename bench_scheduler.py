@@ -0,0 +1,59 @@
+import random
+import time
+from scheduler import TickScheduler
+from stats import SampleRing
+
+# Achieved send rate and tick jitter of the old `body; time.sleep(period)` loop
+# against TickScheduler, with a loop body that takes a random 0.1-1 ms like the
+# joystick read + encode + send does.
+#
+#   python3 bench_scheduler.py
+
+RATES = (50, 100, 500, 1000)
+DURATION = 2.0
+
+
+def body(rng):
+    end = time.perf_counter() + rng.uniform(0.0001, 0.001)
+    while time.perf_counter() < end:
+        pass
+
+
+def sleep_loop(rate_hz, rng):
+    period = 1 / rate_hz
+    intervals = SampleRing()
+    ticks = 0
+    start = last = time.perf_counter()
+    while last - start < DURATION:
+        body(rng)
+        time.sleep(period)
+        now = time.perf_counter()
+        intervals.add(abs(now - last - period))
+        last = now
+        ticks += 1
+    p50, p99 = intervals.percentiles(50, 99)
+    return ticks / (last - start), p50, p99
+
+
+def scheduled_loop(rate_hz, rng):
+    scheduler = TickScheduler(rate_hz)
+    start = time.perf_counter()
+    while time.perf_counter() - start < DURATION:
+        scheduler.wait()
+        body(rng)
+    stats = scheduler.stats()
+    return stats["achieved_hz"], stats["jitter_p50_ms"] / 1e3, stats["jitter_p99_ms"] / 1e3
+
+
+def main():
+    print(f"{'target':>7} | {'sleep loop: rate':>17} {'p50':>7} {'p99':>7} | "
+          f"{'scheduler: rate':>16} {'p50':>7} {'p99':>7}   (Hz, ms)")
+    for rate in RATES:
+        old_rate, old_p50, old_p99 = sleep_loop(rate, random.Random(1))
+        new_rate, new_p50, new_p99 = scheduled_loop(rate, random.Random(1))
+        print(f"{rate:>7} | {old_rate:>17.1f} {old_p50 * 1e3:>7.3f} {old_p99 * 1e3:>7.3f} | "
+              f"{new_rate:>16.1f} {new_p50 * 1e3:>7.3f} {new_p99 * 1e3:>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import socket
+import time
+import protocol
+from acks import AckReader, LatencyTracker
+from bench_e2e import Server
+from scheduler import TickScheduler
+
+# How many telemetry subscribers server3.py serves before its output loop
+# jitter degrades. For each step, N subscribers connect from a separate
+# process and read everything, then a 100 Hz driver with acks runs for a
+# while; loop jitter comes from the management `status` command and
+# send-to-pins latency from the acks. The first step whose loop p99 exceeds
+# DEGRADED_FACTOR times the no-subscriber p99 is reported.
+#
+#   python3 bench_subscribers.py
+#   python3 bench_subscribers.py --steps 0 100 1000 --out subscribers.json
+
+HOST = '127.0.0.1'
+TELEMETRY_PORT = 5051
+MANAGEMENT_PORT = 5052
+STEPS = (0, 10, 50, 100, 250, 500, 1000, 2000)
+DURATION = 3.0
+DRIVE_RATE_HZ = 100
+DEGRADED_FACTOR = 2.0
+
+
+def subscribe(count, ready, done, stalled=0):
+    """Child process: holds `count` telemetry connections open and drains them.
+
+    The first `stalled` of them never read, with a small receive buffer, like
+    an observer on a frozen laptop.
+    """
+    async def reader(stall):
+        sock = socket.socket()
+        if stall:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)  # Before connect, so the window is small
+        sock.setblocking(False)
+        await asyncio.get_running_loop().sock_connect(sock, (HOST, TELEMETRY_PORT))
+        if stall:
+            try:
+                await asyncio.Event().wait()  # A bare socket: a StreamReader would keep reading
+            finally:
+                sock.close()
+        r, w = await asyncio.open_connection(sock=sock)
+        try:
+            while await r.read(65536):
+                pass
+        finally:
+            w.close()
+
+    async def main():
+        tasks = []
+        for i in range(count):
+            tasks.append(asyncio.ensure_future(reader(i < stalled)))
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.5)
+        ready.set()
+        while not done.is_set():
+            await asyncio.sleep(0.05)
+        for task in tasks:
+            task.cancel()
+
+    asyncio.run(main())
+
+
+def manage(command):
+    with socket.create_connection((HOST, MANAGEMENT_PORT)) as s:
+        f = s.makefile('rwb')
+        f.write(command.encode() + b"\n")
+        f.flush()
+        return json.loads(f.readline())
+
+
+def drive(duration, rate_hz=DRIVE_RATE_HZ):
+    sock, encoder = connect_with_acks()
+    tracker = LatencyTracker(history=8192)
+    reader = AckReader(sock, tracker)
+    reader.start()
+    scheduler = TickScheduler(rate_hz)
+    end = time.perf_counter() + duration
+    tick = 0
+    while time.perf_counter() < end:
+        scheduler.wait()
+        tick += 1
+        sock.sendall(encoder.encode(tick % 91, 1600, '2', 0.7, 0.0))
+    time.sleep(0.1)
+    sock.close()
+    reader.stop()
+    return tracker
+
+
+def connect_with_acks():
+    sock = socket.create_connection((HOST, 5050))
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return sock, protocol.FrameEncoder(protocol.client_handshake(sock, options=(protocol.OPTION_ACKS,)))
+
+
+def step(count, duration):
+    ready, done = multiprocessing.Event(), multiprocessing.Event()
+    watchers = multiprocessing.Process(target=subscribe, args=(count, ready, done), daemon=True)
+    watchers.start()
+    ready.wait(60)
+    watching = manage("status")["telemetry"]["observers"]
+    manage("reset")
+    tracker = drive(duration)
+    loop = manage("status")["loop"]
+    done.set()
+    watchers.join(10)
+    time.sleep(0.3)  # Let the subscriber connections close before the next step
+    pins_p50, pins_p99 = tracker.to_pins.percentiles(50, 99)
+    return {
+        "subscribers": watching,
+        "loop_jitter_p50_ms": round(loop["jitter_p50_ms"], 3),
+        "loop_jitter_p99_ms": round(loop["jitter_p99_ms"], 3),
+        "loop_jitter_max_ms": round(loop["jitter_max_ms"], 3),
+        "loop_missed": loop["missed"],
+        "send_to_pins_p50_ms": round(pins_p50 * 1e3, 3),
+        "send_to_pins_p99_ms": round(pins_p99 * 1e3, 3),
+        "acks": tracker.acked,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Telemetry subscribers vs output loop jitter on server3.py")
+    parser.add_argument("--server", default="server3.py")
+    parser.add_argument("--duration", type=float, default=DURATION)
+    parser.add_argument("--steps", type=int, nargs="+", default=list(STEPS))
+    parser.add_argument("--out", help="also write the JSON results here")
+    args = parser.parse_args()
+
+    server = Server(args.server)
+    results = []
+    try:
+        print(f"{'subs':>6} {'loop p50':>9} {'loop p99':>9} {'loop max':>9} {'missed':>6} "
+              f"{'pins p50':>9} {'pins p99':>9}   (ms)")
+        for count in args.steps:
+            r = step(count, args.duration)
+            results.append(r)
+            print(f"{r['subscribers']:6d} {r['loop_jitter_p50_ms']:9.3f} {r['loop_jitter_p99_ms']:9.3f} "
+                  f"{r['loop_jitter_max_ms']:9.3f} {r['loop_missed']:6d} "
+                  f"{r['send_to_pins_p50_ms']:9.3f} {r['send_to_pins_p99_ms']:9.3f}")
+    finally:
+        server.stop()
+        server.applied_records()  # Removes the server's work dir
+
+    baseline = results[0]["loop_jitter_p99_ms"] if results else 0
+    degraded = next((r["subscribers"] for r in results[1:]
+                     if r["loop_jitter_p99_ms"] > DEGRADED_FACTOR * baseline), None)
+    print(f"Loop p99 exceeds {DEGRADED_FACTOR:.0f}x the baseline at: "
+          f"{'not reached' if degraded is None else f'{degraded} subscribers'}")
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump({"server": args.server, "steps": results, "degraded_at": degraded}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import multiprocessing
+import random
+import sys
+import time
+from bench_e2e import Server
+from bench_subscribers import drive, manage, subscribe
+from stats import percentile
+
+# Checks that 100 local telemetry observers on server3.py, some of them
+# stalled, do not move the driver's command-to-PWM latency. The driver runs
+# with acks at a rate slightly off the 200 Hz output loop so every phase
+# between the two is sampled, alone and with the observers attached, in
+# ROUNDS alternating pairs so drift on the machine hits both sides alike.
+# The samples of each side are pooled and the p50 and p99 shifts get a
+# bootstrap 95% interval. Exits non-zero if the interval reaches beyond
+# TOLERANCE_MS either way or the stalled observers made the server queue
+# instead of drop.
+#
+#   python3 bench_telemetry.py
+
+OBSERVERS = 100
+STALLED = 20
+ROUNDS = 4
+DURATION = 5.0  # Per round and side; ROUNDS * DURATION * DRIVE_RATE_HZ samples per side
+DRIVE_RATE_HZ = 97
+TOLERANCE_MS = 1.0
+RESAMPLES = 1000
+
+
+def measure(label):
+    manage("reset")
+    tracker = drive(DURATION, DRIVE_RATE_HZ)
+    status = manage("status")
+    p50, p99 = tracker.to_pins.percentiles(50, 99)
+    up50, up99 = tracker.uplink.percentiles(50, 99)
+    loop = status["loop"]
+    print(f"  {label:<16} send→pins p50 {p50 * 1e3:6.3f} ms  p99 {p99 * 1e3:6.3f} ms   "
+          f"send→server p50 {up50 * 1e3:6.3f} ms  p99 {up99 * 1e3:6.3f} ms   "
+          f"loop p99 {loop['jitter_p99_ms']:6.3f} ms")
+    return tracker.to_pins.sorted(), status["telemetry"]
+
+
+def watched(label):
+    ready, done = multiprocessing.Event(), multiprocessing.Event()
+    watchers = multiprocessing.Process(target=subscribe, args=(OBSERVERS, ready, done, STALLED), daemon=True)
+    watchers.start()
+    ready.wait(60)
+    time.sleep(3)  # Long enough for the stalled observers to fill their buffers
+    samples, telemetry = measure(label)
+    done.set()
+    watchers.join(10)
+    time.sleep(0.3)  # Let the observer connections close before the next round
+    return samples, telemetry
+
+
+def shift(alone, watched, pct):
+    """Watched minus alone at `pct`, in ms, and its bootstrap 95% interval."""
+    def at(samples):
+        return percentile(sorted(samples), pct)
+
+    rng = random.Random(1)
+    diffs = sorted(at(rng.choices(watched, k=len(watched))) - at(rng.choices(alone, k=len(alone)))
+                   for _ in range(RESAMPLES))
+    return ((at(watched) - at(alone)) * 1e3,
+            percentile(diffs, 2.5) * 1e3, percentile(diffs, 97.5) * 1e3)
+
+
+def main():
+    server = Server("server3.py")
+    alone, observed = [], []
+    try:
+        print(f"Driver at {DRIVE_RATE_HZ} Hz, {ROUNDS} rounds of {DURATION:.0f}s per side, "
+              f"{OBSERVERS} observers ({STALLED} stalled)")
+        for i in range(ROUNDS):
+            samples, _ = measure(f"{i + 1}: no observers")
+            alone += samples
+            samples, telemetry = watched(f"{i + 1}: {OBSERVERS} observers")
+            observed += samples
+    finally:
+        server.stop()
+        server.applied_records()
+
+    print(f"  telemetry: {telemetry['observers']} observers, {telemetry['published']} snapshots, "
+          f"{telemetry['sent']} sent, {telemetry['dropped']} dropped")
+    ok = telemetry['dropped'] > 0
+    for pct in (50, 99):
+        moved, low, high = shift(alone, observed, pct)
+        within = -TOLERANCE_MS <= low and high <= TOLERANCE_MS
+        ok = ok and within
+        print(f"  p{pct}: alone {percentile(sorted(alone), pct) * 1e3:6.3f} ms, "
+              f"observed {percentile(sorted(observed), pct) * 1e3:6.3f} ms, moved {moved:+.3f} ms "
+              f"(95% {low:+.3f} to {high:+.3f}, {len(alone)}/{len(observed)} samples) {'✅' if within else '❌'}")
+    print(f"{'✅' if ok else '❌'} Tolerance {TOLERANCE_MS} ms, stalled observers "
+          f"{'dropped' if telemetry['dropped'] else 'did not drop'} snapshots")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import random
+import select
+import socket
+import threading
+import time
+import protocol
+
+# Loopback comparison of the TCP and UDP control links under simulated packet loss.
+# A relay sits between sender and receiver and drops frames with LOSS_RATE. On UDP a
+# drop just loses that frame. On TCP the lost segment is retransmitted after RTO and
+# every later frame waits behind it (head-of-line blocking), like a real stack does.
+#
+#   python3 bench_udp_loss.py
+
+RATE_HZ = 100
+DURATION = 5.0
+LOSS_RATE = 0.02
+RTO = 0.2  # Linux minimum retransmission timeout
+SEED = 1
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return float('nan')
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def send_frames(send):
+    encoder = protocol.FrameEncoder(protocol.FORMAT_BINARY)
+    period = 1 / RATE_HZ
+    deadline = time.monotonic()
+    end = deadline + DURATION
+    while deadline < end:
+        send(encoder.encode(45, 1600, '2', 0.8, 0.0))
+        deadline += period
+        time.sleep(max(0.0, deadline - time.monotonic()))
+    return encoder.seq
+
+
+def run_udp(rng):
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(('127.0.0.1', 0))
+    relay = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    relay.bind(('127.0.0.1', 0))
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sender.connect(relay.getsockname())
+    latencies = []
+    stop = threading.Event()
+
+    def relay_loop():
+        relay.settimeout(0.1)
+        while not stop.is_set():
+            try:
+                data, _ = relay.recvfrom(64)
+            except socket.timeout:
+                continue
+            if rng.random() >= LOSS_RATE:
+                relay.sendto(data, receiver.getsockname())
+
+    def receive_loop():
+        receiver.settimeout(0.1)
+        last_seq = 0
+        while not stop.is_set():
+            try:
+                data, _ = receiver.recvfrom(64)
+            except socket.timeout:
+                continue
+            frame = protocol.decode_binary(data)
+            if protocol.is_newer(frame.seq, last_seq):
+                last_seq = frame.seq
+                latencies.append((time.monotonic_ns() - frame.timestamp) / 1e6)
+
+    threads = [threading.Thread(target=relay_loop), threading.Thread(target=receive_loop)]
+    for t in threads:
+        t.start()
+    sent = send_frames(sender.send)
+    time.sleep(0.3)
+    stop.set()
+    for t in threads:
+        t.join()
+    for s in (receiver, relay, sender):
+        s.close()
+    return sent, latencies
+
+
+def run_tcp(rng):
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(1)
+    relay_listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    relay_listener.bind(('127.0.0.1', 0))
+    relay_listener.listen(1)
+
+    sender = socket.create_connection(relay_listener.getsockname())
+    sender.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    relay_in, _ = relay_listener.accept()
+    relay_out = socket.create_connection(listener.getsockname())
+    relay_out.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    receiver, _ = listener.accept()
+    latencies = []
+    stop = threading.Event()
+
+    def relay_loop():
+        pending = []  # (release_time, frame) in stream order
+        buffer = bytearray()
+        while not stop.is_set():
+            readable, _, _ = select.select([relay_in], [], [], 0.001)
+            if readable:
+                data = relay_in.recv(4096)
+                if not data:
+                    break
+                buffer += data
+                now = time.monotonic()
+                while len(buffer) >= protocol.FRAME_SIZE:
+                    frame = bytes(buffer[:protocol.FRAME_SIZE])
+                    del buffer[:protocol.FRAME_SIZE]
+                    release = now + RTO if rng.random() < LOSS_RATE else now
+                    if pending:
+                        release = max(release, pending[-1][0])  # In-order delivery
+                    pending.append((release, frame))
+            now = time.monotonic()
+            while pending and pending[0][0] <= now:
+                relay_out.sendall(pending.pop(0)[1])
+        for _, frame in pending:
+            relay_out.sendall(frame)
+
+    def receive_loop():
+        receiver.settimeout(0.1)
+        buffer = bytearray()
+        while not stop.is_set():
+            try:
+                data = receiver.recv(4096)
+            except socket.timeout:
+                continue
+            if not data:
+                break
+            buffer += data
+            offset = 0
+            while len(buffer) - offset >= protocol.FRAME_SIZE:
+                frame = protocol.decode_binary(buffer, offset)
+                offset += protocol.FRAME_SIZE
+                latencies.append((time.monotonic_ns() - frame.timestamp) / 1e6)
+            del buffer[:offset]
+
+    threads = [threading.Thread(target=relay_loop), threading.Thread(target=receive_loop)]
+    for t in threads:
+        t.start()
+    sent = send_frames(sender.sendall)
+    time.sleep(RTO + 0.3)
+    stop.set()
+    for t in threads:
+        t.join()
+    for s in (sender, relay_in, relay_out, receiver, relay_listener, listener):
+        s.close()
+    return sent, latencies
+
+
+def report(label, sent, latencies):
+    ordered = sorted(latencies)
+    print(f"  {label:<4} applied {len(ordered):4d}/{sent}  "
+          f"p50 {percentile(ordered, 50):7.2f} ms  p99 {percentile(ordered, 99):7.2f} ms  "
+          f"max {ordered[-1] if ordered else float('nan'):7.2f} ms")
+    return percentile(ordered, 99)
+
+
+def main():
+    print(f"{RATE_HZ} Hz for {DURATION}s, {LOSS_RATE:.0%} loss, RTO {RTO * 1000:.0f} ms")
+    tcp_p99 = report("tcp", *run_tcp(random.Random(SEED)))
+    udp_p99 = report("udp", *run_udp(random.Random(SEED)))
+    print("✅ UDP tail latency is lower" if udp_p99 < tcp_p99 else "⚠️ UDP tail latency is NOT lower")
+
+
+if __name__ == "__main__":
+    main()
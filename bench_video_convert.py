@@ -0,0 +1,70 @@
+import asyncio
+import time
+from synthetic_video import SyntheticVideoTrack
+from web_rtc_client import WebRTCClient
+
+# YUV to BGR conversions paid by the video receive path when the display is
+# slower than the stream: the old path (convert every frame on receive, then
+# queue it) against WebRTCClient, which queues decoded frames and converts
+# only the ones the display pulls, both with the 30-frame queue. A synthetic
+# 720p60 track stands in for the WebRTC video track and the display takes
+# RENDER_SECONDS per frame.
+#
+#   python3 bench_video_convert.py
+
+WIDTH, HEIGHT = 1280, 720
+FPS = 60
+RENDER_SECONDS = 0.04  # A 25 fps display
+DURATION = 5.0
+
+
+class EagerClient(WebRTCClient):
+    """process_video_track as it was: every received frame converted before it is queued."""
+
+    async def process_video_track(self):
+        while True:
+            frame = await self.video_track.recv()
+            img = frame.to_ndarray(format="bgr24")
+            self.frames_converted += 1
+            self.frames.put((img, time.monotonic()))
+
+    async def next_image(self, timeout=1.0):
+        img, _ = await self.frames.get(timeout)
+        return img
+
+
+async def run(client_class):
+    client = client_class("http://unused", frame_buffer='queue')
+    client.video_track = SyntheticVideoTrack(WIDTH, HEIGHT, FPS)
+    receiver = asyncio.create_task(client.process_video_track())
+    displayed = 0
+    cpu_start = time.process_time()
+    start = time.monotonic()
+    while time.monotonic() - start < DURATION:
+        client.release_image(await client.next_image())
+        displayed += 1
+        await asyncio.sleep(RENDER_SECONDS)
+    elapsed = time.monotonic() - start
+    cpu = time.process_time() - cpu_start
+    receiver.cancel()
+    return {
+        "received_fps": client.frames.received / elapsed,
+        "displayed_fps": displayed / elapsed,
+        "converted_fps": client.frames_converted / elapsed,
+        "cpu_percent": cpu / elapsed * 100,
+    }
+
+
+def main():
+    print(f"{WIDTH}x{HEIGHT} at {FPS} fps into a {1 / RENDER_SECONDS:.0f} fps display, {DURATION:.0f}s each")
+    results = {}
+    for label, client_class in (("convert on receive", EagerClient), ("convert on display", WebRTCClient)):
+        r = results[label] = asyncio.run(run(client_class))
+        print(f"  {label:<19} received {r['received_fps']:5.1f} fps  displayed {r['displayed_fps']:5.1f} fps  "
+              f"converted {r['converted_fps']:5.1f}/s  CPU {r['cpu_percent']:5.1f}%")
+    saved = results["convert on receive"]["converted_fps"] - results["convert on display"]["converted_fps"]
+    print(f"  {saved:.1f} conversions/s saved")
+
+
+if __name__ == "__main__":
+    main()
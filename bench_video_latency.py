@@ -0,0 +1,42 @@
+import asyncio
+from synthetic_video import SyntheticVideoTrack
+from web_rtc_client import WebRTCClient
+
+# Age of the frames a display gets when it renders slower than the stream:
+# the 30-frame queue (recording mode) against the latest-frame mailbox (FPV
+# mode). A synthetic 720p30 track stands in for the WebRTC video track and
+# the display takes RENDER_SECONDS per frame; ages come from the client's
+# own glass-to-glass tracking.
+#
+#   python3 bench_video_latency.py
+
+WIDTH, HEIGHT = 1280, 720
+FPS = 30
+RENDER_SECONDS = 0.04  # A 25 fps display, just too slow for the stream
+DURATION = 8.0
+
+
+async def run(frame_buffer):
+    client = WebRTCClient("http://unused", frame_buffer=frame_buffer)
+    client.video_track = SyntheticVideoTrack(WIDTH, HEIGHT, FPS)
+    receiver = asyncio.create_task(client.process_video_track())
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    while loop.time() - start < DURATION:
+        client.release_image(await client.next_image())
+        client.frames_displayed += 1
+        await asyncio.sleep(RENDER_SECONDS)
+    receiver.cancel()
+    return client.stats()
+
+
+def main():
+    print(f"{WIDTH}x{HEIGHT} at {FPS} fps into a {1 / RENDER_SECONDS:.0f} fps display, {DURATION:.0f}s each")
+    for frame_buffer in ('queue', 'latest'):
+        s = asyncio.run(run(frame_buffer))
+        print(f"  {frame_buffer:<7} {s['received']:4d} received  {s['displayed']:4d} displayed  "
+              f"{s['superseded']:4d} superseded   age p50 {s['age_p50_ms']:6.1f} ms  p99 {s['age_p99_ms']:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import asyncio
+import time
+from frame_sources import SyntheticSource
+from stats import SampleRing
+from web_rtc_client import WebRTCClient
+from web_rtc_server import PublisherThread
+
+# Event-loop lag and RTP packet loss on the receiving side while frames are
+# drawn: rendering inline on the event loop (display_loop before the render
+# thread) against WebRTCClient's render thread. web_rtc_server's publisher
+# with the synthetic source runs on its own thread and event loop on
+# loopback, the client connects to it as it would to the car, and the window
+# is replaced by a blocking redraw of RENDER_SECONDS per frame (no display
+# needed).
+#
+#   python3 bench_video_render.py
+
+HOST = '127.0.0.1'
+PORT = 8099
+WIDTH, HEIGHT = 640, 480
+FPS = 30
+RENDER_SECONDS = 0.015
+DURATION = 10.0
+LAG_PROBE_SECONDS = 0.005
+
+
+class HeadlessWindow:
+    """Stands in for the OpenCV window: a redraw blocks its thread like imshow + waitKey."""
+
+    def open_window(self):
+        pass
+
+    def show(self, img):
+        time.sleep(RENDER_SECONDS if img is not None else 0.001)
+        return 0xFF
+
+    def close_window(self):
+        pass
+
+
+class ThreadedClient(HeadlessWindow, WebRTCClient):
+    pass
+
+
+class InlineClient(HeadlessWindow, WebRTCClient):
+    """display_loop before the render thread: convert and draw on the event loop."""
+
+    async def display_loop(self):
+        self.quit = asyncio.Event()
+        while not self.quit.is_set():
+            try:
+                img = await self.next_image(timeout=1.0)
+            except asyncio.TimeoutError:
+                continue
+            self.show(img)
+            self.frames_displayed += 1
+            self.release_image(img)
+
+
+async def probe_lag(lag):
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + LAG_PROBE_SECONDS
+        await asyncio.sleep(LAG_PROBE_SECONDS)
+        lag.add(loop.time() - expected)
+
+
+async def inbound_stats(pc):
+    for stat in (await pc.getStats()).values():
+        if stat.type == "inbound-rtp":
+            return stat
+    return None
+
+
+async def run(client_class):
+    client = client_class(f"http://{HOST}:{PORT}")
+    await client.connect()
+    while client.video_track is None:
+        await asyncio.sleep(0.05)
+    await asyncio.sleep(1.0)  # Let the encoder and jitter buffer settle
+    before = await inbound_stats(client.pc)
+
+    lag = SampleRing(4096)
+    prober = asyncio.create_task(probe_lag(lag))
+    display = asyncio.create_task(client.display_loop())
+    received_before, displayed_before = client.frames.received, client.frames_displayed
+    await asyncio.sleep(DURATION)
+    client.quit.set()
+    after = await inbound_stats(client.pc)
+    received = client.frames.received - received_before
+    displayed = client.frames_displayed - displayed_before
+    prober.cancel()
+    await display
+    await client.pc.close()
+
+    p50, p99, p100 = lag.percentiles(50, 99, 100)
+    return {
+        "lag_p50_ms": p50 * 1e3, "lag_p99_ms": p99 * 1e3, "lag_max_ms": p100 * 1e3,
+        "packets": after.packetsReceived - before.packetsReceived,
+        "lost": after.packetsLost - before.packetsLost,
+        "received_fps": received / DURATION, "displayed_fps": displayed / DURATION,
+    }
+
+
+def main():
+    sender = PublisherThread(SyntheticSource(WIDTH, HEIGHT, FPS), HOST, PORT)
+    sender.start()
+    sender.ready.wait(10)
+    print(f"{WIDTH}x{HEIGHT} at {FPS} fps over WebRTC loopback, {RENDER_SECONDS * 1000:.0f} ms redraw, "
+          f"{DURATION:.0f}s each")
+    for label, client_class in (("render on event loop", InlineClient), ("render thread", ThreadedClient)):
+        r = asyncio.run(run(client_class))
+        sender.close_peers()
+        print(f"  {label:<21} loop lag p50 {r['lag_p50_ms']:5.2f} ms  p99 {r['lag_p99_ms']:6.2f} ms  "
+              f"max {r['lag_max_ms']:6.2f} ms   {r['packets']:5d} packets, {r['lost']:3d} lost   "
+              f"{r['received_fps']:4.1f} fps received, {r['displayed_fps']:4.1f} displayed")
+
+
+if __name__ == "__main__":
+    main()
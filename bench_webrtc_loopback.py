@@ -0,0 +1,75 @@
+import asyncio
+import logging
+import time
+from frame_sources import SyntheticSource
+from stats import SampleRing
+from web_rtc_client import WebRTCClient
+from web_rtc_server import PublisherThread
+
+# Sustained frame rate from the car's publisher to the driver's client:
+# web_rtc_server's WebRTCPublisher with the synthetic source runs on its own
+# thread and event loop on loopback, WebRTCClient connects to it as it would
+# to the car and takes every newest frame as fast as it comes (converted,
+# nothing drawn). Encoding, RTP and decoding are real; only the camera and
+# the network are not.
+#
+#   python3 bench_webrtc_loopback.py
+
+HOST = '127.0.0.1'
+PORT = 8098
+MODES = ((640, 480, 30), (1280, 720, 30), (640, 480, 60))
+SETTLE_SECONDS = 2.0  # Connection, first keyframe and encoder bitrate ramp
+DURATION = 10.0
+
+
+async def run(port):
+    client = WebRTCClient(f"http://{HOST}:{port}")
+    await client.connect()
+    while client.video_track is None:
+        await asyncio.sleep(0.05)
+
+    async def display():
+        while True:
+            try:
+                img = await client.next_image(timeout=1.0)
+            except asyncio.TimeoutError:
+                continue
+            client.frames_displayed += 1
+            client.release_image(img)
+
+    consumer = asyncio.create_task(display())
+    await asyncio.sleep(SETTLE_SECONDS)
+    received, displayed = client.frames.received, client.frames_displayed
+    client.frame_age = SampleRing(4096)  # Ages from here on only
+    start = time.monotonic()
+    await asyncio.sleep(DURATION)
+    elapsed = time.monotonic() - start
+    stats = client.stats()
+    consumer.cancel()
+    await client.pc.close()
+    return {
+        "received_fps": (stats["received"] - received) / elapsed,
+        "displayed_fps": (stats["displayed"] - displayed) / elapsed,
+        "age_p50_ms": stats["age_p50_ms"],
+        "age_p99_ms": stats["age_p99_ms"],
+    }
+
+
+def main():
+    logging.getLogger().setLevel(logging.WARNING)
+    print(f"WebRTC loopback, synthetic source, {DURATION:.0f}s each after {SETTLE_SECONDS:.0f}s to settle")
+    for i, (width, height, fps) in enumerate(MODES):
+        port = PORT + i
+        publisher = PublisherThread(SyntheticSource(width, height, fps), HOST, port)
+        publisher.start()
+        publisher.ready.wait(10)
+        r = asyncio.run(run(port))
+        captured = publisher.publisher.capture.captured
+        publisher.stop()
+        print(f"  {width}x{height} at {fps} fps  {r['received_fps']:5.1f} fps received  "
+              f"{r['displayed_fps']:5.1f} fps converted  age p50 {r['age_p50_ms']:6.1f} ms  "
+              f"p99 {r['age_p99_ms']:6.1f} ms   ({captured} frames captured)")
+
+
+if __name__ == "__main__":
+    main()
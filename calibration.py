@@ -0,0 +1,194 @@
+import json
+import os
+import threading
+
+# Keys of the calibration file, all pulse widths in microseconds. Anything
+# missing from the file keeps its default.
+DEFAULTS = {
+    "servo_min": 600,  # Full left
+    "servo_max": 2400,  # Full right
+    "servo_trim": 0,  # Added to every steering pulse, shifts the straight-ahead point
+    "esc_min": 1000,  # Full reverse or brake
+    "esc_max": 2000,  # Full forward
+    "esc_neutral": 1500,
+}
+PULSE_RANGE = (500, 2500)  # What pigpio accepts for a servo pulse
+
+
+class CalibrationError(ValueError):
+    pass
+
+
+class Calibration:
+    """One set of pulse limits, with the steering table built from it.
+
+    Never modified after construction: a change builds a new Calibration and
+    swaps the reference, so a tick that picked one up sees it complete.
+    """
+
+    def __init__(self, servo_min, servo_max, servo_trim, esc_min, esc_max, esc_neutral):
+        values = dict(servo_min=servo_min, servo_max=servo_max, servo_trim=servo_trim,
+                      esc_min=esc_min, esc_max=esc_max, esc_neutral=esc_neutral)
+        for key, value in values.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise CalibrationError(f"{key} must be a number, got {value!r}")
+            if key != 'servo_trim' and not PULSE_RANGE[0] <= value <= PULSE_RANGE[1]:
+                raise CalibrationError(f"{key} {value} outside {PULSE_RANGE[0]}-{PULSE_RANGE[1]} us")
+        if not servo_min < servo_max:
+            raise CalibrationError(f"servo_min {servo_min} must be below servo_max {servo_max}")
+        if not esc_min <= esc_neutral <= esc_max or esc_min == esc_max:
+            raise CalibrationError(f"need esc_min <= esc_neutral <= esc_max, got {esc_min}/{esc_neutral}/{esc_max}")
+        if abs(servo_trim) > (servo_max - servo_min) / 2:
+            raise CalibrationError(f"servo_trim {servo_trim} is more than half the steering range")
+
+        self.servo_min = servo_min
+        self.servo_max = servo_max
+        self.servo_trim = servo_trim
+        self.esc_min = esc_min
+        self.esc_max = esc_max
+        self.esc_neutral = esc_neutral
+        # Steering arrives as an int 0-90, so the servo mapping is precomputed once per calibration
+        self.servo_table = tuple(self.servo_pulse(s) for s in range(91))
+        self.servo_center = self.servo_pulse(45)
+
+    @classmethod
+    def from_dict(cls, values):
+        unknown = set(values) - set(DEFAULTS)
+        if unknown:
+            raise CalibrationError(f"unknown calibration keys: {', '.join(sorted(unknown))}")
+        return cls(**dict(DEFAULTS, **values))
+
+    def as_dict(self):
+        return {key: getattr(self, key) for key in DEFAULTS}
+
+    def replace(self, **changes):
+        return Calibration.from_dict(dict(self.as_dict(), **changes))
+
+    def servo_pulse(self, steering):
+        pulse = steering * (self.servo_max - self.servo_min) / 90 + self.servo_min + self.servo_trim
+        return max(self.servo_min, min(self.servo_max, pulse))
+
+    def esc_pulse(self, motor):
+        return max(self.esc_min, min(self.esc_max, motor))
+
+    def safe_pulses(self):
+        return self.servo_center, self.esc_neutral
+
+
+class CalibrationFile:
+    """A JSON calibration file with a local override file, polled for changes.
+
+    `path` holds the committed defaults and is never written; `override_path`
+    holds this car's own values, e.g. trims, and wins key by key. Either may
+    be missing: `current` is built from whichever exist, the defaults while
+    neither does, and a file is picked up once created. An edit is parsed and
+    validated as a whole before it replaces `current`; a broken edit is
+    reported and ignored, so the car keeps driving on the old values.
+    update() saves to the override file only, or to `path` if there is none.
+    `on_change(old, new)` runs on the watcher thread after each swap.
+    """
+
+    def __init__(self, path, override_path=None, on_change=None):
+        self.path = path
+        self.override_path = override_path
+        self.on_change = on_change
+        self.reloads = 0
+        self.errors = 0
+        self._lock = threading.Lock()  # Serialises reloads with update()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._stamp = self._files_stamp()
+        self._override = {}  # Values read from the override file
+        self.current = self._read()
+
+    @staticmethod
+    def _file_stamp(path):
+        if path is None:
+            return None
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def _files_stamp(self):
+        return self._file_stamp(self.path), self._file_stamp(self.override_path)
+
+    @staticmethod
+    def _read_values(path):
+        """The JSON object in `path`, {} if it does not exist."""
+        try:
+            with open(path) as f:
+                values = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except json.JSONDecodeError as e:
+            raise CalibrationError(f"{path}: {e}") from None
+        if not isinstance(values, dict):
+            raise CalibrationError(f"{path}: expected a JSON object")
+        return values
+
+    def _read(self):
+        values = self._read_values(self.path)
+        override = {} if self.override_path is None else self._read_values(self.override_path)
+        calibration = Calibration.from_dict(dict(values, **override))
+        self._override = override
+        return calibration
+
+    def _write(self, values):
+        """Replaces the file update() saves to in one rename, so a reader never sees half of it."""
+        path = self.path if self.override_path is None else self.override_path
+        temp = f"{path}.tmp"
+        with open(temp, 'w') as f:
+            json.dump(values, f, indent=2)
+            f.write("\n")
+        os.replace(temp, path)
+        self._stamp = self._files_stamp()
+
+    def _swap(self, calibration):
+        old, self.current = self.current, calibration
+        if self.on_change is not None and calibration.as_dict() != old.as_dict():
+            self.on_change(old, calibration)
+
+    def reload_if_changed(self):
+        """Re-reads the files if either changed on disk; returns True if the calibration was replaced."""
+        with self._lock:
+            stamp = self._files_stamp()
+            if stamp == (None, None) or stamp == self._stamp:
+                return False
+            self._stamp = stamp
+            try:
+                calibration = self._read()
+            except (OSError, CalibrationError) as e:
+                self.errors += 1
+                print(f"\n⚠️ Calibration not reloaded, keeping the current one: {e}")
+                return False
+            self.reloads += 1
+            self._swap(calibration)
+            return True
+
+    def update(self, **changes):
+        """Applies `changes` now and saves them as overrides; raises CalibrationError if invalid."""
+        with self._lock:
+            calibration = self.current.replace(**changes)
+            if self.override_path is None:
+                self._write(calibration.as_dict())
+            else:
+                self._override = dict(self._override, **changes)
+                self._write(self._override)
+            self._swap(calibration)
+            return calibration
+
+    def watch(self, interval=0.5):
+        """Starts polling the file every `interval` seconds."""
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="calibration", daemon=True)
+        self._thread.start()
+
+    def _run(self, interval):
+        while not self._stop_event.wait(interval):
+            self.reload_if_changed()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -1,11 +1,14 @@
 import socket
 import json
 import pygame
-import time
+from scheduler import TickScheduler
+from hud import StatusRenderer
 
 # ---------------- Server Configuration ----------------
 SERVER_IP = '192.168.16.101'   # Raspberry Pi IP
 PORT      = 5050
+SEND_RATE_HZ = 100  # 50-1000 Hz, paced on absolute deadlines
+HUD_RATE_HZ  = 10   # Console status redraws per second
 
 # ---------------- Controller Configuration ----------------
 BUTTON_GEAR_UP   = 10
@@ -62,9 +65,13 @@ except Exception as e:
 current_gear_index   = 1  # Start in Neutral
 gear_up_last_state   = False
 gear_down_last_state = False
+scheduler = TickScheduler(SEND_RATE_HZ)
+hud = StatusRenderer(lambda controls: f"Sending: {controls}", HUD_RATE_HZ)
+hud.start()
 
 try:
     while True:
+        scheduler.wait()
         pygame.event.pump()
 
         steer_axis = joystick.get_axis(AXIS_STEERING)
@@ -130,15 +137,16 @@ try:
             print("\n❌ Server disconnected.")
             break
 
-        # Optional: reduce print frequency for less CPU usage
-        print(f"\rSending: {controls}", end="")
-
-        time.sleep(0.01)  # faster update rate, ~100Hz
+        # Drawn by the HUD thread at HUD_RATE_HZ, never blocks the send loop
+        hud.publish(controls)
 
 except KeyboardInterrupt:
     print("\n🛑 Shutting down client...")
 
 finally:
+    hud.stop()
+    stats = scheduler.stats()
+    print(f"⏱️ Achieved {stats['achieved_hz']:.1f}/{SEND_RATE_HZ} Hz, jitter p99 {stats['jitter_p99_ms']:.3f} ms")
     client_socket.close()
     pygame.quit()
     print("✅ Closed cleanly.")
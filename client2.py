@@ -1,10 +1,27 @@
 import socket
-import json
 import pygame
 import time
+import protocol
+import control_log
+from acks import AckReader, LatencyTracker
+from link import ReconnectingLink
+from stats import SampleRing
+from scheduler import TickScheduler
+from hud import StatusRenderer
+from curves import CurveEngine
 
 SERVER_IP = '192.168.16.101'  # Your Pi's IP
 PORT = 5050
+TRANSPORT = 'tcp'  # 'tcp' or 'udp', must match server2.py
+INPUT_MODE = 'events'  # 'poll': send every tick; 'events': send as soon as an input changes
+SEND_RATE_HZ = 100  # Poll mode tick rate, 50-1000 Hz
+HUD_RATE_HZ = 10  # Console status redraws per second, drawn on its own thread
+KEEPALIVE_INTERVAL = 0.1  # Idle resend period in events mode, keep below server COMMAND_DEADLINE
+CONTROL_LOG_DIR = 'logs'  # Binary log of every frame sent, for replay_log.py; None to disable
+REQUEST_ACKS = True  # Ask the server to ack applied commands; RTT, latency and loss go in the HUD
+CONNECT_TIMEOUT = 1.0  # Seconds per connect attempt, so a powered-off Pi does not hang the worker
+RECONNECT_BACKOFF = (0.05, 0.25)  # First and longest wait between attempts, doubling in between
+ACK_SILENCE_TIMEOUT = 1.0  # UDP with acks: seconds without one before the link counts as dropped
 
 BUTTON_GEAR_UP = 10
 BUTTON_GEAR_DOWN = 9
@@ -24,24 +41,141 @@ GAS_DEADZONE = 0.05
 BRAKE_DEADZONE = 0.05
 GAS_THRESHOLD_RUN = 0.6
 PWM_NEUTRAL = 1500
+THROTTLE_SHAPES = {}  # Per gear, e.g. {'1': ('expo', 0.4)}; missing gears keep the linear ramp
+STEERING_SHAPE = ('linear',)  # Or ('expo', k) / ('piecewise', [(0, 0), ..., (1, 1)])
 
-
-def get_gear_range(gear: str) -> tuple[int, int]:
-    factor = GEAR_SPEED_MULTIPLIER.get(gear, 1)
-    gear_min = 1575 + (factor - 1) * 25
-    return gear_min, gear_min + 25
+curves = CurveEngine(GEAR_SPEED_MULTIPLIER, GAS_DEADZONE, BRAKE_DEADZONE, GAS_THRESHOLD_RUN, PWM_NEUTRAL,
+                     throttle_shapes=THROTTLE_SHAPES, steering_shape=STEERING_SHAPE)
 
 def connect_to_server():
-    while True:
+    """One connection attempt; raises on failure. Runs on the link's reconnect worker."""
+    options = (protocol.OPTION_ACKS,) if REQUEST_ACKS else ()
+    if TRANSPORT == 'udp':
+        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        s.connect((SERVER_IP, PORT))
+        wire_format = protocol.client_handshake_udp(s, options=options)
+    else:
+        s = socket.create_connection((SERVER_IP, PORT), timeout=CONNECT_TIMEOUT)
+        s.settimeout(None)
+        s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
         try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
-            s.connect((SERVER_IP, PORT))
-            print(f"✅ Connected to RC Car server at {SERVER_IP}:{PORT}")
-            return s
-        except Exception as e:
-            print(f"🔁 Reconnecting in 2s: {e}")
-            time.sleep(2)
+            wire_format = protocol.client_handshake(s, options=options)
+        except (OSError, protocol.ProtocolError):
+            s.close()
+            raise
+    print(f"\n✅ Connected to RC Car server at {SERVER_IP}:{PORT} ({wire_format})")
+    return s, protocol.FrameEncoder(wire_format)
+
+def link_up(sock, encoder):
+    if REQUEST_ACKS and encoder.fmt == protocol.FORMAT_BINARY:
+        AckReader(sock, latency, on_ack=link.heard).start()  # Exits by itself once the socket is closed
+
+def frame_sent(controls, encoder):
+    global packets_sent
+    packets_sent += 1
+    if session_log is not None:
+        session_log.record(control_log.KIND_SENT, protocol.ControlFrame(*controls, encoder.seq, encoder.timestamp))
+    hud.publish(controls)
+
+def shift_gear(step):
+    global current_gear_index
+    current_gear_index = max(0, min(len(GEAR_SEQUENCE) - 1, current_gear_index + step))
+
+def read_controls():
+    """Turns the current wheel and pedal positions into (steering, motor, gear, gas, brake)."""
+    gear = GEAR_SEQUENCE[current_gear_index]
+    steering, motor, gas, brake = curves.lookup(gear, joystick.get_axis(AXIS_STEERING),
+                                                joystick.get_axis(AXIS_GAS), joystick.get_axis(AXIS_BRAKE))
+    return steering, motor, gear, gas, brake
+
+def send_controls(controls):
+    """Sends one frame; returns False while the link is down and being reconnected."""
+    return link.send(controls)
+
+def render_status(controls):
+    steering, motor, gear, gas, brake = controls
+    status = "" if link.connected else "[link down] "
+    status += f"Sending: steering={steering} motor={motor} gear={gear} gas={gas:.2f} brake={brake:.2f}"
+    if REQUEST_ACKS:
+        status += "  | " + latency.summary()
+    return status + "  "
+
+def poll_loop():
+    """Reads the wheel and sends every tick, at SEND_RATE_HZ."""
+    gear_up_last_state = False
+    gear_down_last_state = False
+    last_sent = None
+
+    while True:
+        scheduler.wait()
+        pygame.event.pump()
+        polled = time.perf_counter()
+
+        gear_up = joystick.get_button(BUTTON_GEAR_UP)
+        gear_down = joystick.get_button(BUTTON_GEAR_DOWN)
+        if gear_up and not gear_up_last_state:
+            shift_gear(1)
+        if gear_down and not gear_down_last_state:
+            shift_gear(-1)
+        gear_up_last_state = gear_up
+        gear_down_last_state = gear_down
+
+        controls = read_controls()
+        if send_controls(controls) and controls != last_sent:
+            # From when the change was seen, as in events mode; the wait for
+            # the poll itself (up to one tick) is reported separately
+            input_latency.add(time.perf_counter() - polled)
+            last_sent = controls
+
+def event_loop():
+    """Sleeps until pygame reports input, sends at once, and keeps alive while idle."""
+    last_sent = None
+    last_send_time = 0.0
+
+    while True:
+        idle_for = time.perf_counter() - last_send_time
+        wait_ms = max(1, int((KEEPALIVE_INTERVAL - idle_for) * 1000))
+        events = [pygame.event.wait(wait_ms)] + pygame.event.get()
+        woke = time.perf_counter()
+
+        for event in events:
+            if event.type == pygame.JOYBUTTONDOWN:
+                if event.button == BUTTON_GEAR_UP:
+                    shift_gear(1)
+                elif event.button == BUTTON_GEAR_DOWN:
+                    shift_gear(-1)
+            elif event.type == pygame.QUIT:
+                return
+
+        controls = read_controls()
+        changed = controls != last_sent
+        if not changed and woke - last_send_time < KEEPALIVE_INTERVAL:
+            continue
+        sent = send_controls(controls)
+        last_send_time = time.perf_counter()  # While the link is down the worker resends the newest state
+        if sent and changed:
+            input_latency.add(last_send_time - woke)
+            last_sent = controls
+
+def print_send_stats():
+    elapsed = time.perf_counter() - started
+    p50, p99 = input_latency.percentiles(50, 99)
+    unseen = "" if INPUT_MODE == 'events' else f", plus up to {1000 / SEND_RATE_HZ:.2f} ms until the next poll"
+    print(f"📈 {INPUT_MODE}: {packets_sent / elapsed:.1f} packets/s over {elapsed:.0f}s, "
+          f"input seen→send p50 {p50 * 1000:.2f} ms, p99 {p99 * 1000:.2f} ms{unseen}")
+    if link.reconnects:
+        print(f"🔁 {link.reconnects} reconnects, last outage {link.last_outage or 0:.2f}s")
+    if latency.acked:
+        rtt_p50, rtt_p99 = latency.rtt.percentiles(50, 99)
+        pins_p50, pins_p99 = latency.to_pins.percentiles(50, 99)
+        print(f"📨 {latency.acked} acks: RTT p50 {rtt_p50 * 1000:.2f} ms, p99 {rtt_p99 * 1000:.2f} ms, "
+              f"send→pins p50 {pins_p50 * 1000:.2f} ms, p99 {pins_p99 * 1000:.2f} ms, "
+              f"clock offset {latency.offset_ns / 1e6:+.3f} ms, lost {latency.lost}, reordered {latency.reordered}")
+    if INPUT_MODE != 'events':
+        stats = scheduler.stats()
+        print(f"⏱️ Tick rate {stats['achieved_hz']:.1f}/{stats['target_hz']} Hz, jitter p50 "
+              f"{stats['jitter_p50_ms']:.3f} ms, p99 {stats['jitter_p99_ms']:.3f} ms, "
+              f"max {stats['jitter_max_ms']:.3f} ms, {stats['overruns']} overruns")
 
 pygame.init()
 pygame.joystick.init()
@@ -55,81 +189,38 @@ joystick = pygame.joystick.Joystick(0)
 joystick.init()
 print(f"✅ Joystick '{joystick.get_name()}' initialized.")
 
-client_socket = connect_to_server()
+latency = LatencyTracker()
+session_log = None
+if CONTROL_LOG_DIR:
+    session_log = control_log.ControlLogWriter(
+        control_log.log_path(CONTROL_LOG_DIR, control_log.SOURCE_CLIENT), control_log.SOURCE_CLIENT)
+    print(f"📝 Logging frames to {session_log.path}")
 current_gear_index = 1
-gear_up_last_state = False
-gear_down_last_state = False
-
+packets_sent = 0
+input_latency = SampleRing()
+scheduler = TickScheduler(SEND_RATE_HZ)
+hud = StatusRenderer(render_status, HUD_RATE_HZ)
+silence_timeout = ACK_SILENCE_TIMEOUT if TRANSPORT == 'udp' and REQUEST_ACKS else None
+link = ReconnectingLink(connect_to_server, link_up, frame_sent, *RECONNECT_BACKOFF, silence_timeout=silence_timeout)
+print(f"🔌 Connecting to RC Car server at {SERVER_IP}:{PORT}...")
+link.start()
+hud.start()
+started = time.perf_counter()
 
 try:
-    while True:
-        pygame.event.pump()
-
-        steer_axis = joystick.get_axis(AXIS_STEERING)
-        gas_raw = joystick.get_axis(AXIS_GAS)
-        brake_raw = joystick.get_axis(AXIS_BRAKE)
-
-        gas = max(0, min(1, -(gas_raw - 1) / 2))
-        brake = max(0, min(1, -(brake_raw - 1) / 2))
-
-        if gas < GAS_DEADZONE: gas = 0
-        if brake < BRAKE_DEADZONE: brake = 0
-
-        gear_up = joystick.get_button(BUTTON_GEAR_UP)
-        gear_down = joystick.get_button(BUTTON_GEAR_DOWN)
-
-        if gear_up and not gear_up_last_state and current_gear_index < len(GEAR_SEQUENCE) - 1:
-            current_gear_index += 1
-        if gear_down and not gear_down_last_state and current_gear_index > 0:
-            current_gear_index -= 1
-
-        gear_up_last_state = gear_up
-        gear_down_last_state = gear_down
-
-        gear = GEAR_SEQUENCE[current_gear_index]
-        steering = int((-steer_axis + 1) * 45)
-        motor = PWM_NEUTRAL
-
-        if gear == 'R':
-            if gas > GAS_DEADZONE:
-                motor = PWM_NEUTRAL - int(40 * gas)
-        elif gear == 'N':
-            motor = PWM_NEUTRAL
-        elif gear in GEAR_SPEED_MULTIPLIER:
-            if gas > GAS_THRESHOLD_RUN:
-                gear_min, gear_max = get_gear_range(gear)
-                scaled = min(1, max(0, (gas - 0.5) * 2))
-                forward = int(gear_min + (gear_max - gear_min) * scaled)
-                motor = forward
-            else:
-                motor = PWM_NEUTRAL
-
-            motor -= int(50 * brake)
-            motor = max(PWM_NEUTRAL, min(2000, motor))
-
-        controls = {
-            "steering": steering,
-            "motor": motor,
-            "gear": gear,
-            "gas": round(gas, 2),
-            "brake": round(brake, 2)
-        }
-
-        try:
-            client_socket.sendall((json.dumps(controls) + '\n').encode('utf-8'))
-        except (BrokenPipeError, ConnectionResetError):
-            print("\n❌ Server lost. Reconnecting...")
-            client_socket.close()
-            client_socket = connect_to_server()
-            continue
-
-        print(f"\rSending: {controls}", end="")
-        time.sleep(0.01)  # 100 Hz update rate
+    if INPUT_MODE == 'events':
+        event_loop()
+    else:
+        poll_loop()
 
 except KeyboardInterrupt:
     print("\n🛑 Client stopped.")
 
 finally:
-    client_socket.close()
+    hud.stop()
+    link.stop()
+    print_send_stats()
+    if session_log is not None:
+        session_log.close()
     pygame.quit()
     print("✅ Closed cleanly.")
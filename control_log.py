@@ -0,0 +1,120 @@
+import os
+import struct
+import time
+import protocol
+
+# --- Record Format ---
+# A log is a 16-byte header followed by fixed 32-byte little-endian records, so it
+# can be appended to with one write per record and mapped straight into NumPy:
+#   header: 6s magic | B version | B source | Q wall clock at open (ns)
+#   record: Q t_ns (monotonic) | I seq | h steering | H motor | B gear index | B gas
+#           | B brake | B kind | H servo_us | H esc_us | Q client timestamp (ns)
+LOG_MAGIC = b'RCLOG\0'
+LOG_VERSION = 1
+HEADER = struct.Struct('<6sBBQ')
+RECORD = struct.Struct('<QIhHBBBBHHQ')
+
+SOURCE_CLIENT = 0
+SOURCE_SERVER = 1
+
+KIND_SENT = 0     # Client: frame handed to the socket
+KIND_APPLIED = 1  # Server: command written to the pins
+KIND_SAFE = 2     # Server: safe pulses written (disconnect or watchdog)
+
+RECORD_FIELDS = [
+    ('t_ns', '<u8'), ('seq', '<u4'), ('steering', '<i2'), ('motor', '<u2'),
+    ('gear', 'u1'), ('gas', 'u1'), ('brake', 'u1'), ('kind', 'u1'),
+    ('servo_us', '<u2'), ('esc_us', '<u2'), ('client_ts', '<u8'),
+]
+
+
+class ControlLogWriter:
+    """Appends fixed-width records to a binary control log.
+
+    Records are packed into one reusable buffer and go through a large write
+    buffer that is flushed about once a second, so logging at 100 Hz costs a
+    pack_into and a memcpy per record.
+    """
+
+    def __init__(self, path, source, flush_interval=1.0):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.records = 0
+        self.skipped = 0
+        self.flush_interval = flush_interval
+        self._file = open(path, 'ab', buffering=1 << 16)
+        if self._file.tell() == 0:
+            self._file.write(HEADER.pack(LOG_MAGIC, LOG_VERSION, source, time.time_ns()))
+        self._record = bytearray(RECORD.size)
+        self._last_flush = time.monotonic()
+
+    def record(self, kind, frame, servo_us=0, esc_us=0, t_ns=None):
+        """Logs one control frame (protocol.ControlFrame) with the pulses it produced.
+
+        A frame whose fields do not fit the record (out of range, not numbers)
+        is counted in `skipped` and not written; logging never raises into
+        the output path over a bad value.
+        """
+        try:
+            RECORD.pack_into(
+                self._record, 0,
+                time.monotonic_ns() if t_ns is None else t_ns,
+                frame.seq & 0xFFFFFFFF,
+                int(frame.steering),
+                int(frame.motor),
+                protocol.GEAR_INDEX.get(frame.gear, protocol.NEUTRAL_INDEX),
+                int(round(frame.gas * 100)),
+                int(round(frame.brake * 100)),
+                kind,
+                int(servo_us),
+                int(esc_us),
+                frame.timestamp,
+            )
+        except (struct.error, TypeError, ValueError, OverflowError):
+            self.skipped += 1
+            return
+        self._file.write(self._record)
+        self.records += 1
+        now = time.monotonic()
+        if now - self._last_flush >= self.flush_interval:
+            self._file.flush()
+            self._last_flush = now
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+def log_path(directory, source):
+    """Fresh timestamped file name for a session log."""
+    name = 'client' if source == SOURCE_CLIENT else 'server'
+    return os.path.join(directory, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.rclog")
+
+
+def read_header(path):
+    with open(path, 'rb') as f:
+        magic, version, source, opened_ns = HEADER.unpack(f.read(HEADER.size))
+    if magic != LOG_MAGIC or version != LOG_VERSION:
+        raise ValueError(f"{path} is not a version {LOG_VERSION} control log")
+    return source, opened_ns
+
+
+def load_log(path):
+    """Maps the records of a log as a NumPy structured array, without parsing."""
+    import numpy as np
+
+    read_header(path)
+    count = (os.path.getsize(path) - HEADER.size) // RECORD.size
+    if count == 0:
+        return np.zeros(0, dtype=np.dtype(RECORD_FIELDS))
+    return np.memmap(path, dtype=np.dtype(RECORD_FIELDS), mode='r', offset=HEADER.size, shape=(count,))
+
+
+def to_frame(record):
+    """Turns one log record back into a protocol.ControlFrame."""
+    return protocol.ControlFrame(
+        int(record['steering']), int(record['motor']), protocol.GEAR_CODES[int(record['gear'])],
+        int(record['gas']) / 100, int(record['brake']) / 100, int(record['seq']), int(record['client_ts']),
+    )
@@ -0,0 +1,154 @@
+import threading
+import time
+import control_log
+import protocol
+from stats import SampleRing
+from profiler import ACK, LOG, PULSES, WAIT, WRITE
+
+
+class ControlLoop(threading.Thread):
+    """Writes the latest submit()ted command to the outputs at `rate_hz`, on its own thread.
+
+    Safe pulses are written until `hold_until` (ESC arming) and whenever no
+    fresh command came within `deadline`; a failing tick is counted in
+    `errors` and goes safe, and the thread only exits on stop().
+    """
+
+    def __init__(self, output, compute_pulses, safe_pulses, rate_hz=200, deadline=0.25, history=4096,
+                 log=None, on_apply=None, hold_until=None, on_armed=None, profiler=None):
+        super().__init__(name="control-loop", daemon=True)
+        self.output = output
+        self.compute_pulses = compute_pulses
+        self.safe_pulses = safe_pulses
+        self.period = 1 / rate_hz
+        self.deadline = deadline
+        self.ticks = 0
+        self.missed = 0
+        self.watchdog_trips = 0
+        self.errors = 0
+        self.log = log
+        self.on_apply = on_apply  # (frame, received_ns, applied_ns) after each new command's write; must not block
+        self.applied = None  # Frame whose pulses are on the pins, None while safe
+        self.hold_until = hold_until
+        self.on_armed = on_armed  # Called once at hold_until, before the newest command is applied
+        self.armed = threading.Event()
+        self.profiler = profiler
+        self._latest = None  # (frame, monotonic receive time, receive ns), swapped atomically
+        self.history = history
+        self.jitter = SampleRing(history)  # Tick wake-up lateness, seconds
+        self._stop_event = threading.Event()
+
+    def submit(self, frame, received_ns=None):
+        """Hands over the newest command, clamped into range; raises protocol.ProtocolError if unusable."""
+        frame = protocol.clamp_frame(frame)
+        now = time.monotonic_ns() if received_ns is None else received_ns
+        self._latest = (frame, now / 1e9, now)
+
+    def clear(self):
+        """Drops the current command; the next tick writes the safe pulses."""
+        self._latest = None
+
+    def stop(self):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join()
+
+    def run(self):
+        period = self.period
+        tripped = True  # Nothing to drive yet counts as safe, not as a trip
+        applied = None  # Command currently on the pins, None while safe
+        profiler = self.profiler
+        holding = self.hold_until is not None
+        if not holding:
+            self.armed.set()
+        next_tick = time.monotonic()
+
+        while not self._stop_event.is_set():
+            now = time.monotonic()
+            just_armed = holding and now >= self.hold_until
+            if just_armed:
+                holding = False
+                next_tick = now  # Tick from the arming instant on
+                self.armed.set()
+            lateness = now - next_tick
+            self.jitter.add(lateness)
+            self.ticks += 1
+            if lateness > period:
+                skipped = int(lateness / period)
+                self.missed += skipped
+                next_tick += skipped * period
+
+            latest = self._latest
+            try:
+                if holding or latest is None or now - latest[1] > self.deadline:
+                    if not tripped and not holding and latest is not None:
+                        self.watchdog_trips += 1
+                        print(f"\n⏰ No command for {self.deadline * 1000:.0f} ms, going neutral.")
+                    tripped = True
+                    pulses = self.safe_pulses()
+                    self.output.write(*pulses)
+                    if applied is not None:
+                        if self.log is not None:
+                            self.log.record(control_log.KIND_SAFE, applied, *pulses)
+                        applied = self.applied = None
+                else:
+                    tripped = False
+                    frame = latest[0]
+                    if profiler is not None:
+                        if frame is not applied:
+                            profiler.add(WAIT, time.monotonic_ns() - latest[2])
+                        t = time.perf_counter_ns()
+                    pulses = self.compute_pulses(frame)
+                    if profiler is not None:
+                        t = profiler.record(PULSES, t)
+                    self.output.write(*pulses)
+                    if profiler is not None:
+                        t = profiler.record(WRITE, t)
+                    if frame is not applied:
+                        applied = self.applied = frame
+                        applied_ns = time.monotonic_ns()
+                        if self.log is not None:
+                            self.log.record(control_log.KIND_APPLIED, frame, *pulses, t_ns=applied_ns)
+                            if profiler is not None:
+                                t = profiler.record(LOG, t)
+                        if self.on_apply is not None:
+                            self.on_apply(frame, latest[2], applied_ns)
+                            if profiler is not None:
+                                profiler.record(ACK, t)
+            except Exception as e:
+                self.errors += 1
+                print(f"\n⚠️ Output loop error, going neutral: {e!r}")
+                if self._latest is latest:
+                    self._latest = None  # Do not retry the command that failed
+                tripped = True
+                applied = self.applied = None
+                try:
+                    self.output.write(*self.safe_pulses())
+                except Exception as e:
+                    print(f"⚠️ Could not write the safe pulses: {e!r}")
+
+            if just_armed and self.on_armed is not None:
+                self.on_armed()  # After the first command is already on the pins
+
+            next_tick += period
+            wake = min(next_tick, self.hold_until) if holding else next_tick
+            delay = wake - time.monotonic()
+            if delay > 0:
+                self._stop_event.wait(delay)
+
+    def reset_stats(self):
+        """Starts the counters and the jitter history over, e.g. between benchmark steps."""
+        self.ticks = self.missed = self.watchdog_trips = self.errors = 0
+        self.jitter = SampleRing(self.history)
+
+    def stats(self):
+        p50, p99, p100 = self.jitter.percentiles(50, 99, 100)
+        return {
+            "ticks": self.ticks,
+            "missed": self.missed,
+            "watchdog_trips": self.watchdog_trips,
+            "errors": self.errors,
+            "jitter_p50_ms": p50 * 1e3,
+            "jitter_p99_ms": p99 * 1e3,
+            "jitter_max_ms": p100 * 1e3,
+        }
@@ -0,0 +1,97 @@
+import numpy as np
+
+# pygame reports joystick axes as raw int16 / 32768, so there are exactly 65536
+# positions an axis can be in. Tables indexed by that raw value reproduce the
+# scalar math bit for bit, with no interpolation error.
+AXIS_STEPS = 65536
+AXIS_OFFSET = 32768
+AXIS = np.arange(AXIS_STEPS, dtype=np.float64) / 32768 - 1.0
+
+
+def axis_index(value):
+    """Raw table index of a pygame axis value in [-1, 1]."""
+    index = int(value * 32768) + AXIS_OFFSET
+    return 0 if index < 0 else AXIS_STEPS - 1 if index >= AXIS_STEPS else index
+
+
+def shape_curve(spec, x):
+    """Applies a response shape to x in [0, 1].
+
+    ('linear',)                          straight line
+    ('expo', k)                          (1 - k) * x + k * x^3, k in [0, 1], softer near zero
+    ('piecewise', [(x0, y0), (x1, y1)])  straight segments through the given points
+    """
+    kind = spec[0]
+    if kind == 'linear':
+        return x
+    if kind == 'expo':
+        k = spec[1]
+        return (1 - k) * x + k * x ** 3
+    if kind == 'piecewise':
+        xs, ys = zip(*spec[1])
+        return np.interp(x, xs, ys)
+    raise ValueError(f"unknown curve shape {kind!r}")
+
+
+class CurveEngine:
+    """Throttle, brake and steering curves compiled into lookup tables at startup.
+
+    The defaults reproduce client2.py's scalar math exactly. Each forward gear
+    can get its own shape through `throttle_shapes`, e.g. {'1': ('expo', 0.4)}.
+    Tables are built with NumPy once and then kept as plain lists, so a tick
+    costs a few list indexes and returns Python ints ready to encode.
+    """
+
+    def __init__(self, gear_multipliers, gas_deadzone=0.05, brake_deadzone=0.05, run_threshold=0.6,
+                 neutral=1500, max_pulse=2000, reverse_span=40, brake_span=50, gear_base=1575,
+                 gear_step=25, throttle_shapes=None, steering_shape=('linear',)):
+        throttle_shapes = throttle_shapes or {}
+        self.neutral = neutral
+        self.max_pulse = max_pulse
+
+        # Pedals rest at +1 and read -1 fully pressed
+        gas = np.clip(-(AXIS - 1) / 2, 0, 1)
+        gas[gas < gas_deadzone] = 0
+        brake = np.clip(-(AXIS - 1) / 2, 0, 1)
+        brake[brake < brake_deadzone] = 0
+
+        deflection = shape_curve(steering_shape, np.abs(AXIS)) * np.sign(AXIS)
+        self.steering_table = np.trunc((-deflection + 1) * 45).astype(np.int64)
+        self.gas_table = gas
+        self.brake_table = brake
+        self.brake_cut_table = np.trunc(brake_span * brake).astype(np.int64)
+        self.reverse_table = np.where(gas > gas_deadzone, neutral - np.trunc(reverse_span * gas), neutral).astype(np.int64)
+
+        scaled = np.clip((gas - 0.5) * 2, 0, 1)
+        self.forward_tables = {}
+        for gear, factor in gear_multipliers.items():
+            gear_min = gear_base + (factor - 1) * gear_step
+            gear_max = gear_min + gear_step
+            shaped = shape_curve(throttle_shapes.get(gear, ('linear',)), scaled)
+            forward = np.trunc(gear_min + (gear_max - gear_min) * shaped)
+            self.forward_tables[gear] = np.where(gas > run_threshold, forward, neutral).astype(np.int64)
+
+        # Per-tick lookups go through lists: indexing them is several times
+        # cheaper than indexing ndarrays and yields ints instead of numpy scalars.
+        self._steering = self.steering_table.tolist()
+        self._gas = [round(g, 2) for g in gas.tolist()]
+        self._brake = [round(b, 2) for b in brake.tolist()]
+        self._brake_cut = self.brake_cut_table.tolist()
+        self._reverse = self.reverse_table.tolist()
+        self._forward = {gear: table.tolist() for gear, table in self.forward_tables.items()}
+
+    def lookup(self, gear, steer_axis, gas_axis, brake_axis):
+        """Returns (steering, motor, gas, brake) for one tick of raw axis values."""
+        gas_index = axis_index(gas_axis)
+        brake_index = axis_index(brake_axis)
+        steering = self._steering[axis_index(steer_axis)]
+
+        forward = self._forward.get(gear)
+        if forward is not None:
+            motor = forward[gas_index] - self._brake_cut[brake_index]
+            motor = self.neutral if motor < self.neutral else self.max_pulse if motor > self.max_pulse else motor
+        elif gear == 'R':
+            motor = self._reverse[gas_index]
+        else:
+            motor = self.neutral
+        return steering, motor, self._gas[gas_index], self._brake[brake_index]
@@ -0,0 +1,90 @@
+import re
+import time
+
+# Stand-in for the pigpio module so the server code can run without a Pi.
+# Use it as `import fake_pigpio as pigpio`. Every daemon command counts as one
+# round trip and every pulse that reaches a pin is logged with its time.
+
+OUTPUT = 1
+INPUT = 0
+PI_SCRIPT_INITING = 0
+PI_SCRIPT_HALTED = 1
+PI_SCRIPT_RUNNING = 2
+
+_SERVO_STEP = re.compile(r'(?:s|servo)\s+(\S+)\s+(\S+)', re.IGNORECASE)
+
+
+class error(Exception):
+    pass
+
+
+class pi:
+    """Records what a pigpio.pi() connection would have sent to the daemon."""
+
+    def __init__(self, host='localhost', port=8888, latency=0.0):
+        self.connected = True
+        self.latency = latency  # Simulated daemon round trip, seconds
+        self.round_trips = 0
+        self.pulses = {}
+        self.modes = {}
+        self.log = []  # (monotonic_ns, gpio, pulsewidth)
+        self._scripts = {}
+
+    def _command(self):
+        self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _servo(self, gpio, pulsewidth):
+        pulsewidth = int(pulsewidth)
+        if pulsewidth != 0 and not 500 <= pulsewidth <= 2500:
+            raise error(f"bad pulsewidth {pulsewidth}")
+        self.pulses[gpio] = pulsewidth
+        self.log.append((time.monotonic_ns(), gpio, pulsewidth))
+
+    def set_mode(self, gpio, mode):
+        self._command()
+        self.modes[gpio] = mode
+
+    def set_servo_pulsewidth(self, user_gpio, pulsewidth):
+        self._command()
+        self._servo(user_gpio, pulsewidth)
+        return 0
+
+    def get_servo_pulsewidth(self, user_gpio):
+        self._command()
+        return self.pulses.get(user_gpio, 0)
+
+    def store_script(self, script):
+        self._command()
+        if isinstance(script, bytes):
+            script = script.decode('ascii')
+        steps = _SERVO_STEP.findall(script)
+        if not steps:
+            raise error("fake_pigpio only runs servo scripts")
+        script_id = len(self._scripts)
+        self._scripts[script_id] = steps
+        return script_id
+
+    def script_status(self, script_id):
+        self._command()
+        return PI_SCRIPT_HALTED, []
+
+    def run_script(self, script_id, params=None):
+        self._command()
+        params = params or []
+
+        def resolve(token):
+            return params[int(token[1:])] if token.lower().startswith('p') else int(token)
+
+        for gpio, pulsewidth in self._scripts[script_id]:
+            self._servo(resolve(gpio), resolve(pulsewidth))
+        return 0
+
+    def delete_script(self, script_id):
+        self._command()
+        self._scripts.pop(script_id, None)
+        return 0
+
+    def stop(self):
+        self.connected = False
@@ -0,0 +1,69 @@
+import threading
+import cv2
+import numpy as np
+
+
+class FramePool:
+    """Preallocated BGR buffers that decoded video frames are converted into.
+
+    convert() copies a yuv420p frame's planes into a staging buffer and has
+    OpenCV write the BGR result into a free pooled array, so steady-state
+    conversion allocates nothing. Hand each image back with release() once
+    it has been shown or dropped. If every buffer is out, a new one is
+    allocated and counted as a miss; images that are never released are
+    simply garbage collected. A frame of another size resizes the pool, and
+    other pixel formats fall back to PyAV's own conversion (not pooled), as
+    does everything with size 0.
+    """
+
+    def __init__(self, size=3):
+        self.size = size
+        self.shape = None
+        self.misses = 0
+        self.fallbacks = 0
+        self._free = []
+        self._lock = threading.Lock()
+        self._staging = threading.local()  # Per-thread yuv420p buffer, so conversions can overlap
+
+    def _acquire(self, width, height):
+        with self._lock:
+            if self.shape != (height, width, 3):
+                self.shape = (height, width, 3)
+                self._free = [np.empty(self.shape, np.uint8) for _ in range(self.size)]
+            if self._free:
+                return self._free.pop()
+            self.misses += 1
+        return np.empty((height, width, 3), np.uint8)
+
+    def _yuv(self, width, height):
+        yuv = getattr(self._staging, 'yuv', None)
+        if yuv is None or yuv.shape != (height * 3 // 2, width):
+            yuv = self._staging.yuv = np.empty((height * 3 // 2, width), np.uint8)
+        return yuv
+
+    def convert(self, frame):
+        """Returns `frame` (an av.VideoFrame) as a BGR ndarray, from the pool when possible."""
+        width, height = frame.width, frame.height
+        if not self.size or frame.format.name != 'yuv420p' or width % 2 or height % 4:
+            self.fallbacks += 1
+            return frame.to_ndarray(format="bgr24")
+
+        bgr = self._acquire(width, height)
+        yuv = self._yuv(width, height)
+
+        # I420 layout: full Y plane, then U and V at quarter size, each row-packed
+        quarter = height // 4
+        for plane, rows, plane_width, target in (
+                (frame.planes[0], height, width, yuv[:height]),
+                (frame.planes[1], height // 2, width // 2, yuv[height:height + quarter]),
+                (frame.planes[2], height // 2, width // 2, yuv[height + quarter:])):
+            source = np.frombuffer(plane, np.uint8).reshape(rows, plane.line_size)[:, :plane_width]
+            np.copyto(target.reshape(rows, plane_width), source)
+        cv2.cvtColor(yuv, cv2.COLOR_YUV2BGR_I420, dst=bgr)
+        return bgr
+
+    def release(self, image):
+        """Hands an image from convert() back; the caller must not touch it afterwards."""
+        with self._lock:
+            if image.shape == self.shape and image.flags.owndata and len(self._free) < self.size:
+                self._free.append(image)
@@ -0,0 +1,91 @@
+import time
+import cv2
+from av import VideoFrame
+from synthetic_video import test_pattern
+
+# Where the car's video comes from. The publisher's capture thread pulls
+# frames from a source; nothing here runs on the event loop. Every source has:
+#   width, height, fps  what it actually delivers, which a camera may round
+#   read()              blocks until the next frame, returns it as a yuv420p
+#                       av.VideoFrame, or None once the source has failed
+#   close()             releases the device
+# Pick one by name with open_source(); only 'camera' needs a camera.
+
+
+class CameraSource:
+    """A V4L2/USB camera through OpenCV, converted to yuv420p on the calling thread.
+
+    The driver's queue is cut to one buffer where it supports that, so a
+    read() that comes late gets a recent frame rather than a backlog.
+    """
+
+    name = 'camera'
+
+    def __init__(self, width=640, height=480, fps=30, device=0):
+        self.capture = cv2.VideoCapture(device)
+        if not self.capture.isOpened():
+            raise OSError(f"cannot open camera {device}")
+        self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        self.capture.set(cv2.CAP_PROP_FPS, fps)
+        self.capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self.width = int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or fps
+
+    def read(self):
+        ok, img = self.capture.read()
+        if not ok:
+            return None
+        return VideoFrame.from_ndarray(img, format="bgr24").reformat(format="yuv420p")
+
+    def close(self):
+        self.capture.release()
+
+
+class SyntheticSource:
+    """The moving test pattern from synthetic_video, paced like a camera at `fps`.
+
+    The `pattern_frames` distinct frames are converted once up front, so a
+    read() costs about what a camera driver's would.
+    """
+
+    name = 'synthetic'
+
+    def __init__(self, width=640, height=480, fps=30, pattern_frames=30):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.frames_read = 0
+        self._started = None
+        self._planes = [
+            VideoFrame.from_ndarray(test_pattern(width, height, i / pattern_frames), format="bgr24")
+            .reformat(format="yuv420p").to_ndarray()
+            for i in range(pattern_frames)
+        ]
+
+    def read(self):
+        if self._started is None:
+            self._started = time.monotonic()
+        else:
+            wait = self._started + self.frames_read / self.fps - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+        frame = VideoFrame.from_ndarray(self._planes[self.frames_read % len(self._planes)], format="yuv420p")
+        self.frames_read += 1
+        return frame
+
+    def close(self):
+        pass
+
+
+SOURCES = {source.name: source for source in (CameraSource, SyntheticSource)}
+
+
+def open_source(name, **options):
+    """Creates the frame source called `name` ('camera' or 'synthetic')."""
+    try:
+        source = SOURCES[name]
+    except KeyError:
+        raise ValueError(f"unknown frame source {name!r}, pick one of {', '.join(SOURCES)}") from None
+    return source(**options)
@@ -0,0 +1,159 @@
+import socket
+import protocol
+
+
+class Framer:
+    """Splits a byte stream into frames without copying the received bytes.
+
+    Data is received straight into a preallocated bytearray with recv_into and
+    frames are handed out as memoryview slices of it, valid until the next
+    receive; each frame still costs one small view object. Frames are newline-delimited until `frame_size` is set, after which
+    they are fixed-size binary records. Unread bytes are only moved back to the
+    front of the buffer when the free tail gets short.
+    """
+
+    def __init__(self, capacity=65536, frame_size=None, delimiter=b'\n'):
+        self._buf = bytearray(capacity)
+        self._view = memoryview(self._buf)
+        self._start = 0
+        self._end = 0
+        self._skipped = 0
+        self.frame_size = frame_size
+        self.delimiter = delimiter
+        self.compactions = 0
+
+    def __len__(self):
+        return self._end - self._start
+
+    # --- Receiving ---
+    def feed(self, data):
+        """Appends bytes that did not come from a socket (UDP payloads, tests)."""
+        self._make_room(len(data))
+        if len(data) > len(self._buf) - self._end:
+            raise protocol.ProtocolError("frame larger than the receive buffer")
+        self._view[self._end:self._end + len(data)] = data
+        self._end += len(data)
+
+    def recv_into(self, sock, flags=0):
+        """Receives into the free tail of the buffer; returns 0 on EOF."""
+        if self._start == self._end:
+            # Everything consumed, the usual case: receive into the whole buffer, no tail view
+            received = sock.recv_into(self._buf, 0, flags)
+            self._start, self._end = 0, received
+            return received
+        self._make_room()
+        if self._end == len(self._buf):
+            raise protocol.ProtocolError("frame larger than the receive buffer")
+        received = sock.recv_into(self._view[self._end:], 0, flags)
+        self._end += received
+        return received
+
+    def drain(self, sock):
+        """Pulls everything already queued in the kernel without blocking.
+
+        When the buffer fills up, complete frames other than the newest are
+        discarded and reported by the next latest(). Returns False on EOF.
+        """
+        while True:
+            if self._end == len(self._buf):
+                self._skip_to_latest()
+            try:
+                if self.recv_into(sock, socket.MSG_DONTWAIT) == 0:
+                    return False
+            except BlockingIOError:
+                return True
+
+    def _make_room(self, needed=1):
+        if self._start == self._end:
+            self._start = self._end = 0
+            return
+        free = len(self._buf) - self._end
+        if self._start == 0 or (free >= needed and free >= len(self._buf) // 4):
+            return
+        size = self._end - self._start
+        self._view[:size] = self._view[self._start:self._end]
+        self._start, self._end = 0, size
+        self.compactions += 1
+
+    # --- Framing ---
+    def next_frame(self):
+        """Consumes and returns the next complete frame, or None."""
+        start = self._start
+        if self.frame_size:
+            end = start + self.frame_size
+            if end > self._end:
+                return None
+            self._start = end
+            return self._view[start:end]
+
+        end = self._buf.find(self.delimiter, start, self._end)
+        if end < 0:
+            return None
+        self._start = end + len(self.delimiter)
+        return self._view[start:end]
+
+    def peek(self):
+        """Returns the next complete frame without consuming it, or None."""
+        start = self._start
+        frame = self.next_frame()
+        self._start = start
+        return frame
+
+    def frames(self):
+        """Every complete frame in order, consumed as they are iterated.
+
+        The usual single buffered frame comes back as a 1-tuple, which is
+        cheaper than starting a generator.
+        """
+        start, end = self._start, self._end
+        size = self.frame_size
+        if size:
+            if end - start == size:
+                self._start = end
+                return (self._view[start:end],)
+        elif self._buf.find(self.delimiter, start, end) == end - len(self.delimiter):
+            self._start = end
+            return (self._view[start:end - len(self.delimiter)],)
+        return self._frames()
+
+    def _frames(self):
+        view = self._view
+        if self.frame_size:
+            size = self.frame_size
+            while self._end - self._start >= size:
+                start = self._start
+                self._start = start + size
+                yield view[start:start + size]
+            return
+
+        find, delimiter = self._buf.find, self.delimiter
+        while True:
+            end = find(delimiter, self._start, self._end)
+            if end < 0:
+                return
+            start = self._start
+            self._start = end + len(delimiter)
+            yield view[start:end]
+
+    def latest(self):
+        """Consumes all complete frames and returns (newest frame or None, frames skipped)."""
+        self._skip_to_latest()
+        skipped, self._skipped = self._skipped, 0
+        return self.next_frame(), skipped
+
+    def _skip_to_latest(self):
+        start, end = self._start, self._end
+        if self.frame_size:
+            complete = (end - start) // self.frame_size
+            if complete > 1:
+                self._start = start + (complete - 1) * self.frame_size
+                self._skipped += complete - 1
+            return
+
+        last = self._buf.rfind(self.delimiter, start, end)
+        if last < 0:
+            return
+        previous = self._buf.rfind(self.delimiter, start, last)
+        if previous >= 0:
+            self._skipped += self._buf.count(self.delimiter, start, previous + 1)
+            self._start = previous + len(self.delimiter)
@@ -0,0 +1,173 @@
+import time
+from collections import deque
+
+# Where servo/ESC pulses go. PwmOutput decides what to write; a backend only
+# writes it. Every backend has:
+#   connected           False once the hardware link is gone
+#   claim(pins)         sets the pins up as outputs
+#   write(pulses)       sets each (pin, pulse_us) pair, returns daemon round trips used
+#   close()             releases the pins and the connection
+# Pick one by name with open_backend(); only 'pigpio' needs a Raspberry Pi.
+
+PIGPIO_OUTPUT = 1  # pigpio.OUTPUT, without importing pigpio for it
+# pigpio script that sets both channels in a single daemon round trip.
+# Parameters: p0 servo gpio, p1 servo pulse, p2 esc gpio, p3 esc pulse.
+DUAL_SERVO_SCRIPT = b"servo p0 p1 servo p2 p3"
+SCRIPT_INITING = 0
+PULSE_RANGE = (500, 2500)  # Servo pulse widths pigpio accepts; 0 switches the output off
+
+
+class PigpioBackend:
+    """Pulses through the pigpio daemon, two channels per round trip when possible.
+
+    Pass an existing `pi` (e.g. fake_pigpio.pi()) or let it connect to the
+    daemon at `host`:`port`; pigpio is only imported in the latter case.
+    """
+
+    name = 'pigpio'
+
+    def __init__(self, pi=None, batch=True, host='localhost', port=8888):
+        if pi is None:
+            import pigpio
+            pi = pigpio.pi(host, port)
+        self.pi = pi
+        self.batch = batch
+        self._script_id = None
+
+    @property
+    def connected(self):
+        return self.pi.connected
+
+    def claim(self, pins):
+        for pin in pins:
+            self.pi.set_mode(pin, PIGPIO_OUTPUT)
+        if self.batch and len(pins) == 2:
+            self._script_id = self._store_script()
+
+    def _store_script(self):
+        try:
+            script_id = self.pi.store_script(DUAL_SERVO_SCRIPT)
+            for _ in range(100):
+                if self.pi.script_status(script_id)[0] != SCRIPT_INITING:
+                    return script_id
+                time.sleep(0.01)
+        except Exception as e:
+            print(f"⚠️ pigpio script unavailable, writing channels separately: {e}")
+        return None
+
+    def write(self, pulses):
+        if len(pulses) == 2 and self._script_id is not None:
+            (servo_pin, servo_us), (esc_pin, esc_us) = pulses
+            try:
+                self.pi.run_script(self._script_id, [servo_pin, servo_us, esc_pin, esc_us])
+                return 1
+            except Exception:
+                pass  # Script still busy or rejected, fall back to single writes
+        for pin, pulse in pulses:
+            self.pi.set_servo_pulsewidth(pin, pulse)
+        return len(pulses)
+
+    def close(self):
+        if self._script_id is not None:
+            try:
+                self.pi.delete_script(self._script_id)
+            except Exception:
+                pass
+            self._script_id = None
+        if self.pi.connected:
+            self.pi.stop()
+
+
+class SimulatedBackend:
+    """In-process servo outputs that model when a new pulse width takes effect.
+
+    Like a real servo signal each pin repeats its pulse every `frame_us`
+    (50 Hz), so a width written mid-frame first goes out at the next frame
+    start and a receiver can only measure it at that pulse's falling edge.
+    `log` keeps (write_ns, seen_ns, pin, pulse_us) for the last `history`
+    writes; pulse_at() answers what a pin is outputting at a given time.
+    """
+
+    name = 'simulated'
+
+    def __init__(self, frame_us=20000, history=4096):
+        self.connected = True
+        self.frame_ns = frame_us * 1000
+        self.epoch_ns = time.monotonic_ns()  # Every pin's frames start here
+        self.pulses = {}
+        self.log = deque(maxlen=history)
+
+    def claim(self, pins):
+        for pin in pins:
+            self.pulses.setdefault(pin, 0)
+
+    def write(self, pulses):
+        now = time.monotonic_ns()
+        frame_start = now + (self.epoch_ns - now) % self.frame_ns
+        for pin, pulse in pulses:
+            if pulse != 0 and not PULSE_RANGE[0] <= pulse <= PULSE_RANGE[1]:
+                raise ValueError(f"bad pulsewidth {pulse} on pin {pin}")
+            self.pulses[pin] = pulse
+            self.log.append((now, frame_start + pulse * 1000, pin, pulse))
+        return 0
+
+    def pulse_at(self, pin, t_ns):
+        """Width a receiver on `pin` has measured by monotonic time `t_ns`, 0 if none yet."""
+        for _, seen_ns, logged_pin, pulse in reversed(self.log):
+            if logged_pin == pin and seen_ns <= t_ns:
+                return pulse
+        return 0
+
+    def close(self):
+        self.connected = False
+
+
+class NullBackend:
+    """Accepts and counts writes, nothing else; for running a server without outputs."""
+
+    name = 'null'
+
+    def __init__(self):
+        self.connected = True
+        self.writes = 0
+
+    def claim(self, pins):
+        pass
+
+    def write(self, pulses):
+        self.writes += len(pulses)
+        return 0
+
+    def close(self):
+        self.connected = False
+
+
+class RecordingBackend(NullBackend):
+    """Keeps every write as (monotonic_ns, pin, pulse_us), the newest `history` of them."""
+
+    name = 'recording'
+
+    def __init__(self, history=None):
+        super().__init__()
+        self.pulses = {}
+        self.log = deque(maxlen=history)
+
+    def write(self, pulses):
+        now = time.monotonic_ns()
+        for pin, pulse in pulses:
+            self.pulses[pin] = pulse
+            self.log.append((now, pin, pulse))
+        self.writes += len(pulses)
+        return 0
+
+
+BACKENDS = {backend.name: backend for backend in (PigpioBackend, SimulatedBackend, NullBackend, RecordingBackend)}
+
+
+def open_backend(name, **options):
+    """Creates the backend called `name` ('pigpio', 'simulated', 'null' or 'recording')."""
+    try:
+        backend = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"unknown GPIO backend {name!r}, pick one of {', '.join(BACKENDS)}") from None
+    return backend(**options)
@@ -0,0 +1,44 @@
+import sys
+import threading
+
+
+class StatusRenderer(threading.Thread):
+    """Redraws a one-line console status at a low fixed rate, off the send loop.
+
+    The send loop calls publish() with an immutable snapshot (a tuple); that is
+    a single reference swap, so it never waits on a lock or on the terminal.
+    This thread picks up the newest snapshot every 1/rate_hz seconds and only
+    writes when it changed, so a slow Windows console or SSH session can stall
+    here without touching the control timing.
+    """
+
+    def __init__(self, render, rate_hz=10, stream=None):
+        super().__init__(name="hud", daemon=True)
+        self.render = render
+        self.interval = 1 / rate_hz
+        self.stream = stream or sys.stdout
+        self.redraws = 0
+        self._snapshot = None
+        self._stop_event = threading.Event()
+
+    def publish(self, snapshot):
+        self._snapshot = snapshot
+
+    def run(self):
+        drawn = None
+        while not self._stop_event.wait(self.interval):
+            snapshot = self._snapshot
+            if snapshot is None or snapshot is drawn:
+                continue
+            self.stream.write("\r" + self.render(snapshot))
+            self.stream.flush()
+            self.redraws += 1
+            drawn = snapshot
+
+    def stop(self):
+        """Stops redrawing and leaves the cursor on a fresh line."""
+        self._stop_event.set()
+        if self.is_alive():
+            self.join()
+        self.stream.write("\n")
+        self.stream.flush()
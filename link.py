@@ -0,0 +1,132 @@
+import threading
+import time
+import protocol
+
+
+class ReconnectingLink:
+    """Keeps the connection to the server up from a background thread.
+
+    `connect()` opens a fresh (socket, FrameEncoder) or raises; only the worker
+    calls it, retrying with exponential backoff from `backoff_min` up to
+    `backoff_max` seconds. The input loop never waits for a reconnect: send()
+    returns False while the link is down but remembers the controls, and the
+    newest state goes out as soon as the new socket is swapped in.
+    `on_connect(sock, encoder)` runs on the worker right after the swap and
+    `on_sent(controls, encoder)` after every frame that reached the socket.
+
+    A UDP send never fails, so over UDP pass `silence_timeout` and call
+    heard() whenever the server answers (every ack): once the server has
+    answered on a connection and then stays silent that long, the next
+    send() drops the link and the worker reconnects with a fresh handshake.
+    Silence before the first answer does not count (the ESC may be arming).
+    """
+
+    def __init__(self, connect, on_connect=None, on_sent=None, backoff_min=0.05, backoff_max=0.25,
+                 silence_timeout=None):
+        self._connect = connect
+        self.on_connect = on_connect
+        self.on_sent = on_sent
+        self.backoff_min = backoff_min
+        self.backoff_max = backoff_max
+        self.silence_timeout = silence_timeout
+        self.reconnects = 0
+        self.last_outage = None  # Seconds from losing the link to the first frame on the new one
+        self._was_up = False
+        self._current = None  # (sock, encoder) while up, swapped under the lock
+        self._latest = None  # Newest controls handed to send()
+        self._down_since = time.monotonic()
+        self._heard = None  # Monotonic time the server last answered on this connection
+        self._lock = threading.Lock()  # Serialises sends with the swap
+        self._down = threading.Event()
+        self._down.set()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="reconnect", daemon=True)
+
+    @property
+    def connected(self):
+        return self._current is not None
+
+    def start(self):
+        self._thread.start()
+
+    def heard(self):
+        """The server answered; may be called from any thread."""
+        self._heard = time.monotonic()
+
+    def send(self, controls):
+        """Sends one frame if the link is up; returns False (without blocking) if not."""
+        self._latest = controls
+        current = self._current
+        if current is None:
+            return False
+        heard = self._heard
+        if self.silence_timeout is not None and heard is not None \
+                and time.monotonic() - heard > self.silence_timeout:
+            with self._lock:
+                if current is self._current:
+                    print(f"\n❌ No answer from the server for {self.silence_timeout:.1f}s.")
+                    self._drop(current)
+            return False
+        with self._lock:
+            return current is self._current and self._send(current, controls)
+
+    def _send(self, current, controls):
+        sock, encoder = current
+        try:
+            sock.sendall(encoder.encode(*controls))
+        except OSError:
+            self._drop(current)
+            return False
+        if self.on_sent is not None:
+            self.on_sent(controls, encoder)
+        return True
+
+    def _drop(self, current):
+        print("\n❌ Server lost. Reconnecting in the background...")
+        self._current = None
+        self._down_since = time.monotonic()
+        try:
+            current[0].close()
+        except OSError:
+            pass
+        self._down.set()
+
+    def _run(self):
+        while True:
+            self._down.wait()
+            delay = self.backoff_min
+            while not self._stop_event.is_set():
+                try:
+                    current = self._connect()
+                    break
+                except (OSError, protocol.ProtocolError) as e:
+                    if delay == self.backoff_min:
+                        print(f"\n🔁 Server unreachable ({e}), retrying every {self.backoff_max * 1000:.0f} ms at most")
+                    self._stop_event.wait(delay)
+                    delay = min(self.backoff_max, delay * 2)
+            if self._stop_event.is_set():
+                return
+
+            with self._lock:
+                self._heard = None
+                self._current = current
+                self._down.clear()
+                if self.on_connect is not None:
+                    self.on_connect(*current)
+                latest = self._latest
+                sent = latest is not None and self._send(current, latest)
+                if self._was_up:
+                    self.reconnects += 1
+                    if sent:
+                        self.last_outage = time.monotonic() - self._down_since
+                self._was_up = True
+
+    def stop(self):
+        self._stop_event.set()
+        self._down.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        with self._lock:
+            current, self._current = self._current, None
+        if current is not None:
+            current[0].close()
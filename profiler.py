@@ -0,0 +1,68 @@
+import time
+from stats import SampleRing
+
+# Stages of a command through the server, in the order they happen.
+#   frame   buffered bytes to the newest complete frame (drain recv, framing, coalescing)
+#   decode  frame bytes to a Frame (UTF-8 + json.loads for JSON clients)
+#   submit  handing the Frame to the control loop
+#   wait    received to picked up by an output tick (monotonic clock, fixed-rate loop only)
+#   pulses  Frame to servo/ESC pulse widths
+#   write   GPIO backend write
+#   log     control log record
+#   ack     ack to the client
+STAGES = ('frame', 'decode', 'submit', 'wait', 'pulses', 'write', 'log', 'ack')
+FRAME, DECODE, SUBMIT, WAIT, PULSES, WRITE, LOG, ACK = range(len(STAGES))
+
+
+class StageProfiler:
+    """perf_counter_ns timings per stage, each kept in a SampleRing of `size`.
+
+    Recording a sample stores into a preallocated slot and never grows
+    anything. Every stage has a single writer thread; summary() may run on
+    any thread and sees a slightly stale copy at worst. Callers keep the
+    profiler in a local and skip the timing entirely when it is None, which
+    is all profiling costs when it is off.
+    """
+
+    def __init__(self, stages=STAGES, size=4096):
+        self.stages = stages
+        self.size = size
+        self.reset()
+
+    def record(self, stage, start_ns):
+        """Adds the time since `start_ns` to `stage` (FRAME, DECODE...); returns now for the next stage."""
+        now = time.perf_counter_ns()
+        self.rings[stage].add(now - start_ns)
+        return now
+
+    def add(self, stage, elapsed_ns):
+        """Adds a duration measured on another clock (e.g. monotonic_ns) to `stage`."""
+        self.rings[stage].add(elapsed_ns)
+
+    def reset(self):
+        self.rings = [SampleRing(self.size) for _ in self.stages]
+        self.started = time.monotonic()
+
+    def summary(self):
+        """Percentiles per stage over the newest `size` samples, in microseconds."""
+        summary = {}
+        for name, ring in zip(self.stages, self.rings):
+            if not ring.count:
+                continue
+            p50, p99, p100 = ring.percentiles(50, 99, 100)
+            summary[name] = {
+                "count": ring.count,
+                "p50_us": round(p50 / 1000, 2),
+                "p99_us": round(p99 / 1000, 2),
+                "max_us": round(p100 / 1000, 2),
+            }
+        return summary
+
+    def report(self):
+        summary = self.summary()
+        print(f"\n🔬 Stage timings over {time.monotonic() - self.started:.0f}s (newest {self.size} per stage):")
+        if not summary:
+            print("   no samples yet")
+        for name, s in summary.items():
+            print(f"   {name:<7} p50 {s['p50_us']:8.2f} us  p99 {s['p99_us']:8.2f} us  "
+                  f"max {s['max_us']:9.2f} us  ({s['count']} samples)")
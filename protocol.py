@@ -0,0 +1,274 @@
+import json
+import math
+import socket
+import struct
+import time
+from collections import namedtuple
+
+# --- Wire Formats ---
+# The client offers the formats it speaks in a one-line handshake and the server
+# answers with the one it picked. Clients that skip the handshake (client.py,
+# client1.py) send newline-delimited JSON straight away and are still accepted.
+PROTOCOL_VERSION = 1
+FORMAT_BINARY = 'bin1'
+FORMAT_JSON = 'json'
+SUPPORTED_FORMATS = (FORMAT_BINARY, FORMAT_JSON)
+HANDSHAKE_MAGIC = b'RC1'
+
+# Binary control frame, little-endian, 20 bytes:
+#   B version | B gear index | h steering (0-90) | H motor pulse (us)
+#   B gas (hundredths) | B brake (hundredths) | I sequence | Q client timestamp (ns)
+CONTROL_FRAME = struct.Struct('<BBhHBBIQ')
+FRAME_SIZE = CONTROL_FRAME.size
+
+STEERING_RANGE = (0, 90)
+MOTOR_RANGE = (0, 0xFFFF)
+
+GEAR_CODES = ('R', 'N', '1', '2', '3', '4', '5')
+GEAR_INDEX = {gear: i for i, gear in enumerate(GEAR_CODES)}
+NEUTRAL_INDEX = GEAR_INDEX['N']
+SEQ_MODULO = 1 << 32
+
+# Server-to-client ack for a command that reached the pins, 40 bytes. Sent only
+# to clients that list OPTION_ACKS in their hello; times are server monotonic ns.
+#   B version | 3x pad | I sequence | Q client timestamp (echoed) | Q received
+#   | Q applied | I frames lost so far this session | I frames that arrived late
+ACK_FRAME = struct.Struct('<BxxxIQQQII')
+ACK_SIZE = ACK_FRAME.size
+OPTION_ACKS = 'ack1'
+
+ControlFrame = namedtuple('ControlFrame', 'steering motor gear gas brake seq timestamp')
+Ack = namedtuple('Ack', 'seq client_ts received_ns applied_ns lost reordered')
+
+
+class ProtocolError(ValueError):
+    """Raised when a frame or handshake cannot be decoded."""
+
+
+# --- Encoding ---
+def encode_binary(steering, motor, gear, gas, brake, seq, timestamp=None):
+    """Packs one control frame into the fixed-size binary layout."""
+    if timestamp is None:
+        timestamp = time.monotonic_ns()
+    return CONTROL_FRAME.pack(
+        PROTOCOL_VERSION,
+        GEAR_INDEX.get(gear, NEUTRAL_INDEX),
+        int(steering),
+        int(motor),
+        int(round(gas * 100)),
+        int(round(brake * 100)),
+        seq & 0xFFFFFFFF,
+        timestamp,
+    )
+
+
+def encode_json(steering, motor, gear, gas, brake, seq, timestamp=None):
+    """Encodes one control frame as a newline-terminated JSON line."""
+    if timestamp is None:
+        timestamp = time.monotonic_ns()
+    controls = {
+        "steering": steering,
+        "motor": motor,
+        "gear": gear,
+        "gas": round(gas, 2),
+        "brake": round(brake, 2),
+        "seq": seq,
+        "ts": timestamp,
+    }
+    return (json.dumps(controls) + '\n').encode('utf-8')
+
+
+class FrameEncoder:
+    """Stamps each outgoing frame with a sequence number and encodes it.
+
+    `seq` and `timestamp` keep the stamps of the last frame encoded.
+    """
+
+    def __init__(self, fmt=FORMAT_BINARY):
+        self.fmt = fmt
+        self.seq = 0
+        self.timestamp = 0
+        self._encode = encode_binary if fmt == FORMAT_BINARY else encode_json
+
+    def encode(self, steering, motor, gear, gas, brake):
+        self.seq += 1
+        self.timestamp = time.monotonic_ns()
+        return self._encode(steering, motor, gear, gas, brake, self.seq, self.timestamp)
+
+
+def encode_ack(frame, received_ns, applied_ns, lost=0, reordered=0):
+    return ACK_FRAME.pack(PROTOCOL_VERSION, frame.seq & 0xFFFFFFFF, frame.timestamp, received_ns, applied_ns,
+                          lost & 0xFFFFFFFF, reordered & 0xFFFFFFFF)
+
+
+# --- Decoding ---
+def decode_binary(buffer, offset=0):
+    """Unpacks a binary frame directly from a bytes/bytearray/memoryview."""
+    version, gear, steering, motor, gas, brake, seq, timestamp = CONTROL_FRAME.unpack_from(buffer, offset)
+    if version != PROTOCOL_VERSION:
+        raise ProtocolError(f"unsupported frame version {version}")
+    if gear >= len(GEAR_CODES):
+        raise ProtocolError(f"unknown gear index {gear}")
+    return ControlFrame(steering, motor, GEAR_CODES[gear], gas / 100, brake / 100, seq, timestamp)
+
+
+def decode_json(line):
+    """Decodes one JSON line; missing fields fall back to the safe defaults."""
+    if isinstance(line, memoryview):
+        line = line.tobytes()  # json.loads does not take buffer objects
+    try:
+        controls = json.loads(line)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise ProtocolError(str(e)) from e
+    if not isinstance(controls, dict):
+        raise ProtocolError("frame is not a JSON object")
+    return ControlFrame(
+        controls.get("steering", 45),
+        controls.get("motor", 1500),
+        controls.get("gear", "N"),
+        controls.get("gas", 0),
+        controls.get("brake", 0),
+        controls.get("seq", 0),
+        controls.get("ts", 0),
+    )
+
+
+def decode_ack(buffer, offset=0):
+    version, seq, client_ts, received_ns, applied_ns, lost, reordered = ACK_FRAME.unpack_from(buffer, offset)
+    if version != PROTOCOL_VERSION:
+        raise ProtocolError(f"unsupported ack version {version}")
+    return Ack(seq, client_ts, received_ns, applied_ns, lost, reordered)
+
+
+def _number(name, value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ProtocolError(f"{name} must be a number, got {value!r}")
+    if isinstance(value, float) and not math.isfinite(value):
+        raise ProtocolError(f"{name} must be finite, got {value!r}")
+    return value
+
+
+def _clamp_int(name, value, low, high):
+    value = _number(name, value)
+    if type(value) is not int:
+        value = int(round(value))
+    return low if value < low else high if value > high else value
+
+
+def _clamp_fraction(name, value):
+    value = _number(name, value)
+    return 0.0 if value < 0 else 1.0 if value > 1 else value
+
+
+def clamp_frame(frame):
+    """Returns `frame` with every field forced into the range the binary frame carries.
+
+    JSON clients can send any number, or none: steering comes back as an int
+    0-90, motor as an int pulse, gas and brake as 0-1, and an unknown gear as
+    neutral. Raises ProtocolError for a field that is not a finite number.
+    """
+    steering, motor, gear, gas, brake, seq, timestamp = frame
+    if (type(steering) is int and 0 <= steering <= 90 and type(motor) is int and 0 <= motor <= 0xFFFF
+            and type(gas) is float and 0.0 <= gas <= 1.0 and type(brake) is float and 0.0 <= brake <= 1.0
+            and type(seq) is int and 0 <= seq <= 0xFFFFFFFF and type(timestamp) is int
+            and 0 <= timestamp < 1 << 64 and type(gear) is str and gear in GEAR_INDEX):
+        return frame  # Already in range, as every decoded binary frame with sane gas/brake is
+    gear = gear if isinstance(gear, str) and gear in GEAR_INDEX else 'N'
+    return ControlFrame(
+        _clamp_int('steering', frame.steering, *STEERING_RANGE),
+        _clamp_int('motor', frame.motor, *MOTOR_RANGE),
+        gear,
+        _clamp_fraction('gas', frame.gas),
+        _clamp_fraction('brake', frame.brake),
+        _clamp_int('seq', frame.seq, -(1 << 63), (1 << 63) - 1) & 0xFFFFFFFF,
+        _clamp_int('ts', frame.timestamp, 0, (1 << 64) - 1),
+    )
+
+
+def is_newer(seq, last_seq):
+    """True when `seq` comes after `last_seq`, allowing for 32-bit wraparound."""
+    return 0 < (seq - last_seq) % SEQ_MODULO < SEQ_MODULO // 2
+
+
+# --- Handshake ---
+def build_hello(formats=SUPPORTED_FORMATS, options=()):
+    """Client greeting listing the formats it can send, in preference order.
+
+    Options such as OPTION_ACKS follow as a third field, which servers that
+    predate them read as part of an unknown last format and ignore.
+    """
+    hello = HANDSHAKE_MAGIC + b' ' + ','.join(formats).encode('ascii')
+    if options:
+        hello += b' ' + ','.join(options).encode('ascii')
+    return hello + b'\n'
+
+
+def is_hello(line):
+    return bytes(line[:len(HANDSHAKE_MAGIC)]) == HANDSHAKE_MAGIC
+
+
+def choose_format(hello_line):
+    """Server side: picks the first offered format this server supports."""
+    parts = bytes(hello_line).strip().split(b' ')
+    if len(parts) < 2 or parts[0] != HANDSHAKE_MAGIC:
+        raise ProtocolError("malformed handshake")
+    for fmt in parts[1].decode('ascii', 'replace').split(','):
+        if fmt in SUPPORTED_FORMATS:
+            return fmt
+    return FORMAT_JSON
+
+
+def hello_options(hello_line):
+    """Server side: the options a client asked for, e.g. {OPTION_ACKS}."""
+    parts = bytes(hello_line).strip().split(b' ')
+    return set(parts[2].decode('ascii', 'replace').split(',')) if len(parts) > 2 else set()
+
+
+def build_reply(fmt):
+    return HANDSHAKE_MAGIC + b' ' + fmt.encode('ascii') + b'\n'
+
+
+def client_handshake(sock, formats=SUPPORTED_FORMATS, timeout=1.0, options=()):
+    """Offers our formats and returns the one the server accepted.
+
+    Servers that predate the handshake never answer, so after `timeout` we
+    fall back to JSON, which every server version understands.
+    """
+    sock.sendall(build_hello(formats, options))
+    previous_timeout = sock.gettimeout()
+    sock.settimeout(timeout)
+    reply = b''
+    try:
+        while not reply.endswith(b'\n'):
+            chunk = sock.recv(64)
+            if not chunk:
+                raise ConnectionResetError("server closed during handshake")
+            reply += chunk
+    except socket.timeout:
+        return FORMAT_JSON
+    finally:
+        sock.settimeout(previous_timeout)
+
+    parts = reply.strip().split(b' ', 1)
+    if len(parts) == 2 and parts[0] == HANDSHAKE_MAGIC:
+        fmt = parts[1].decode('ascii', 'replace')
+        if fmt in formats:
+            return fmt
+    return FORMAT_JSON
+
+
+def client_handshake_udp(sock, timeout=0.5, options=()):
+    """Opens a UDP session on a connected datagram socket; binary frames only.
+
+    Raises socket.timeout when the server does not answer, so the caller can retry.
+    """
+    previous_timeout = sock.gettimeout()
+    sock.settimeout(timeout)
+    try:
+        sock.send(build_hello((FORMAT_BINARY,), options))
+        reply = sock.recv(64)
+    finally:
+        sock.settimeout(previous_timeout)
+    if reply.strip() != build_reply(FORMAT_BINARY).strip():
+        raise ProtocolError(f"unexpected handshake reply {reply!r}")
+    return FORMAT_BINARY
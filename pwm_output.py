@@ -0,0 +1,56 @@
+class PwmOutput:
+    """Servo and ESC writer that skips pulses which did not move.
+
+    A new pulse is only sent when it differs from the last one written to that
+    pin by more than `deadband_us`. Whatever moved goes to the GPIO backend
+    (see gpio_backends.py) in one write() call, which the pigpio backend turns
+    into a single daemon round trip when both channels changed. Counters show
+    how many writes were issued and how many were suppressed.
+    """
+
+    def __init__(self, backend, servo_pin, esc_pin, deadband_us=0):
+        self.backend = backend
+        self.servo_pin = servo_pin
+        self.esc_pin = esc_pin
+        self.deadband_us = deadband_us
+        self.last_servo = None
+        self.last_esc = None
+        self.writes = 0
+        self.suppressed = 0
+        self.round_trips = 0
+        backend.claim((servo_pin, esc_pin))
+
+    def _changed(self, last, pulse):
+        return last is None or abs(pulse - last) > self.deadband_us
+
+    def write(self, servo_us, esc_us):
+        """Sends whichever of the two pulses moved past the deadband."""
+        servo_us = int(servo_us)
+        esc_us = int(esc_us)
+        pulses = []
+        if self._changed(self.last_servo, servo_us):
+            pulses.append((self.servo_pin, servo_us))
+            self.last_servo = servo_us
+        else:
+            self.suppressed += 1
+        if self._changed(self.last_esc, esc_us):
+            pulses.append((self.esc_pin, esc_us))
+            self.last_esc = esc_us
+        else:
+            self.suppressed += 1
+
+        if pulses:
+            self.round_trips += self.backend.write(pulses)
+            self.writes += len(pulses)
+
+    def force(self, servo_us, esc_us):
+        """Writes both pulses regardless of the deadband (arming, safe state)."""
+        self.last_servo = self.last_esc = None
+        self.write(servo_us, esc_us)
+
+    def stats(self):
+        return {"writes": self.writes, "suppressed": self.suppressed, "round_trips": self.round_trips}
+
+    def close(self):
+        """Closes the backend, and with it the pigpio connection."""
+        self.backend.close()
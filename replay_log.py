@@ -0,0 +1,96 @@
+import argparse
+import socket
+import time
+import protocol
+import control_log
+
+# Feeds a recorded session into a running server2.py, with the original timing
+# or sped up. Client logs replay every frame that was sent; server logs replay
+# the commands that reached the pins. Frames get fresh seq numbers and
+# timestamps, so the server sees an ordinary client.
+#
+#   python3 replay_log.py logs/client-20260101-120000.rclog --host 127.0.0.1 --speed 4
+#   python3 replay_log.py session.rclog --speed 0      # as fast as possible, for load tests
+
+
+def connect(host, port, transport):
+    if transport == 'udp':
+        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        s.connect((host, port))
+        wire_format = protocol.client_handshake_udp(s)
+    else:
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        s.connect((host, port))
+        wire_format = protocol.client_handshake(s)
+    return s, protocol.FrameEncoder(wire_format)
+
+
+def commands(path):
+    """The records worth replaying from a log, in recorded order."""
+    records = control_log.load_log(path)
+    source, _ = control_log.read_header(path)
+    kind = control_log.KIND_SENT if source == control_log.SOURCE_CLIENT else control_log.KIND_APPLIED
+    return records[records['kind'] == kind]
+
+
+def replay(records, sock, encoder, speed=1.0, loops=1):
+    """Sends every record at its recorded offset divided by `speed` (0 means no waiting).
+
+    Returns (frames sent, seconds taken, worst lateness against the schedule).
+    """
+    rows = records[['steering', 'motor', 'gear', 'gas', 'brake']].tolist()
+    offsets = ((records['t_ns'] - records['t_ns'][0]) / 1e9).tolist() if len(records) else []
+    span = offsets[-1] if offsets else 0.0
+    send = sock.send if sock.type == socket.SOCK_DGRAM else sock.sendall
+    gears = protocol.GEAR_CODES
+
+    sent = 0
+    worst_late = 0.0
+    start = time.perf_counter()
+    for loop in range(loops):
+        for (steering, motor, gear, gas, brake), offset in zip(rows, offsets):
+            if speed:
+                due = start + (loop * span + offset) / speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    worst_late = max(worst_late, -delay)
+            send(encoder.encode(steering, motor, gears[gear], gas / 100, brake / 100))
+            sent += 1
+    return sent, time.perf_counter() - start, worst_late
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a control log into server2.py")
+    parser.add_argument("log", help="client or server .rclog file")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5050)
+    parser.add_argument("--transport", choices=("tcp", "udp"), default="tcp")
+    parser.add_argument("--speed", type=float, default=1.0, help="time scale, 0 sends back to back")
+    parser.add_argument("--loops", type=int, default=1)
+    args = parser.parse_args()
+
+    records = commands(args.log)
+    if not len(records):
+        print(f"❌ No commands to replay in {args.log}")
+        return
+    recorded = (int(records['t_ns'][-1]) - int(records['t_ns'][0])) / 1e9
+    print(f"📼 {len(records)} commands over {recorded:.1f}s from {args.log}")
+
+    sock, encoder = connect(args.host, args.port, args.transport)
+    print(f"✅ Connected to {args.host}:{args.port} ({args.transport}, {encoder.fmt})")
+    try:
+        sent, elapsed, worst_late = replay(records, sock, encoder, args.speed, args.loops)
+    except KeyboardInterrupt:
+        print("\n🛑 Replay stopped.")
+        return
+    finally:
+        sock.close()
+    print(f"📈 Sent {sent} frames in {elapsed:.2f}s ({sent / max(elapsed, 1e-9):.0f} frames/s), "
+          f"worst lateness {worst_late * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
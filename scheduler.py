@@ -0,0 +1,70 @@
+import time
+from stats import SampleRing
+
+MIN_RATE_HZ = 50
+MAX_RATE_HZ = 1000
+
+
+class TickScheduler:
+    """Paces a loop on absolute monotonic deadlines so the rate does not drift.
+
+    Each deadline is the previous one plus the period, not "now plus period",
+    so time spent in the loop body is absorbed instead of added. If the body
+    overruns by more than a whole period the missed ticks are skipped (and
+    counted) rather than sent in a burst. The last `spin` seconds before a
+    deadline are busy-waited because sleep() alone is too coarse at 1 kHz.
+    """
+
+    def __init__(self, rate_hz, spin=0.0005, history=4096):
+        if not MIN_RATE_HZ <= rate_hz <= MAX_RATE_HZ:
+            raise ValueError(f"rate must be {MIN_RATE_HZ}-{MAX_RATE_HZ} Hz, got {rate_hz}")
+        self.rate_hz = rate_hz
+        self.period = 1 / rate_hz
+        self.spin = spin
+        self.ticks = 0
+        self.overruns = 0
+        self.jitter = SampleRing(history)  # Lateness past each deadline, seconds
+        self._deadline = None
+        self._first = None
+        self._last = None
+
+    def wait(self):
+        """Blocks until the next deadline and returns how late we woke up."""
+        now = time.perf_counter()
+        if self._deadline is None:
+            self._deadline = self._first = now
+        else:
+            self._deadline += self.period
+            behind = now - self._deadline
+            if behind > self.period:
+                skipped = int(behind / self.period)
+                self.overruns += skipped
+                self._deadline += skipped * self.period
+
+            remaining = self._deadline - now
+            if remaining > self.spin:
+                time.sleep(remaining - self.spin)
+            while time.perf_counter() < self._deadline:
+                pass
+
+        self._last = time.perf_counter()
+        lateness = self._last - self._deadline
+        self.jitter.add(lateness)
+        self.ticks += 1
+        return lateness
+
+    def achieved_rate(self):
+        if self.ticks < 2:
+            return 0.0
+        return (self.ticks - 1) / (self._last - self._first)
+
+    def stats(self):
+        p50, p99, p100 = self.jitter.percentiles(50, 99, 100)
+        return {
+            "target_hz": self.rate_hz,
+            "achieved_hz": self.achieved_rate(),
+            "overruns": self.overruns,
+            "jitter_p50_ms": p50 * 1e3,
+            "jitter_p99_ms": p99 * 1e3,
+            "jitter_max_ms": p100 * 1e3,
+        }
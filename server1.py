@@ -2,10 +2,12 @@ import socket
 import json
 import time
 import pigpio
+from framer import Framer
 
 # --- Configuration ---
 HOST = '0.0.0.0'  # Listen on all available network interfaces
 PORT = 5050       # Must match the port in the client script
+COALESCE_BACKLOG = True  # After a stall, apply only the newest buffered command
 
 # GPIO Pin Configuration
 SERVO_PIN = 19
@@ -73,20 +75,30 @@ try:
         client_socket, addr = server_socket.accept()
         print(f"✅ Accepted connection from: {addr}")
         
-        buffer = ""  # For incoming data chunks
+        framer = Framer()  # Reusable receive buffer, split into lines in place
+        dropped_frames = 0  # Stale commands skipped by coalescing
+        backlog_events = 0
 
         try:
             while True:
-                data = client_socket.recv(1024)
-                if not data:
+                if framer.recv_into(client_socket) == 0 or (
+                        COALESCE_BACKLOG and not framer.drain(client_socket)):
                     print(f"❌ Client {addr} disconnected.")
                     break
 
-                buffer += data.decode('utf-8')
-                while '\n' in buffer:
-                    line, buffer = buffer.split('\n', 1)
+                # Keep only the last complete line when a backlog has built up
+                if COALESCE_BACKLOG:
+                    line, skipped = framer.latest()
+                    if skipped:
+                        dropped_frames += skipped
+                        backlog_events += 1
+                    lines = () if line is None else (line,)
+                else:
+                    lines = framer.frames()
+
+                for line in lines:
                     try:
-                        controls = json.loads(line)
+                        controls = json.loads(line.tobytes())
 
                         steering_input = controls.get("steering", 45)
                         motor_input = controls.get("motor", 1500)
@@ -111,8 +123,12 @@ try:
 
         except (BrokenPipeError, ConnectionResetError):
             print(f"❌ Client {addr} lost connection unexpectedly.")
+        except ValueError as e:
+            print(f"⚠️ Dropping {addr}: {e}")  # e.g. a line larger than the receive buffer
 
         finally:
+            if backlog_events:
+                print(f"📉 Fell behind {backlog_events} times, dropped {dropped_frames} stale frames.")
             set_safe_state()
             client_socket.close()
 
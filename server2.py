@@ -1,108 +1,305 @@
-import socket
-import json
 import time
-import pigpio
+LAUNCHED = time.monotonic()  # Before the other imports, so they show up in the startup report
+import socket
+import threading
+import protocol
+import control_log
+from acks import AckSender
+from framer import Framer
+from control_loop import ControlLoop
+from startup import StartupTimer
+from server_common import (EscArming, UdpSequence, open_calibration, open_output, open_profiler,
+                           open_session_log, print_loop_stats, pulses_for, shut_down)
+from profiler import ACK, DECODE, FRAME, LOG, PULSES, SUBMIT, WRITE
 
 # --- Configuration ---
 HOST = '0.0.0.0'
 PORT = 5050
+TRANSPORT = 'tcp'  # 'tcp' or 'udp' (latest-wins datagrams, binary frames only)
+UDP_SESSION_TIMEOUT = 0.5  # Seconds of silence before a UDP client counts as gone
+COALESCE_BACKLOG = True  # After a stall, apply only the newest buffered frame
+FIXED_RATE_OUTPUT = True  # Drive the pins from a steady loop instead of once per packet
+OUTPUT_RATE_HZ = 200
+COMMAND_DEADLINE = 0.25  # Seconds without a fresh command before the loop goes neutral
+CONTROL_LOG_DIR = 'logs'  # Binary log of every command written to the pins; None to disable
+PROFILE_STAGES = False  # Time every stage of the command path; dump with `kill -USR1 <pid>` and at exit
+ESC_ARM_SECONDS = 2  # Neutral held on the ESC at power-up; commands wait at neutral meanwhile
 
 SERVO_PIN = 19
 ESC_PIN = 18
 
-SERVO_MIN_PULSE = 600
-SERVO_MAX_PULSE = 2400
-
-ESC_MIN_PULSE = 1000
-ESC_MAX_PULSE = 2000
-ESC_NEUTRAL_PULSE = 1500
+CALIBRATION_FILE = 'calibration.json'  # Committed pulse limits and steering trim, reloaded when edited
+CALIBRATION_OVERRIDE_FILE = 'calibration.local.json'  # This car's own values over the committed ones, untracked
+CALIBRATION_POLL_SECONDS = 0.5
+PWM_DEADBAND_US = 2  # Pulse changes this small are not sent to pigpiod
+GPIO_BACKEND = 'pigpio'  # 'pigpio', or 'simulated', 'recording', 'null' to run without a Pi
 
 print("Initializing RC Car Server...")
+startup = StartupTimer(LAUNCHED, report_after=("listen", "arming"))
+startup.mark("imports")
 
-try:
-    pi = pigpio.pi()
-    if not pi.connected:
-        print("❌ Could not connect to pigpio daemon. Run: sudo systemctl start pigpiod")
-        exit()
-except Exception as e:
-    print(f"❌ pigpio init error: {e}")
+# Listen first: a client connecting during ESC arming is accepted and its
+# commands are held at neutral until the ESC is ready, instead of refused.
+sock_type = socket.SOCK_DGRAM if TRANSPORT == 'udp' else socket.SOCK_STREAM
+server_socket = socket.socket(socket.AF_INET, sock_type)
+server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+server_socket.bind((HOST, PORT))
+if TRANSPORT != 'udp':
+    server_socket.listen(1)
+print(f"✅ Server listening on {HOST}:{PORT} ({TRANSPORT})")
+startup.mark("listen")
+
+opened = open_output(GPIO_BACKEND, SERVO_PIN, ESC_PIN, PWM_DEADBAND_US)
+if opened is None:
+    server_socket.close()
     exit()
+gpio, output = opened
 
-print("✅ pigpio connected.")
-pi.set_mode(SERVO_PIN, pigpio.OUTPUT)
-pi.set_mode(ESC_PIN, pigpio.OUTPUT)
+calibration_file = open_calibration(CALIBRATION_FILE, CALIBRATION_OVERRIDE_FILE, CALIBRATION_POLL_SECONDS)
+if calibration_file is None:
+    output.close()
+    server_socket.close()
+    exit()
 
-print("Arming ESC...")
-pi.set_servo_pulsewidth(ESC_PIN, ESC_NEUTRAL_PULSE)
-time.sleep(2)
-print("✅ ESC armed.")
+def safe_pulses():
+    return calibration_file.current.safe_pulses()
 
-server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-server_socket.bind((HOST, PORT))
-server_socket.listen(1)
-print(f"✅ Server listening on {HOST}:{PORT}")
+arming = EscArming(output, safe_pulses(), ESC_ARM_SECONDS, startup)
+armed_at = arming.armed_at
+session_log = open_session_log(CONTROL_LOG_DIR)
 
-def map_value(value, in_min, in_max, out_min, out_max):
-    return (value - in_min) * (out_max - out_min) / (in_max - in_min) + out_min
+def compute_pulses(frame):
+    return pulses_for(calibration_file.current, frame)  # Read once, so a reload never mixes two calibrations
 
 def set_safe_state():
+    global last_applied
     print("\n🔒 Safe state (Neutral, Centered Steering)...")
-    if pi.connected:
-        pi.set_servo_pulsewidth(ESC_PIN, ESC_NEUTRAL_PULSE)
-        pi.set_servo_pulsewidth(SERVO_PIN, (SERVO_MIN_PULSE + SERVO_MAX_PULSE) / 2)
+    if control_loop is not None:
+        control_loop.clear()  # The loop writes neutral on its next tick
+    elif gpio.connected:
+        pulses = safe_pulses()
+        output.force(*pulses)
+        if session_log is not None and last_applied is not None:
+            session_log.record(control_log.KIND_SAFE, last_applied, *pulses)
+            last_applied = None
 
-try:
+def apply_controls(frame, received_ns=None):
+    global last_applied
+    profiler = stage_profiler
+    if profiler is not None:
+        t = time.perf_counter_ns()
+    if control_loop is not None:
+        control_loop.submit(frame, received_ns)
+        if profiler is not None:
+            profiler.record(SUBMIT, t)
+    else:
+        if time.monotonic() < armed_at:
+            return  # ESC still arming: the pins stay at neutral, the next command after it applies
+        frame = protocol.clamp_frame(frame)
+        pulses = compute_pulses(frame)
+        if profiler is not None:
+            t = profiler.record(PULSES, t)
+        output.write(*pulses)
+        if profiler is not None:
+            t = profiler.record(WRITE, t)
+        applied_ns = time.monotonic_ns()
+        if session_log is not None:
+            session_log.record(control_log.KIND_APPLIED, frame, *pulses, t_ns=applied_ns)
+            last_applied = frame
+            if profiler is not None:
+                t = profiler.record(LOG, t)
+        send_ack(frame, received_ns or applied_ns, applied_ns)
+        if profiler is not None:
+            profiler.record(ACK, t)
+
+def send_ack(frame, received_ns, applied_ns):
+    """Tells the client its command reached the pins, if it asked for acks."""
+    sender = ack_sender
+    if sender is not None:
+        sender.send(frame, received_ns, applied_ns, sequence.lost, sequence.reordered)
+
+def print_ack_stats():
+    if ack_sender is not None:
+        print(f"📨 Acks: {ack_sender.sent} sent, {ack_sender.dropped} dropped")
+
+last_applied = None
+ack_sender = None  # AckSender for the current client, None when it did not ask for acks
+sequence = UdpSequence()  # Of the current UDP session; loss counts for acks, zeros on TCP
+stage_profiler = open_profiler(PROFILE_STAGES)
+control_loop = None
+if FIXED_RATE_OUTPUT:
+    control_loop = ControlLoop(output, compute_pulses, safe_pulses, OUTPUT_RATE_HZ, COMMAND_DEADLINE,
+                               log=session_log, on_apply=send_ack, hold_until=armed_at, on_armed=arming.armed,
+                               profiler=stage_profiler)
+    control_loop.start()
+    print(f"✅ Output loop running at {OUTPUT_RATE_HZ} Hz")
+
+def serve_tcp():
+    global ack_sender
     while True:
         print("🔄 Waiting for client...")
+        dropped_frames = 0
+        backlog_events = 0
         try:
             client_socket, addr = server_socket.accept()
             print(f"✅ Connected: {addr}")
-            buffer = ""
+            framer = Framer()
+            wire_format = None  # Picked by the handshake, or JSON for legacy clients
 
             while True:
-                data = client_socket.recv(1024)
-                if not data:
+                received = framer.recv_into(client_socket)
+                profiler = stage_profiler
+                if profiler is not None:
+                    t = time.perf_counter_ns()
+                if received == 0 or (COALESCE_BACKLOG and not framer.drain(client_socket)):
                     print(f"❌ Client {addr} disconnected.")
                     break
+                received_ns = time.monotonic_ns()
 
-                buffer += data.decode('utf-8')
-                while '\n' in buffer:
-                    line, buffer = buffer.split('\n', 1)
-                    try:
-                        controls = json.loads(line)
-
-                        steering = controls.get("steering", 45)
-                        motor = controls.get("motor", 1500)
-                        gear = controls.get("gear", "N")
-
-                        servo_pwm = map_value(steering, 0, 90, SERVO_MIN_PULSE, SERVO_MAX_PULSE)
-                        esc_pwm = ESC_NEUTRAL_PULSE if gear == 'N' else max(ESC_MIN_PULSE, min(ESC_MAX_PULSE, motor))
+                if wire_format is None:
+                    line = framer.peek()
+                    if line is None:
+                        continue
+                    if protocol.is_hello(line):
+                        framer.next_frame()
+                        wire_format = protocol.choose_format(line)
+                        client_socket.sendall(protocol.build_reply(wire_format))
+                        if wire_format == protocol.FORMAT_BINARY:
+                            framer.frame_size = protocol.FRAME_SIZE
+                            if protocol.OPTION_ACKS in protocol.hello_options(line):
+                                ack_sender = AckSender(client_socket)
+                    else:
+                        wire_format = protocol.FORMAT_JSON
+                    print(f"📦 Wire format: {wire_format}")
 
-                        pi.set_servo_pulsewidth(SERVO_PIN, servo_pwm)
-                        pi.set_servo_pulsewidth(ESC_PIN, esc_pwm)
+                binary = wire_format == protocol.FORMAT_BINARY
+                decode = protocol.decode_binary if binary else protocol.decode_json
+                if COALESCE_BACKLOG:
+                    frame, skipped = framer.latest()
+                    if skipped:
+                        dropped_frames += skipped
+                        backlog_events += 1
+                    frames = () if frame is None else (frame,)
+                else:
+                    frames = framer.frames()
+                if profiler is not None:
+                    t = profiler.record(FRAME, t)
 
-                    except (json.JSONDecodeError, KeyError) as e:
+                for frame in frames:
+                    try:
+                        command = decode(frame)
+                        if profiler is not None:
+                            t = profiler.record(DECODE, t)
+                        apply_controls(command, received_ns)
+                    except protocol.ProtocolError as e:
+                        if binary:
+                            raise  # Framing is lost, the stream cannot be resynced
                         print(f"⚠️ Invalid JSON: {e}")
-                        continue
 
         except (BrokenPipeError, ConnectionResetError) as e:
             print(f"❌ Connection error: {e}")
+        except protocol.ProtocolError as e:
+            print(f"⚠️ Dropping client, bad frame: {e}")
         except Exception as e:
             print(f"⚠️ Server error: {e}")
         finally:
+            if backlog_events:
+                print(f"📉 Fell behind {backlog_events} times, dropped {dropped_frames} stale frames.")
             set_safe_state()
+            print_loop_stats(control_loop)
+            print_ack_stats()
+            ack_sender = None
             try:
                 client_socket.close()
             except:
                 pass
 
+def serve_udp():
+    """One session at a time; only frames newer than the last applied one reach the pins.
+
+    A session that timed out is picked up again by the next valid frame from
+    the same address: a UDP client never learns that it was dropped, so it
+    keeps sending without a new hello.
+    """
+    global ack_sender, sequence
+    peer = None
+    lapsed = None  # (address, wants acks) of the session that last timed out
+    last_rx = 0.0
+    server_socket.settimeout(UDP_SESSION_TIMEOUT)
+
+    while True:
+        print("🔄 Waiting for client...")
+        while True:
+            try:
+                data, addr = server_socket.recvfrom(64)
+            except socket.timeout:
+                data, addr = None, None
+
+            if peer is not None and time.monotonic() - last_rx > UDP_SESSION_TIMEOUT:
+                print(f"❌ Client {peer} timed out. Stale frames dropped: {sequence.reordered}, "
+                      f"lost: {sequence.lost}")
+                set_safe_state()
+                print_ack_stats()
+                lapsed = peer, ack_sender is not None
+                ack_sender = None
+                peer = None
+                break
+            if data is None:
+                continue
+
+            if protocol.is_hello(data):
+                if peer is not None and addr != peer:
+                    continue  # Busy with another driver, like listen(1) on TCP
+                if protocol.FORMAT_BINARY not in data.decode('ascii', 'replace'):
+                    continue
+                if peer is None:
+                    print(f"✅ Connected: {addr}")
+                peer, last_rx, sequence = addr, time.monotonic(), UdpSequence()
+                lapsed = None
+                wants_acks = protocol.OPTION_ACKS in protocol.hello_options(data)
+                ack_sender = AckSender(server_socket, addr) if wants_acks else None
+                server_socket.sendto(protocol.build_reply(protocol.FORMAT_BINARY), addr)
+                continue
+
+            if len(data) != protocol.FRAME_SIZE:
+                continue
+            resuming = peer is None and lapsed is not None and addr == lapsed[0]
+            if addr != peer and not resuming:
+                continue
+            if stage_profiler is not None:
+                t = time.perf_counter_ns()
+            try:
+                frame = protocol.decode_binary(data)
+            except protocol.ProtocolError:
+                continue
+            if stage_profiler is not None:
+                stage_profiler.record(DECODE, t)
+            if resuming:
+                print(f"🔁 Client {addr} is back, resuming its session")
+                peer = addr
+                ack_sender = AckSender(server_socket, addr) if lapsed[1] else None
+                lapsed = None
+
+            received_ns = time.monotonic_ns()
+            last_rx = received_ns / 1e9
+            if sequence.accept(frame.seq):
+                apply_controls(frame, received_ns)
+
+try:
+    if control_loop is None:
+        # Without the loop clients are still accepted and answered during
+        # arming; apply_controls drops their commands until armed_at.
+        arming_timer = threading.Timer(max(0.0, armed_at - time.monotonic()), arming.armed)
+        arming_timer.daemon = True
+        arming_timer.start()
+    if TRANSPORT == 'udp':
+        serve_udp()
+    else:
+        serve_tcp()
+
 except KeyboardInterrupt:
     print("\n🔌 Server shutting down...")
 
 finally:
-    set_safe_state()
-    if pi.connected:
-        pi.stop()
     server_socket.close()
-    print("✅ Shutdown complete.")
\ No newline at end of file
+    shut_down(gpio, output, calibration_file, control_loop, session_log, stage_profiler, last_applied)
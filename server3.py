@@ -0,0 +1,463 @@
+import time
+LAUNCHED = time.monotonic()  # Before the other imports, so they show up in the startup report
+import asyncio
+import json
+import socket
+import protocol
+from framer import Framer
+from control_loop import ControlLoop
+from stats import SampleRing
+from telemetry import TelemetryChannel
+from startup import StartupTimer
+from calibration import CalibrationError
+from server_common import (EscArming, UdpSequence, open_calibration, open_output, open_profiler,
+                           open_session_log, print_loop_stats, pulses_for, shut_down)
+from profiler import DECODE, FRAME, SUBMIT
+
+# server2.py on asyncio: the driver, any number of read-only telemetry
+# subscribers and management connections are served side by side, so a slow
+# or dead client only stalls its own connection. The network side never
+# touches the pins; it hands frames to the ControlLoop thread, which stays the
+# single, ordered writer to the hardware.
+
+# --- Configuration ---
+HOST = '0.0.0.0'
+PORT = 5050  # Driver connection, same protocol as server2.py
+TELEMETRY_PORT = 5051  # JSON state lines for any number of observers, read-only
+MANAGEMENT_HOST = '127.0.0.1'  # Use '0.0.0.0' to allow management from another machine
+MANAGEMENT_PORT = 5052  # Line commands: help, status, kick, reset, trim, profile
+TRANSPORT = 'tcp'  # 'tcp' or 'udp' (latest-wins datagrams, binary frames only)
+UDP_SESSION_TIMEOUT = 0.5  # Seconds of silence before a UDP driver counts as gone
+COALESCE_BACKLOG = True  # After a stall, apply only the newest buffered frame
+OUTPUT_RATE_HZ = 200
+COMMAND_DEADLINE = 0.25  # Seconds without a fresh command before the loop goes neutral
+TELEMETRY_RATE_HZ = 10  # Snapshots per second; slow observers skip to the newest
+TELEMETRY_SEND_BUFFER = 4096  # Kernel send buffer per observer, bytes; keeps stale snapshots short
+ACK_BUFFER_LIMIT = 4096  # Unsent ack bytes per driver before new acks are dropped
+CONTROL_LOG_DIR = 'logs'  # Binary log of every command written to the pins; None to disable
+PROFILE_STAGES = False  # Time every stage of the command path; dump with `profile`, SIGUSR1 and at exit
+ESC_ARM_SECONDS = 2  # Neutral held on the ESC at power-up; commands wait at neutral meanwhile
+
+SERVO_PIN = 19
+ESC_PIN = 18
+
+CALIBRATION_FILE = 'calibration.json'  # Committed pulse limits and steering trim, reloaded when edited
+CALIBRATION_OVERRIDE_FILE = 'calibration.local.json'  # This car's own values, untracked; `trim` saves here
+CALIBRATION_POLL_SECONDS = 0.5
+PWM_DEADBAND_US = 2  # Pulse changes this small are not sent to pigpiod
+GPIO_BACKEND = 'pigpio'  # 'pigpio', or 'simulated', 'recording', 'null' to run without a Pi
+
+print("Initializing RC Car Server (asyncio)...")
+startup = StartupTimer(LAUNCHED, report_after=("listen", "arming"))
+startup.mark("imports")
+
+opened = open_output(GPIO_BACKEND, SERVO_PIN, ESC_PIN, PWM_DEADBAND_US)
+if opened is None:
+    exit()
+gpio, output = opened
+session_log = open_session_log(CONTROL_LOG_DIR)
+
+calibration_file = open_calibration(CALIBRATION_FILE, CALIBRATION_OVERRIDE_FILE, CALIBRATION_POLL_SECONDS)
+if calibration_file is None:
+    output.close()
+    exit()
+
+def safe_pulses():
+    return calibration_file.current.safe_pulses()
+
+# The ESC arms while the servers start; the control loop holds every command
+# at neutral until then and applies the newest one the moment it is armed.
+arming = EscArming(output, safe_pulses(), ESC_ARM_SECONDS, startup)
+
+def compute_pulses(frame):
+    return pulses_for(calibration_file.current, frame)  # Read once, so a reload never mixes two calibrations
+
+def format_peer(peer):
+    return f"{peer[0]}:{peer[1]}"
+
+
+# --- Driver Sessions ---
+class DriverSession:
+    """The one client allowed to drive, over either transport.
+
+    Only the event loop thread touches a session, except for the counters
+    the control loop thread reads when it builds an ack.
+    """
+
+    def __init__(self, transport, peer, wants_acks, udp=False):
+        self.transport = transport
+        self.peer = peer
+        self.wants_acks = wants_acks
+        self.udp = udp
+        self.last_rx = time.monotonic()
+        self.frames = 0
+        self.coalesced = 0
+        self.sequence = UdpSequence()  # Loss counts for acks, zeros on TCP
+        self.acks_sent = 0
+        self.acks_dropped = 0
+
+    def idle(self):
+        return time.monotonic() - self.last_rx > COMMAND_DEADLINE
+
+    def apply(self, frame, received_ns):
+        self.frames += 1
+        self.last_rx = received_ns / 1e9
+        control_loop.submit(frame, received_ns)
+
+    def send_ack(self, ack):
+        if self.transport.is_closing():
+            return
+        if self.udp:
+            self.transport.sendto(ack, self.peer)
+        elif self.transport.get_write_buffer_size() > ACK_BUFFER_LIMIT:
+            self.acks_dropped += 1  # Client is not reading; never let acks pile up
+            return
+        else:
+            self.transport.write(ack)
+        self.acks_sent += 1
+
+    def close(self):
+        if not self.udp:
+            self.transport.close()
+
+driver = None
+
+def claim_driver(session):
+    """Makes `session` the driver unless someone is actively driving."""
+    global driver
+    if driver is not None and not driver.idle():
+        print(f"🚫 {format_peer(session.peer)} refused, {format_peer(driver.peer)} is driving.")
+        return False
+    if driver is not None:
+        print(f"🔀 {format_peer(session.peer)} takes over from idle driver {format_peer(driver.peer)}.")
+        release_driver(driver, "replaced")
+    driver = session
+    print(f"✅ Driver connected: {format_peer(session.peer)}")
+    return True
+
+def release_driver(session, reason):
+    global driver
+    if driver is not session:
+        return
+    driver = None
+    control_loop.clear()  # The loop writes neutral on its next tick
+    session.close()
+    print(f"❌ Driver {format_peer(session.peer)} {reason}: {session.frames} frames, "
+          f"{session.coalesced} coalesced, {session.sequence.lost} lost, {session.sequence.reordered} reordered, "
+          f"acks {session.acks_sent} sent / {session.acks_dropped} dropped")
+    print_loop_stats(control_loop)
+
+def command_applied(frame, received_ns, applied_ns):
+    """Control loop thread: records the latency and queues an ack for the current driver."""
+    apply_latency.add((applied_ns - received_ns) / 1e9)
+    session = driver
+    if session is not None and session.wants_acks:
+        ack = protocol.encode_ack(frame, received_ns, applied_ns, session.sequence.lost, session.sequence.reordered)
+        event_loop.call_soon_threadsafe(session.send_ack, ack)
+
+class DriverProtocol(asyncio.Protocol):
+    """TCP driver connection: handshake, framing and coalescing as in server2.py."""
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.peer = transport.get_extra_info('peername')
+        transport.get_extra_info('socket').setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.framer = Framer()
+        self.session = None
+        self.decode = None
+
+    def data_received(self, data):
+        received_ns = time.monotonic_ns()
+        profiler = stage_profiler
+        if profiler is not None:
+            t = time.perf_counter_ns()
+        try:
+            self.framer.feed(data)
+            if self.session is None and not self.start_session():
+                return
+            if COALESCE_BACKLOG:
+                frame, skipped = self.framer.latest()
+                self.session.coalesced += skipped
+                frames = () if frame is None else (frame,)
+            else:
+                frames = self.framer.frames()
+            if profiler is not None:
+                t = profiler.record(FRAME, t)
+            for frame in frames:
+                command = self.decode(frame)
+                if profiler is not None:
+                    t = profiler.record(DECODE, t)
+                self.session.apply(command, received_ns)
+                if profiler is not None:
+                    t = profiler.record(SUBMIT, t)
+        except protocol.ProtocolError as e:
+            if self.decode is protocol.decode_json and self.session is not None:
+                print(f"⚠️ Invalid JSON: {e}")
+                return
+            print(f"⚠️ Dropping {format_peer(self.peer)}, bad frame: {e}")
+            self.transport.close()
+
+    def start_session(self):
+        line = self.framer.peek()
+        if line is None:
+            return False
+        wire_format, wants_acks = protocol.FORMAT_JSON, False
+        if protocol.is_hello(line):
+            self.framer.next_frame()
+            wire_format = protocol.choose_format(line)
+            wants_acks = wire_format == protocol.FORMAT_BINARY and \
+                protocol.OPTION_ACKS in protocol.hello_options(line)
+
+        session = DriverSession(self.transport, self.peer, wants_acks)
+        if not claim_driver(session):
+            self.transport.close()
+            return False
+        if protocol.is_hello(line):
+            self.transport.write(protocol.build_reply(wire_format))
+        if wire_format == protocol.FORMAT_BINARY:
+            self.framer.frame_size = protocol.FRAME_SIZE
+            self.decode = protocol.decode_binary
+        else:
+            self.decode = protocol.decode_json
+        self.session = session
+        print(f"📦 Wire format: {wire_format}{', acks' if wants_acks else ''}")
+        return True
+
+    def connection_lost(self, exc):
+        if self.session is not None:
+            release_driver(self.session, "disconnected")
+
+lapsed_udp_driver = None  # UDP session that last timed out; a frame from its address resumes it
+
+class UdpDriverProtocol(asyncio.DatagramProtocol):
+    """UDP driver: hello opens the session, only frames newer than the last one are applied.
+
+    A UDP client never learns that its session timed out and keeps sending
+    without a new hello, so a valid frame from the lapsed driver's address
+    resumes the session (unless someone else has claimed the car meanwhile).
+    """
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        global lapsed_udp_driver
+        received_ns = time.monotonic_ns()
+        session = driver
+        if protocol.is_hello(data):
+            if protocol.FORMAT_BINARY not in data.decode('ascii', 'replace'):
+                return
+            lapsed_udp_driver = None
+            if session is None or session.peer != addr:
+                wants_acks = protocol.OPTION_ACKS in protocol.hello_options(data)
+                if not claim_driver(DriverSession(self.transport, addr, wants_acks, udp=True)):
+                    return
+            driver.sequence = UdpSequence()
+            driver.last_rx = time.monotonic()
+            self.transport.sendto(protocol.build_reply(protocol.FORMAT_BINARY), addr)
+            return
+
+        if len(data) != protocol.FRAME_SIZE:
+            return
+        lapsed = lapsed_udp_driver
+        resuming = session is None and lapsed is not None and addr == lapsed.peer
+        if not resuming and (session is None or addr != session.peer):
+            return
+        profiler = stage_profiler
+        if profiler is not None:
+            t = time.perf_counter_ns()
+        try:
+            frame = protocol.decode_binary(data)
+        except protocol.ProtocolError:
+            return
+        if profiler is not None:
+            t = profiler.record(DECODE, t)
+        if resuming:
+            session = DriverSession(self.transport, addr, lapsed.wants_acks, udp=True)
+            session.sequence = lapsed.sequence
+            if not claim_driver(session):
+                return
+            lapsed_udp_driver = None
+        if not session.sequence.accept(frame.seq):
+            session.last_rx = received_ns / 1e9
+            return
+        session.apply(frame, received_ns)
+        if profiler is not None:
+            profiler.record(SUBMIT, t)
+
+async def expire_udp_driver():
+    global lapsed_udp_driver
+    while True:
+        await asyncio.sleep(UDP_SESSION_TIMEOUT / 4)
+        session = driver
+        if session is not None and session.udp and time.monotonic() - session.last_rx > UDP_SESSION_TIMEOUT:
+            release_driver(session, "timed out")
+            lapsed_udp_driver = session
+
+
+# --- Telemetry ---
+apply_latency = SampleRing(512)  # Driver frame received to pulses written, seconds
+
+def telemetry_snapshot():
+    frame = control_loop.applied
+    servo_pwm, esc_pwm = safe_pulses() if frame is None else compute_pulses(frame)
+    session = driver
+    rx_p50, rx_p99 = apply_latency.percentiles(50, 99) if len(apply_latency) else (0.0, 0.0)
+    jitter_p99, = control_loop.jitter.percentiles(99)
+    return {
+        "t": round(time.monotonic(), 4),
+        "driver": None if session is None else format_peer(session.peer),
+        "seq": 0 if frame is None else frame.seq,
+        "gear": 'N' if frame is None else frame.gear,
+        "steering": 45 if frame is None else frame.steering,
+        "gas": 0 if frame is None else frame.gas,
+        "brake": 0 if frame is None else frame.brake,
+        "servo_us": round(servo_pwm),
+        "esc_us": round(esc_pwm),
+        "rx_to_pins_p50_ms": round(rx_p50 * 1e3, 3),
+        "rx_to_pins_p99_ms": round(rx_p99 * 1e3, 3),
+        "loop_jitter_p99_ms": round(jitter_p99 * 1e3, 3),
+        "lost": 0 if session is None else session.sequence.lost,
+        "reordered": 0 if session is None else session.sequence.reordered,
+        "observers": len(telemetry.observers),
+    }
+
+telemetry = TelemetryChannel(telemetry_snapshot, TELEMETRY_RATE_HZ, TELEMETRY_SEND_BUFFER)
+
+
+# --- Management ---
+def command_help():
+    return {"commands": sorted(MANAGEMENT_COMMANDS)}
+
+def command_status():
+    session = driver
+    return {
+        "driver": None if session is None else format_peer(session.peer),
+        "armed": control_loop.armed.is_set(),
+        "frames": 0 if session is None else session.frames,
+        "telemetry": telemetry.stats(),
+        "loop": control_loop.stats(),
+        "pwm": output.stats(),
+        "calibration": calibration_file.current.as_dict(),
+    }
+
+def command_kick():
+    session = driver
+    if session is None:
+        return {"kicked": None}
+    release_driver(session, "kicked")
+    return {"kicked": format_peer(session.peer)}
+
+def command_reset():
+    control_loop.reset_stats()
+    return {"reset": True}
+
+TRIM_KEYS = {"steering": "servo_trim", "neutral": "esc_neutral"}
+
+def command_trim(key=None, delta=None):
+    """`trim` shows the calibration, `trim steering|neutral <+-us>` nudges it live and saves it as an override."""
+    if key is None:
+        return {"calibration": calibration_file.current.as_dict()}
+    if key not in TRIM_KEYS or delta is None:
+        return {"error": f"usage: trim [{'|'.join(TRIM_KEYS)} <+-us>]"}
+    field = TRIM_KEYS[key]
+    try:
+        step = int(delta)
+    except ValueError:
+        return {"error": f"trim step must be whole microseconds, got {delta!r}"}
+    try:
+        calibration = calibration_file.update(**{field: getattr(calibration_file.current, field) + step})
+    except (OSError, CalibrationError) as e:
+        return {"error": str(e)}
+    return {"calibration": calibration.as_dict()}
+
+def command_profile(action=None):
+    """`profile` returns per-stage timings, `profile reset` starts them over."""
+    if stage_profiler is None:
+        return {"error": "stage profiling is off, set PROFILE_STAGES = True"}
+    if action == "reset":
+        stage_profiler.reset()
+        return {"reset": True}
+    if action is not None:
+        return {"error": "usage: profile [reset]"}
+    stage_profiler.report()
+    return {"stages": stage_profiler.summary()}
+
+MANAGEMENT_COMMANDS = {
+    "help": command_help,
+    "status": command_status,
+    "kick": command_kick,
+    "reset": command_reset,
+    "trim": command_trim,
+    "profile": command_profile,
+}
+
+class ManagementProtocol(asyncio.Protocol):
+    """One command per line, one JSON reply per line."""
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.buffer = b''
+
+    def data_received(self, data):
+        self.buffer += data
+        if len(self.buffer) > 4096:
+            self.transport.close()
+            return
+        while b'\n' in self.buffer:
+            line, self.buffer = self.buffer.split(b'\n', 1)
+            words = line.decode('utf-8', 'replace').split()
+            if not words:
+                continue
+            handler = MANAGEMENT_COMMANDS.get(words[0])
+            try:
+                reply = handler(*words[1:]) if handler else {"error": f"unknown command {words[0]!r}"}
+            except TypeError:
+                reply = {"error": f"bad arguments for {words[0]!r}"}
+            self.transport.write((json.dumps(reply) + "\n").encode())
+
+
+stage_profiler = open_profiler(PROFILE_STAGES)
+control_loop = ControlLoop(output, compute_pulses, safe_pulses, OUTPUT_RATE_HZ, COMMAND_DEADLINE,
+                           log=session_log, on_apply=command_applied, hold_until=arming.armed_at, on_armed=arming.armed,
+                           profiler=stage_profiler)
+control_loop.start()
+print(f"✅ Output loop running at {OUTPUT_RATE_HZ} Hz")
+event_loop = None
+
+async def main():
+    global event_loop
+    event_loop = asyncio.get_running_loop()
+    servers = []
+    tasks = []
+    if TRANSPORT == 'udp':
+        udp_transport, _ = await event_loop.create_datagram_endpoint(UdpDriverProtocol, local_addr=(HOST, PORT))
+        tasks.append(expire_udp_driver())
+    else:
+        udp_transport = None
+        servers.append(await event_loop.create_server(DriverProtocol, HOST, PORT, reuse_address=True))
+    bound_at = time.monotonic()  # The driver port; the others are local and quick
+    telemetry.start(HOST, TELEMETRY_PORT)  # Own thread and loop: fanning out never delays the driver
+    servers.append(await event_loop.create_server(ManagementProtocol, MANAGEMENT_HOST, MANAGEMENT_PORT,
+                                                  reuse_address=True))
+    tasks.append(servers[-1].serve_forever())
+    print(f"✅ Server listening on {HOST}:{PORT} ({TRANSPORT}), telemetry on {TELEMETRY_PORT}, "
+          f"management on {MANAGEMENT_HOST}:{MANAGEMENT_PORT}")
+    startup.mark("listen", bound_at)
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for server in servers:
+            server.close()
+        if udp_transport is not None:
+            udp_transport.close()
+        telemetry.stop()
+
+try:
+    asyncio.run(main())
+
+except KeyboardInterrupt:
+    print("\n🔌 Server shutting down...")
+
+finally:
+    shut_down(gpio, output, calibration_file, control_loop, session_log, stage_profiler)
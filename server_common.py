@@ -0,0 +1,154 @@
+# What server2.py and server3.py do the same way: bringing up the pins,
+# calibration, log and ESC arming, turning a command into pulses, UDP
+# sequence accounting, reporting and shutdown. Only the transports differ.
+import signal
+import time
+import protocol
+import control_log
+from calibration import CalibrationError, CalibrationFile
+from gpio_backends import open_backend
+from profiler import StageProfiler
+from pwm_output import PwmOutput
+
+
+def open_output(backend, servo_pin, esc_pin, deadband_us):
+    """(gpio, PwmOutput) on the named GPIO backend, or None once the reason is printed."""
+    try:
+        gpio = open_backend(backend)
+        if not gpio.connected:
+            print("❌ Could not connect to pigpio daemon. Run: sudo systemctl start pigpiod")
+            return None
+    except Exception as e:
+        print(f"❌ GPIO backend error: {e}")
+        return None
+    print(f"✅ GPIO backend: {gpio.name}")
+    return gpio, PwmOutput(gpio, servo_pin, esc_pin, deadband_us=deadband_us)
+
+
+def open_calibration(path, override_path, poll_seconds):
+    """A watched CalibrationFile, or None once the reason is printed."""
+    try:
+        calibration_file = CalibrationFile(path, override_path, on_change=calibration_changed)
+    except (OSError, CalibrationError) as e:
+        print(f"❌ Calibration error: {e}")
+        return None
+    print(f"🔧 Calibration: {calibration_file.current.as_dict()}")
+    calibration_file.watch(poll_seconds)
+    return calibration_file
+
+
+def open_session_log(log_dir):
+    if not log_dir:
+        return None
+    session_log = control_log.ControlLogWriter(
+        control_log.log_path(log_dir, control_log.SOURCE_SERVER), control_log.SOURCE_SERVER)
+    print(f"📝 Logging commands to {session_log.path}")
+    return session_log
+
+
+def open_profiler(enabled):
+    """A StageProfiler that reports on SIGUSR1, or None when stage profiling is off."""
+    if not enabled:
+        return None
+    profiler = StageProfiler()
+    signal.signal(signal.SIGUSR1, lambda signum, stack: profiler.report())
+    print("🔬 Stage profiling on, `kill -USR1` this process for a summary")
+    return profiler
+
+
+class EscArming:
+    """Holds the ESC at neutral for `seconds` from now while the server comes up.
+
+    `armed_at` is the monotonic time commands may reach the pins; armed() is
+    called then (ControlLoop on_armed, or a timer) and ends the startup phase.
+    """
+
+    def __init__(self, output, safe_pulses, seconds, startup):
+        output.force(*safe_pulses)
+        self.armed_at = time.monotonic() + seconds
+        self.startup = startup
+        startup.mark("gpio")
+        print(f"Arming ESC ({seconds}s at neutral, clients can already connect)...")
+
+    def armed(self):
+        print("✅ ESC armed.")
+        self.startup.mark("arming", self.armed_at)
+
+
+class UdpSequence:
+    """Latest-wins sequence check for one UDP session, with the loss counts acks report.
+
+    A frame that is not newer than the last accepted one is refused and
+    counted as reordered; it was counted as lost when the newer one overtook it.
+    """
+
+    def __init__(self):
+        self.last_seq = 0
+        self.lost = 0  # Frames missing from the sequence
+        self.reordered = 0  # Frames that arrived after a newer one
+
+    def accept(self, seq):
+        """True if `seq` is newer than every frame accepted so far."""
+        if not protocol.is_newer(seq, self.last_seq):
+            self.reordered += 1
+            if self.lost:
+                self.lost -= 1
+            return False
+        if self.last_seq:
+            self.lost += (seq - self.last_seq) % protocol.SEQ_MODULO - 1
+        self.last_seq = seq
+        return True
+
+
+def pulses_for(calibration, frame):
+    """(servo_us, esc_us) for a protocol.clamp_frame()d ControlFrame under one Calibration."""
+    servo_pwm = calibration.servo_table[frame.steering]  # Clamping made steering an int 0-90
+    esc_pwm = calibration.esc_neutral if frame.gear == 'N' else calibration.esc_pulse(frame.motor)
+    return servo_pwm, esc_pwm
+
+
+def calibration_changed(old, new):
+    """CalibrationFile on_change callback: prints the values that changed."""
+    old, new = old.as_dict(), new.as_dict()
+    changes = ", ".join(f"{key} {old[key]} → {new[key]}" for key in new if new[key] != old[key])
+    print(f"\n🔧 Calibration: {changes}")
+
+
+def print_loop_stats(control_loop):
+    if control_loop is None:
+        return
+    stats = control_loop.stats()
+    print(f"⏱️ Output loop: {stats['ticks']} ticks, jitter p50 {stats['jitter_p50_ms']:.2f} ms, "
+          f"p99 {stats['jitter_p99_ms']:.2f} ms, max {stats['jitter_max_ms']:.2f} ms, "
+          f"{stats['missed']} missed, {stats['watchdog_trips']} watchdog trips, {stats['errors']} errors")
+
+
+def shut_down(gpio, output, calibration_file, control_loop=None, session_log=None, profiler=None,
+              last_applied=None):
+    """Stops the loop and the watcher, leaves the pins safe and prints the session totals.
+
+    `last_applied` is the frame on the pins when there is no control loop to ask.
+    """
+    calibration_file.stop()
+    if control_loop is not None:
+        control_loop.stop()
+        print_loop_stats(control_loop)
+        last_applied = control_loop.applied
+    if profiler is not None:
+        profiler.report()
+    print("\n🔒 Safe state (Neutral, Centered Steering)...")
+    if gpio.connected:
+        pulses = calibration_file.current.safe_pulses()
+        output.force(*pulses)
+        if session_log is not None and last_applied is not None:
+            session_log.record(control_log.KIND_SAFE, last_applied, *pulses)
+    stats = output.stats()
+    print(f"📊 PWM writes: {stats['writes']} sent, {stats['suppressed']} suppressed, "
+          f"{stats['round_trips']} pigpiod round trips")
+    if gpio.connected:
+        output.close()
+    if session_log is not None:
+        session_log.close()
+        skipped = f", {session_log.skipped} unloggable skipped" if session_log.skipped else ""
+        print(f"📝 {session_log.records} commands logged to {session_log.path}{skipped}")
+    print("✅ Shutdown complete.")
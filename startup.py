@@ -0,0 +1,38 @@
+import threading
+import time
+
+
+class StartupTimer:
+    """Wall-clock time of each server startup phase, printed once the car can be driven.
+
+    Phases are marked in order as they end; `launched` is the monotonic time
+    the script started, taken before its imports so they are counted too.
+    The report prints itself once every phase in `report_after` is marked,
+    whichever thread marks the last one.
+    """
+
+    def __init__(self, launched=None, report_after=()):
+        self.launched = time.monotonic() if launched is None else launched
+        self.phases = []  # (name, seconds)
+        self._last = self.launched
+        self._waiting = set(report_after)
+        self._lock = threading.Lock()  # Marks come from the main and the control loop threads
+
+    def mark(self, name, at=None):
+        """Ends phase `name` now, or at the monotonic time `at` (no earlier than the last mark)."""
+        with self._lock:
+            at = time.monotonic() if at is None else max(at, self._last)
+            self.phases.append((name, at - self._last))
+            self._last = at
+            if name not in self._waiting:
+                return
+            self._waiting.discard(name)
+            if not self._waiting:
+                self.report()
+
+    def total(self):
+        return self._last - self.launched
+
+    def report(self):
+        phases = ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in self.phases)
+        print(f"🚀 Startup: {phases} — drivable {self.total():.2f}s after launch")
@@ -0,0 +1,31 @@
+from array import array
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted sequence (nan when empty)."""
+    if not sorted_values:
+        return float('nan')
+    index = min(len(sorted_values) - 1, int(pct / 100 * len(sorted_values)))
+    return sorted_values[index]
+
+
+class SampleRing:
+    """Fixed-size ring of float samples; adding a sample never allocates."""
+
+    def __init__(self, size=4096):
+        self._samples = array('d', bytes(8 * size))
+        self.count = 0
+
+    def add(self, value):
+        self._samples[self.count % len(self._samples)] = value
+        self.count += 1
+
+    def __len__(self):
+        return min(self.count, len(self._samples))
+
+    def sorted(self):
+        return sorted(self._samples[:len(self)])
+
+    def percentiles(self, *pcts):
+        ordered = self.sorted()
+        return [percentile(ordered, p) for p in pcts]
@@ -0,0 +1,58 @@
+import asyncio
+import fractions
+import time
+import numpy as np
+from av import VideoFrame
+from aiortc import MediaStreamTrack
+
+VIDEO_CLOCK_RATE = 90000  # RTP clock for video, as aiortc uses
+VIDEO_TIME_BASE = fractions.Fraction(1, VIDEO_CLOCK_RATE)
+
+
+def test_pattern(width, height, phase):
+    """Colour bars with a white bar sweeping across at `phase` (0-1), as a BGR ndarray."""
+    bars = np.array([[255, 255, 255], [0, 255, 255], [255, 255, 0], [0, 255, 0],
+                     [255, 0, 255], [0, 0, 255], [255, 0, 0], [0, 0, 0]], dtype=np.uint8)
+    columns = bars[np.arange(width) * len(bars) // width]
+    img = np.repeat(columns[np.newaxis, :, :], height, axis=0)
+    x = int(phase * width) % width
+    img[:, x:x + max(2, width // 64)] = 255
+    return img
+
+
+class SyntheticVideoTrack(MediaStreamTrack):
+    """A moving test pattern at a fixed size and rate, for benchmarks and development.
+
+    Frames come out as yuv420p like a decoder's, one new av.VideoFrame per
+    recv(), paced against the track's start so the rate does not drift.
+    The pattern repeats every `pattern_frames` frames, which are rendered
+    once up front so producing a frame costs no more than a decoder would.
+    """
+
+    kind = "video"
+
+    def __init__(self, width=1280, height=720, fps=30, pattern_frames=30):
+        super().__init__()
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.frames_sent = 0
+        self._started = None
+        self._planes = [
+            VideoFrame.from_ndarray(test_pattern(width, height, i / pattern_frames), format="bgr24")
+            .reformat(format="yuv420p").to_ndarray()
+            for i in range(pattern_frames)
+        ]
+
+    async def recv(self):
+        if self._started is None:
+            self._started = time.monotonic()
+        else:
+            wait = self._started + self.frames_sent / self.fps - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+        frame = VideoFrame.from_ndarray(self._planes[self.frames_sent % len(self._planes)], format="yuv420p")
+        frame.pts = self.frames_sent * VIDEO_CLOCK_RATE // self.fps
+        frame.time_base = VIDEO_TIME_BASE
+        self.frames_sent += 1
+        return frame
@@ -0,0 +1,142 @@
+import asyncio
+import json
+import socket
+import threading
+
+
+class TelemetryChannel:
+    """Broadcasts state snapshots to any number of observers at a fixed rate.
+
+    Each tick the snapshot is built and encoded once, then handed to every
+    observer. An observer whose connection still has unsent data is skipped
+    for that tick instead of queueing: the write buffer limit is zero and the
+    kernel send buffer is shrunk to `send_buffer` bytes, so a slow observer
+    holds at most a few snapshots and catches up with the newest one as soon
+    as it drains. Nothing here can block the event loop or grow without bound.
+    start() serves from a thread and event loop of its own, so encoding and
+    fanning out never delay the caller's loop, e.g. the one reading the driver.
+    """
+
+    def __init__(self, snapshot, rate_hz=10, send_buffer=4096):
+        self.snapshot = snapshot  # Callable returning a JSON-serialisable dict
+        self.interval = 1 / rate_hz
+        self.send_buffer = send_buffer
+        self.observers = set()
+        self.latest = None  # Last encoded snapshot line
+        self.published = 0
+        self.sent = 0
+        self.dropped = 0
+        self._loop = None
+        self._thread = None
+        self._stopping = None
+
+    def protocol(self):
+        """Protocol factory for loop.create_server()."""
+        return ObserverProtocol(self)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            next_tick += self.interval
+            delay = next_tick - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                next_tick = loop.time()  # Fell behind; do not burst to catch up
+            if not self.observers:
+                continue
+            self.latest = (json.dumps(self.snapshot(), separators=(',', ':')) + "\n").encode()
+            self.published += 1
+            for observer in self.observers:
+                observer.offer(self.latest)
+
+    def close(self):
+        for observer in list(self.observers):
+            observer.transport.close()
+
+    def start(self, host, port):
+        """Listens for observers on its own thread; returns once bound, raises OSError if not."""
+        started = threading.Event()
+        failed = []
+        self._thread = threading.Thread(target=asyncio.run, args=(self._serve(host, port, started, failed),),
+                                        name="telemetry", daemon=True)
+        self._thread.start()
+        started.wait()
+        if failed:
+            raise failed[0]
+
+    async def _serve(self, host, port, started, failed):
+        self._loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        try:
+            server = await self._loop.create_server(self.protocol, host, port, reuse_address=True)
+        except OSError as e:
+            failed.append(e)
+            return
+        finally:
+            started.set()
+        ticks = asyncio.ensure_future(self.run())
+        try:
+            await self._stopping.wait()
+        finally:
+            ticks.cancel()
+            server.close()
+            self.close()
+
+    def stop(self):
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self._loop.call_soon_threadsafe(self._stopping.set)
+        self._thread.join()
+
+    def stats(self):
+        return {
+            "observers": len(self.observers),
+            "published": self.published,
+            "sent": self.sent,
+            "dropped": self.dropped,
+        }
+
+
+class ObserverProtocol(asyncio.Protocol):
+    """One read-only observer of a TelemetryChannel."""
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.transport = None
+        self.paused = False
+        self.behind = False  # A snapshot was dropped while paused
+        self.dropped = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+        sock = transport.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.channel.send_buffer)
+        transport.set_write_buffer_limits(high=0)  # Pause as soon as the kernel refuses a write
+        self.channel.observers.add(self)
+
+    def data_received(self, data):
+        pass  # Read-only
+
+    def connection_lost(self, exc):
+        self.channel.observers.discard(self)
+
+    def pause_writing(self):
+        self.paused = True
+
+    def resume_writing(self):
+        self.paused = False
+        if self.behind and self.channel.latest is not None:
+            self.behind = False
+            self.offer(self.channel.latest)
+
+    def offer(self, line):
+        if self.paused or self.transport.is_closing():
+            self.behind = True
+            self.dropped += 1
+            self.channel.dropped += 1
+            return
+        self.transport.write(line)
+        self.channel.sent += 1
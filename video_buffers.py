@@ -0,0 +1,108 @@
+import asyncio
+import threading
+
+# Buffers between the video receive task and whatever displays the frames.
+# All take put(item) without blocking and count items received, taken and
+# superseded (dropped before anyone took them). FrameMailbox and FrameQueue
+# hand items out with `await get(timeout)` and belong to a single event
+# loop; FrameHandoff passes them on to another thread.
+
+
+class FrameMailbox:
+    """Depth-1 buffer: put() overwrites, get() always returns the newest item.
+
+    For live driving, where an old frame is worse than a skipped one.
+    """
+
+    def __init__(self):
+        self._item = None
+        self._ready = asyncio.Event()
+        self.received = 0
+        self.taken = 0
+        self.superseded = 0
+
+    def put(self, item):
+        self.received += 1
+        if self._item is not None:
+            self.superseded += 1
+        self._item = item
+        self._ready.set()
+
+    async def get(self, timeout=None):
+        """Waits for an item that has not been taken yet; raises asyncio.TimeoutError."""
+        if self._item is None:
+            self._ready.clear()
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        item, self._item = self._item, None
+        self.taken += 1
+        return item
+
+
+class FrameQueue:
+    """Keeps up to `size` items in order, dropping the oldest when full.
+
+    For recording, where every frame matters more than how fresh it is.
+    """
+
+    def __init__(self, size=30):
+        self._queue = asyncio.Queue(maxsize=size)
+        self.received = 0
+        self.taken = 0
+        self.superseded = 0
+
+    def put(self, item):
+        self.received += 1
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.superseded += 1
+        self._queue.put_nowait(item)
+
+    async def get(self, timeout=None):
+        """Waits for the oldest queued item; raises asyncio.TimeoutError."""
+        item = await asyncio.wait_for(self._queue.get(), timeout)
+        self.taken += 1
+        return item
+
+
+class FrameHandoff:
+    """Thread-safe depth-1 slot from the event loop to a worker thread.
+
+    put() never blocks and overwrites; get() blocks the worker until a new
+    item arrives, `timeout` passes (None is returned) or close() is called
+    (None again, and `closed` is set). Counters as for the buffers above.
+    `on_taken()`, if set, runs on the worker after get() takes an item, so
+    a producer that must not overwrite can wait for it before the next put().
+    """
+
+    def __init__(self, on_taken=None):
+        self._item = None
+        self._ready = threading.Condition()
+        self.on_taken = on_taken
+        self.closed = False
+        self.received = 0
+        self.taken = 0
+        self.superseded = 0
+
+    def put(self, item):
+        with self._ready:
+            self.received += 1
+            if self._item is not None:
+                self.superseded += 1
+            self._item = item
+            self._ready.notify()
+
+    def get(self, timeout=None):
+        with self._ready:
+            if self._item is None and not self.closed:
+                self._ready.wait(timeout)
+            item, self._item = self._item, None
+            if item is not None:
+                self.taken += 1
+        if item is not None and self.on_taken is not None:
+            self.on_taken()
+        return item
+
+    def close(self):
+        with self._ready:
+            self.closed = True
+            self._ready.notify_all()
@@ -5,18 +5,42 @@ import numpy as np
 from aiortc import RTCPeerConnection, RTCSessionDescription
 import aiohttp
 import logging
+import threading
+import time
 from datetime import datetime
+from stats import SampleRing
+from frame_pool import FramePool
+from video_buffers import FrameHandoff, FrameMailbox, FrameQueue
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# --- Configuration ---
+FRAME_BUFFER = 'latest'  # 'latest': always display the newest frame (FPV); 'queue': keep every frame (recording)
+FRAME_QUEUE_SIZE = 30
+FRAME_POOL_SIZE = 3  # BGR buffers reused for converted frames; 0 lets PyAV allocate each one
+
 class WebRTCClient:
-    def __init__(self, server_url):
+    def __init__(self, server_url, frame_buffer=FRAME_BUFFER):
         self.server_url = server_url
         self.pc = None
         self.video_track = None
-        self.frame_queue = asyncio.Queue(maxsize=30)
-       
+        # (decoded av.VideoFrame, monotonic receive time), converted on the way out
+        self.lossless = frame_buffer == 'queue'
+        self.frames = FrameQueue(FRAME_QUEUE_SIZE) if self.lossless else FrameMailbox()
+        self.pool = FramePool(FRAME_POOL_SIZE)
+        self.handoff = FrameHandoff()  # Newest frame from the event loop to the render thread
+        self.quit = None  # asyncio.Event set once the render thread stops
+        self.frame_taken = None  # asyncio.Event, queue mode: the render thread took the last handoff
+        self.frames_converted = 0
+        self.frames_displayed = 0
+        self.frame_wait = SampleRing(512)  # Received to taken for display, seconds
+        self.frame_age = SampleRing(512)  # Glass-to-glass when taken, above the quickest frame seen, seconds
+        self.stream_origin = None  # Receive time minus stream time of the quickest frame so far
+        self.stats_time = time.monotonic()
+        self.stats_received = 0
+        self.stats_converted = 0
+
     async def connect(self):
         self.pc = RTCPeerConnection()
 
@@ -57,52 +81,165 @@ class WebRTCClient:
         while True:
             try:
                 frame = await self.video_track.recv()
-                img = frame.to_ndarray(format="bgr24")
-
-                if self.frame_queue.full():
-                    try:
-                        self.frame_queue.get_nowait()
-                    except:
-                        pass
-                await self.frame_queue.put(img)
+                self.frames.put((frame, time.monotonic()))
 
             except Exception as e:
                 logger.error(f"Error receiving frame: {e}")
                 break
 
+    async def next_image(self, timeout=1.0):
+        """Waits for the next buffered frame and converts it to a BGR ndarray.
+
+        Conversion happens here rather than on receive, so frames superseded
+        in the buffer never pay for the YUV to BGR conversion. The image is a
+        pooled buffer: pass it to release_image() when done with it.
+        """
+        frame, received = await self.frames.get(timeout)
+        img = self.pool.convert(frame)
+        self.frames_converted += 1
+        self.track_age(frame, received)
+        return img
+
+    def release_image(self, img):
+        self.pool.release(img)
+
+    def track_age(self, frame, received):
+        """Records how long `frame` waited here and how old it is against the stream clock.
+
+        Sender and client clocks are not shared, so the age is measured above
+        the quickest frame seen so far: the delay on top of the best case the
+        link has shown, which is what buffering and a slow display add.
+        """
+        now = time.monotonic()
+        self.frame_wait.add(now - received)
+        if frame.time is None:
+            return
+        origin = received - frame.time
+        if self.stream_origin is None or origin < self.stream_origin:
+            self.stream_origin = origin
+        self.frame_age.add(now - (self.stream_origin + frame.time))
+
+    def stats(self):
+        wait_p50, wait_p99 = self.frame_wait.percentiles(50, 99) if len(self.frame_wait) else (0.0, 0.0)
+        age_p50, age_p99 = self.frame_age.percentiles(50, 99) if len(self.frame_age) else (0.0, 0.0)
+        return {
+            "received": self.frames.received,
+            "displayed": self.frames_displayed,
+            "superseded": self.frames.superseded + self.handoff.superseded,
+            "wait_p50_ms": wait_p50 * 1e3,
+            "wait_p99_ms": wait_p99 * 1e3,
+            "age_p50_ms": age_p50 * 1e3,
+            "age_p99_ms": age_p99 * 1e3,
+            "pool_misses": self.pool.misses,
+        }
+
+    def conversion_stats(self):
+        """Frames received and converted per second since the last call, and the conversions saved."""
+        now = time.monotonic()
+        elapsed = max(now - self.stats_time, 1e-9)
+        received = (self.frames.received - self.stats_received) / elapsed
+        converted = (self.frames_converted - self.stats_converted) / elapsed
+        self.stats_time, self.stats_received, self.stats_converted = now, self.frames.received, self.frames_converted
+        return {"received_fps": received, "converted_fps": converted, "saved_per_s": received - converted}
+
     async def display_loop(self):
-        cv2.namedWindow("WebRTC Stream", cv2.WINDOW_NORMAL)
+        """Feeds the render thread the newest frame until 'q' is pressed in the window.
+
+        Drawing and waitKey() can take milliseconds; on the render thread they
+        no longer hold up aiortc's packet handling on this event loop. In
+        queue mode each frame is handed over only once the render thread has
+        taken the previous one, so the depth-1 handoff never overwrites and
+        frames wait (or are dropped, counted) in the queue instead.
+        """
+        loop = asyncio.get_running_loop()
+        self.quit = asyncio.Event()
+        self.frame_taken = asyncio.Event()
+        if self.lossless:
+            self.handoff.on_taken = lambda: loop.call_soon_threadsafe(self.frame_taken.set)
+        renderer = threading.Thread(target=self.render_loop, args=(loop,), name="render", daemon=True)
+        renderer.start()
+        try:
+            while not self.quit.is_set():
+                try:
+                    item = await self.frames.get(timeout=1.0)
+                except asyncio.TimeoutError:
+                    logger.warning("No frames received for 1 second")
+                    continue
+                self.frame_taken.clear()
+                self.handoff.put(item)
+                if self.lossless:
+                    await self.frame_taken.wait()  # Also set when the render thread stops
+        finally:
+            self.handoff.close()
+            await loop.run_in_executor(None, renderer.join)
+
+    def render_loop(self, loop):
+        """Render thread: converts and shows frames. All HighGUI calls stay on this thread."""
+        self.open_window()
         frame_count = 0
         fps_time = datetime.now()
 
-        while True:
-            try:
-                frame = await asyncio.wait_for(self.frame_queue.get(), timeout=1.0)
-
-                frame_count += 1
-                if frame_count % 30 == 0:
-                    elapsed = (datetime.now() - fps_time).total_seconds()
-                    fps = 30 / elapsed
-                    fps_time = datetime.now()
-                    cv2.putText(frame, f"FPS: {fps:.1f}", (10, 30),
-                                cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-
-                cv2.imshow("WebRTC Stream", frame)
-                if cv2.waitKey(1) & 0xFF == ord('q'):
+        try:
+            while not self.handoff.closed:
+                item = self.handoff.get(timeout=0.05)  # Keeps waitKey() pumping window events
+                img = None
+                if item is not None:
+                    frame, received = item
+                    img = self.pool.convert(frame)
+                    self.frames_converted += 1
+                    self.track_age(frame, received)
+
+                    frame_count += 1
+                    if frame_count % 30 == 0:
+                        elapsed = (datetime.now() - fps_time).total_seconds()
+                        fps = 30 / elapsed
+                        fps_time = datetime.now()
+                        stats = self.conversion_stats()
+                        logger.info(f"Received {stats['received_fps']:.1f} fps, converted {stats['converted_fps']:.1f} fps, "
+                                    f"{stats['saved_per_s']:.1f} conversions/s saved")
+                        self.log_stats()
+                        cv2.putText(img, f"FPS: {fps:.1f}", (10, 30),
+                                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+
+                key = self.show(img)
+                if img is not None:
+                    self.frames_displayed += 1
+                    self.pool.release(img)  # imshow keeps its own copy
+                if key == ord('q'):
                     break
+        except Exception as e:
+            logger.error(f"Display error: {e}")
+        finally:
+            self.close_window()
+            loop.call_soon_threadsafe(self.render_stopped)
 
-            except asyncio.TimeoutError:
-                logger.warning("No frames received for 1 second")
-                continue
-            except Exception as e:
-                logger.error(f"Display error: {e}")
-                break
+    def render_stopped(self):
+        self.quit.set()
+        self.frame_taken.set()
+
+    def open_window(self):
+        cv2.namedWindow("WebRTC Stream", cv2.WINDOW_NORMAL)
 
+    def show(self, img):
+        """Draws `img` (None to only handle window events) and returns the key pressed."""
+        if img is not None:
+            cv2.imshow("WebRTC Stream", img)
+        return cv2.waitKey(1) & 0xFF
+
+    def close_window(self):
         cv2.destroyAllWindows()
 
+    def log_stats(self):
+        stats = self.stats()
+        logger.info(f"Frames: {stats['received']} received, {stats['displayed']} displayed, "
+                    f"{stats['superseded']} superseded; age p50 {stats['age_p50_ms']:.0f} ms, "
+                    f"p99 {stats['age_p99_ms']:.0f} ms (waited p50 {stats['wait_p50_ms']:.0f} ms); "
+                    f"{stats['pool_misses']} pool misses")
+
     async def run(self):
         await self.connect()
         await self.display_loop()
+        self.log_stats()
         if self.pc:
             await self.pc.close()
 
@@ -1,122 +1,228 @@
 import asyncio
-import json
-import cv2
-import numpy as np
-from aiortc import RTCPeerConnection, RTCSessionDescription
-import aiohttp
-import logging
-from datetime import datetime
-
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-class WebRTCClient:
-    def __init__(self, server_url):
-        self.server_url = server_url
-        self.pc = None
-        self.video_track = None
-        self.frame_queue = asyncio.Queue(maxsize=30)
-       
-    async def connect(self):
-        self.pc = RTCPeerConnection()
-
-        # ✅ Add transceiver to fix media direction error
-        self.pc.addTransceiver("video", direction="recvonly")
-
-        @self.pc.on("track")
-        def on_track(track):
-            logger.info(f"Receiving {track.kind} track")
-            if track.kind == "video":
-                self.video_track = track
-                asyncio.create_task(self.process_video_track())
-
-        @self.pc.on("connectionstatechange")
-        async def on_connectionstatechange():
-            logger.info(f"Connection state: {self.pc.connectionState}")
-
-        await self.pc.setLocalDescription(await self.pc.createOffer())
-
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                f"{self.server_url}/offer",
-                json={
-                    "sdp": self.pc.localDescription.sdp,
-                    "type": self.pc.localDescription.type
-                }
-            ) as response:
-                answer_data = await response.json()
-                answer = RTCSessionDescription(
-                    sdp=answer_data["sdp"],
-                    type=answer_data["type"]
-                )
-                await self.pc.setRemoteDescription(answer)
-
-        logger.info("WebRTC connection established")
-
-    async def process_video_track(self):
-        while True:
+import threading
+import time
+from aiohttp import web
+from aiortc import MediaStreamTrack, RTCPeerConnection, RTCSessionDescription
+from aiortc.mediastreams import MediaStreamError
+from frame_sources import open_source
+from synthetic_video import VIDEO_CLOCK_RATE, VIDEO_TIME_BASE
+from video_buffers import FrameMailbox
+
+# Publishes the car's video over WebRTC: answers the offer WebRTCClient posts
+# to /offer and streams from a frame source (frame_sources.py). One capture
+# thread reads the source and converts frames, so a slow camera read never
+# holds up the event loop; every viewer's track takes the newest frame from
+# its own mailbox, and a viewer that falls behind skips frames, it does not
+# queue them.
+
+# --- Configuration ---
+HOST = '0.0.0.0'
+PORT = 8080  # WebRTCClient posts its offer to http://<car>:8080/offer
+FRAME_SOURCE = 'camera'  # 'camera', or 'synthetic' for a test pattern without one
+CAMERA_DEVICE = 0
+WIDTH, HEIGHT = 640, 480
+FPS = 30
+STATS_SECONDS = 5.0  # Capture and viewer stats printed this often; 0 to disable
+
+
+class CaptureThread(threading.Thread):
+    """Reads `source` on its own thread and hands each frame to the subscribed tracks.
+
+    Frames get their pts from the capture time, so every viewer sees the
+    same timeline. Reading goes on while nobody watches (a camera keeps
+    its exposure settled), but frames are only passed on to the event loop
+    when there is at least one track.
+    """
+
+    def __init__(self, source):
+        super().__init__(name="capture", daemon=True)
+        self.source = source
+        self.tracks = set()  # Only touched on the event loop
+        self.loop = None
+        self.epoch = None
+        self.captured = 0
+        self.failed = False
+        self._stopping = threading.Event()
+
+    def start(self, loop=None):
+        self.loop = loop or asyncio.get_running_loop()
+        super().start()
+
+    def run(self):
+        self.epoch = time.monotonic()
+        while not self._stopping.is_set():
+            frame = self.source.read()
+            if frame is None:
+                self.failed = True
+                self.loop.call_soon_threadsafe(self._end_tracks)
+                return
+            captured = time.monotonic()
+            self.captured += 1
+            if self.tracks:
+                frame.pts = int((captured - self.epoch) * VIDEO_CLOCK_RATE)
+                frame.time_base = VIDEO_TIME_BASE
+                self.loop.call_soon_threadsafe(self._publish, frame, captured)
+
+    def _publish(self, frame, captured):
+        for track in self.tracks:
+            track.frames.put((frame, captured))
+
+    def _end_tracks(self):
+        print(f"❌ Frame source {self.source.name} stopped delivering frames")
+        for track in list(self.tracks):
+            track.stop()
+
+    def stop(self):
+        self._stopping.set()
+        if self.is_alive():
+            self.join(timeout=2.0)
+        self.source.close()
+
+
+class CaptureTrack(MediaStreamTrack):
+    """One viewer's video track: the newest frame from the capture thread."""
+
+    kind = "video"
+
+    def __init__(self, capture):
+        super().__init__()
+        self.capture = capture
+        self.frames = FrameMailbox()
+        capture.tracks.add(self)
+
+    async def recv(self):
+        while self.readyState == "live":
             try:
-                frame = await self.video_track.recv()
-                img = frame.to_ndarray(format="bgr24")
-
-                if self.frame_queue.full():
-                    try:
-                        self.frame_queue.get_nowait()
-                    except:
-                        pass
-                await self.frame_queue.put(img)
-
-            except Exception as e:
-                logger.error(f"Error receiving frame: {e}")
-                break
+                frame, _ = await self.frames.get(timeout=1.0)
+                return frame
+            except asyncio.TimeoutError:
+                continue
+        raise MediaStreamError
 
-    async def display_loop(self):
-        cv2.namedWindow("WebRTC Stream", cv2.WINDOW_NORMAL)
-        frame_count = 0
-        fps_time = datetime.now()
+    def stop(self):
+        self.capture.tracks.discard(self)
+        super().stop()
 
-        while True:
-            try:
-                frame = await asyncio.wait_for(self.frame_queue.get(), timeout=1.0)
 
-                frame_count += 1
-                if frame_count % 30 == 0:
-                    elapsed = (datetime.now() - fps_time).total_seconds()
-                    fps = 30 / elapsed
-                    fps_time = datetime.now()
-                    cv2.putText(frame, f"FPS: {fps:.1f}", (10, 30),
-                                cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+class WebRTCPublisher:
+    def __init__(self, source):
+        self.source = source
+        self.capture = CaptureThread(source)
+        self.peers = set()
+        self.runner = None
 
-                cv2.imshow("WebRTC Stream", frame)
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    break
+    async def offer(self, request):
+        params = await request.json()
+        pc = RTCPeerConnection()
+        self.peers.add(pc)
+        track = CaptureTrack(self.capture)
+        pc.addTrack(track)
 
-            except asyncio.TimeoutError:
-                logger.warning("No frames received for 1 second")
-                continue
-            except Exception as e:
-                logger.error(f"Display error: {e}")
-                break
-
-        cv2.destroyAllWindows()
+        @pc.on("connectionstatechange")
+        async def on_connectionstatechange():
+            print(f"📡 Viewer {request.remote}: {pc.connectionState}")
+            if pc.connectionState in ("failed", "closed"):
+                track.stop()
+                self.peers.discard(pc)
+                await pc.close()
+
+        await pc.setRemoteDescription(RTCSessionDescription(sdp=params["sdp"], type=params["type"]))
+        await pc.setLocalDescription(await pc.createAnswer())
+        return web.json_response({"sdp": pc.localDescription.sdp, "type": pc.localDescription.type})
+
+    async def start(self, host=HOST, port=PORT):
+        self.capture.start()
+        app = web.Application()
+        app.router.add_post("/offer", self.offer)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, port).start()
+
+    async def stop(self):
+        for pc in list(self.peers):
+            await pc.close()
+        self.peers.clear()
+        if self.runner is not None:
+            await self.runner.cleanup()
+        self.capture.stop()
+
+    def stats(self):
+        tracks = list(self.capture.tracks)
+        return {
+            "captured": self.capture.captured,
+            "viewers": len(tracks),
+            "sent": sum(track.frames.taken for track in tracks),
+            "skipped": sum(track.frames.superseded for track in tracks),
+        }
+
+    async def report_stats(self, seconds=STATS_SECONDS):
+        last = self.stats()
+        while True:
+            await asyncio.sleep(seconds)
+            stats = self.stats()
+            print(f"📷 {(stats['captured'] - last['captured']) / seconds:.1f} fps captured, "
+                  f"{stats['viewers']} viewer(s), {stats['sent']} frames sent, {stats['skipped']} skipped")
+            last = stats
+
+
+class PublisherThread(threading.Thread):
+    """Runs a WebRTCPublisher on its own thread and event loop, next to another loop (benchmarks)."""
+
+    def __init__(self, source, host='127.0.0.1', port=PORT):
+        super().__init__(name="publisher", daemon=True)
+        self.publisher = WebRTCPublisher(source)
+        self.host = host
+        self.port = port
+        self.loop = None
+        self.ready = threading.Event()
+
+    def run(self):
+        self.loop = asyncio.new_event_loop()
+        self.loop.run_until_complete(self.publisher.start(self.host, self.port))
+        self.ready.set()
+        self.loop.run_forever()
+
+    def call(self, coroutine, timeout=10):
+        """Runs `coroutine` on the publisher's loop and waits for its result."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(timeout)
+
+    def close_peers(self):
+        async def close():
+            for pc in list(self.publisher.peers):
+                await pc.close()
+        self.call(close())
+
+    def stop(self):
+        self.call(self.publisher.stop())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.join(timeout=5)
 
-    async def run(self):
-        await self.connect()
-        await self.display_loop()
-        if self.pc:
-            await self.pc.close()
 
 async def main():
-    server_url = "http://192.168.16.101:8080"  # Adjust to your Raspberry Pi's IP
-    client = WebRTCClient(server_url)
-
+    options = {"device": CAMERA_DEVICE} if FRAME_SOURCE == 'camera' else {}
     try:
-        await client.run()
-    except KeyboardInterrupt:
-        logger.info("Shutting down...")
+        source = open_source(FRAME_SOURCE, width=WIDTH, height=HEIGHT, fps=FPS, **options)
+    except (OSError, ValueError) as e:
+        print(f"❌ Frame source error: {e}")
+        return
+    print(f"✅ Frame source: {source.name}, {source.width}x{source.height} at {source.fps:g} fps")
+
+    publisher = WebRTCPublisher(source)
+    await publisher.start(HOST, PORT)
+    print(f"✅ Publishing on http://{HOST}:{PORT}/offer")
+    try:
+        if STATS_SECONDS:
+            await publisher.report_stats()
+        else:
+            await asyncio.Event().wait()
+    finally:
+        await publisher.stop()
+
 
 if __name__ == "__main__":
-    print("WebRTC Client for receiving Raspberry Pi camera stream")
-    print("Press 'q' in video window to quit")
+    print("WebRTC camera publisher for the RC car")
     print("-" * 50)
-    asyncio.run(main())
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\n🔌 Publisher shutting down...")